@@ -16,5 +16,7 @@ __DATA_VERSION__ = '1.1'
 
 try:
     from audata.file import File
+    from audata.parallel import read_many
+    from audata.catalog import Catalog
 except ImportError:
     print("Unable to import audata.file.File. If this occurs during initial setup, you may ignore this.")
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+Time alignment helpers.
+
+A signal is aligned onto a time grid by finding, for every grid time, the samples its value
+is computed from. Only the time column of the requested window is read to find them, and
+then only those rows of the value columns, so high-rate signals are never read at full
+resolution when they are downsampled onto a coarser grid.
+"""
+import datetime as dt
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+METHODS = ('nearest', 'linear', 'last')
+
+# Read the whole window instead of single rows once this fraction of it is needed.
+DENSE_FRACTION = 0.25
+
+
+def seconds(value: Union[float, str, dt.timedelta, None]) -> Optional[float]:
+    """Convert a frequency or tolerance (seconds, e.g. '200ms', or a timedelta) to seconds."""
+    if value is None or isinstance(value, (int, float, np.number)):
+        return value
+    return pd.Timedelta(value).total_seconds()
+
+
+def grid(lo: float, hi: float, step: float) -> np.ndarray:
+    """Times from `lo` (inclusive) to `hi` (exclusive) every `step` seconds."""
+    if step <= 0:
+        raise ValueError(f'Invalid alignment frequency: {step} s')
+    return lo + np.arange(max(0, int(np.ceil((hi - lo) / step - 1e-9)))) * step
+
+
+def neighbours(times: np.ndarray,
+               targets: np.ndarray,
+               method: str,
+               tolerance: Optional[float] = None
+              ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the samples from which the value at each target time is computed.
+
+    Args:
+        times: Sorted sample times.
+        targets: The grid times.
+        method: 'nearest' for the closest sample, 'last' for the latest sample at or before
+            the target, or 'linear' to interpolate between the samples around it.
+        tolerance: Maximum distance (seconds) from the target to the sample used, or for
+            'linear' between the two samples interpolated. None for no limit.
+
+    Returns:
+        Tuple of (left sample positions, right sample positions, weights of the right
+        samples, mask of targets with a value). Positions are only meaningful where the
+        mask is set.
+    """
+    if method not in METHODS:
+        raise ValueError(f'Unknown alignment method "{method}", expected one of {METHODS}')
+
+    count = len(times)
+    zeros = np.zeros(len(targets), dtype=np.int64)
+    if count == 0:
+        return zeros, zeros, np.zeros(len(targets)), np.zeros(len(targets), dtype=bool)
+
+    after = np.searchsorted(times, targets, side='right')
+    left = np.clip(after - 1, 0, count - 1)
+    right = np.clip(after, 0, count - 1)
+    weight = np.zeros(len(targets))
+
+    if method == 'last':
+        right = left
+        valid = after > 0
+        distance = targets - times[left]
+    elif method == 'nearest':
+        closer = np.abs(times[right] - targets) < np.abs(targets - times[left])
+        left = right = np.where(closer, right, left)
+        valid = np.ones(len(targets), dtype=bool)
+        distance = np.abs(targets - times[left])
+    else:
+        exact = times[left] == targets
+        valid = (after > 0) & ((after < count) | exact)
+        span = times[right] - times[left]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(exact | (span <= 0), 0.0, (targets - times[left]) / span)
+        distance = np.where(exact, 0.0, span)
+
+    if tolerance is not None:
+        valid &= distance <= tolerance
+    return left, right, weight, valid
+
+
+def align(dataset: 'Dataset',
+          targets: np.ndarray,
+          method: str,
+          tolerance: Optional[float] = None,
+          columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Align the columns of a dataset onto a time grid.
+
+    Args:
+        dataset: The dataset, which must have a time column.
+        targets: The grid, as Unix timestamps.
+        method: As in `neighbours`.
+        tolerance: As in `neighbours`.
+        columns: The columns to align. Defaults to all but the time columns (and, for
+            'linear', but the factor and string columns).
+
+    Returns:
+        Dictionary of column name to aligned values: float64 (NaN where there is no value)
+        for numeric columns, codes (-1 where there is no value) for factors, and objects
+        (None where there is no value) for strings. Factor levels are listed under the
+        '.levels' key, as in `Dataset.to_numpy`.
+    """
+    if len(dataset.time_columns) == 0:
+        raise Exception(f'Dataset {dataset.name} has no time column.')
+    time_col = dataset.time_columns[0]
+    cols = dataset.columns
+    if columns is None:
+        columns = [col for col in cols if col not in dataset.time_columns and
+                   (method != 'linear' or cols[col]['type'] not in ('factor', 'string'))]
+    elif method == 'linear':
+        other = [col for col in columns if cols[col]['type'] in ('factor', 'string')]
+        if len(other) > 0:
+            raise ValueError(f'Cannot interpolate non-numeric columns: {other}')
+
+    # The window, extended by a sample on either side to align the edges of the grid.
+    nrow = dataset.nrow
+    if len(targets) > 0:
+        window = dataset.find_rows(targets[0], targets[-1] + 1e-9)
+    else:
+        window = slice(0, 0)
+    if isinstance(window, slice):
+        window = slice(max(0, window.start - 1), min(nrow, window.stop + 1))
+        rows = np.arange(window.start, window.stop)
+    else:
+        rows = window
+    times = dataset.to_numpy(window, columns=time_col, datetimes=False)[time_col]
+    if np.any(np.diff(times) < 0):
+        order = np.argsort(times, kind='stable')
+        rows, times = rows[order], times[order]
+
+    left, right, weight, valid = neighbours(times, targets, method, tolerance)
+    left, right, weight = rows[left[valid]], rows[right[valid]], weight[valid]
+    needed = np.unique(np.concatenate([left, right]))
+    if len(needed) > 0 and len(needed) > DENSE_FRACTION * (needed[-1] - needed[0] + 1):
+        values = dataset.to_numpy(slice(needed[0], needed[-1] + 1), columns=columns,
+                                  datetimes=False)
+        left, right = left - needed[0], right - needed[0]
+    else:
+        values = dataset.to_numpy(needed, columns=columns, datetimes=False)
+        left, right = np.searchsorted(needed, left), np.searchsorted(needed, right)
+
+    aligned = {}
+    for col in columns:
+        col_type = cols[col]['type']
+        source = values[col]
+        if col_type == 'factor':
+            result = np.full(len(targets), -1, dtype=np.int64)
+            result[valid] = source[left]
+        elif col_type == 'string':
+            result = np.full(len(targets), None, dtype=object)
+            result[valid] = source[left]
+        else:
+            result = np.full(len(targets), np.nan)
+            result[valid] = source[left]
+            if method == 'linear':
+                result[valid] += weight * (source[right] - source[left])
+        aligned[col] = result
+    if '.levels' in values:
+        aligned['.levels'] = values['.levels']
+    return aligned
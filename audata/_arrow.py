@@ -0,0 +1,186 @@
+"""
+Apache Arrow conversion helpers.
+
+audata column types map onto Arrow types as follows: times to UTC timestamps (ns), time
+deltas to durations (ns), factors to dictionaries of their levels, strings to large
+strings, and numeric and boolean columns to the same types. Datasets are converted one
+record batch at a time, so they never need to fit in memory. The `pyarrow` package is an
+optional dependency, only required by these conversions.
+"""
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Field metadata key holding the audata column specification.
+META_KEY = b'audata'
+
+# Column specification entries that determine how a column is stored, rather than describe it.
+STORAGE_KEYS = ('type', 'levels', 'ordered', 'resolution', 'gain', 'offset', 'inferred',
+                'signed')
+
+# Default number of rows per record batch.
+DEFAULT_BATCH_ROWS = 1 << 20
+
+
+def require():
+    """Raise an informative error if pyarrow is not installed."""
+    if pa is None:
+        raise ImportError('Arrow and Parquet support requires pyarrow (pip install pyarrow).')
+
+
+def arrow_type(spec: Dict[str, Any], dtype: np.dtype) -> 'pa.DataType':
+    """The Arrow type of a column, from its specification and stored dtype."""
+    col_type = spec['type']
+    if col_type == 'time':
+        return pa.timestamp('ns', tz='UTC')
+    elif col_type == 'timedelta':
+        return pa.duration('ns')
+    elif col_type == 'factor':
+        levels = pa.array(spec['levels'])
+        return pa.dictionary(pa.from_numpy_dtype(dtype), levels.type,
+                             ordered=bool(spec.get('ordered', False)))
+    elif col_type == 'string':
+        return pa.large_string()
+    elif 'gain' in spec:
+        # Integer counts are exported as the values they encode.
+        return pa.float64()
+    return pa.from_numpy_dtype(dtype)
+
+
+def schema(dataset: 'Dataset', columns: List[str]) -> 'pa.Schema':
+    """The Arrow schema of the columns of a dataset."""
+    cols = dataset.columns
+    sampling = dataset.sampling
+    virtual = sampling['time_column'] if sampling is not None else None
+    fields = []
+    for col in columns:
+        dtype = np.dtype('f8') if col == virtual else dataset.hdf.dtype[col]
+        fields.append(pa.field(col, arrow_type(cols[col], dtype),
+                               metadata={META_KEY: json.dumps(cols[col])}))
+    return pa.schema(fields)
+
+
+def to_array(values: np.ndarray, spec: Dict[str, Any], arrow: 'pa.DataType',
+             levels: Optional[np.ndarray] = None) -> 'pa.Array':
+    """Convert a column, as returned by `Dataset.to_numpy` with datetimes, to Arrow."""
+    col_type = spec['type']
+    if col_type == 'factor':
+        return pa.DictionaryArray.from_arrays(pa.array(values, mask=values < 0),
+                                              pa.array(levels, type=arrow.value_type),
+                                              ordered=arrow.ordered)
+    elif col_type in ('time', 'timedelta'):
+        # NaT (missing) values become nulls.
+        return pa.array(values, type=arrow, from_pandas=True)
+    return pa.array(values, type=arrow)
+
+
+def iter_batches(dataset: 'Dataset',
+                 columns: Optional[Union[str, List[str]]] = None,
+                 rows: Optional[int] = None) -> Iterator['pa.RecordBatch']:
+    """Convert a dataset to Arrow record batches, as in `Dataset.iter_arrow`."""
+    require()
+    if isinstance(columns, str):
+        columns = [columns]
+    if columns is None:
+        columns = list(dataset.columns)
+    target = schema(dataset, columns)
+    cols = dataset.columns
+
+    # Read whole HDF5 chunks, so that no chunk is decompressed twice.
+    chunk = dataset.hdf.chunks[0] if dataset.hdf.chunks is not None else 1
+    rows = max(1, -(-(rows or DEFAULT_BATCH_ROWS) // chunk)) * chunk
+    for start in range(0, dataset.nrow, rows):
+        data = dataset.to_numpy(slice(start, start + rows), columns=columns, datetimes=True)
+        levels = data.get('.levels', {})
+        arrays = [to_array(data[col], cols[col], field.type, levels.get(col))
+                  for col, field in zip(columns, target)]
+        yield pa.RecordBatch.from_arrays(arrays, schema=target)
+
+
+def batches(data: Union['pa.Table', 'pa.RecordBatch', 'pa.RecordBatchReader',
+                        Iterable['pa.RecordBatch']],
+            rows: Optional[int] = None) -> Iterator['pa.RecordBatch']:
+    """Iterate over the record batches of Arrow data."""
+    require()
+    if isinstance(data, pa.Table):
+        yield from data.to_batches(max_chunksize=rows or DEFAULT_BATCH_ROWS)
+    elif isinstance(data, pa.RecordBatch):
+        yield data
+    else:
+        yield from data
+
+
+def to_dataframe(batch: 'pa.RecordBatch') -> 'pd.DataFrame':
+    """
+    Convert a record batch to a DataFrame for storage: timestamps become datetimes,
+    durations time deltas, dictionaries categoricals (with the dictionary as levels), and
+    strings objects.
+    """
+    return batch.to_pandas(date_as_object=False)
+
+
+def column_specs(schema: 'pa.Schema') -> Dict[str, Dict[str, Any]]:
+    """The audata column specifications stored in the field metadata of an Arrow schema."""
+    return {field.name: json.loads(field.metadata[META_KEY]) for field in schema
+            if field.metadata is not None and META_KEY in field.metadata}
+
+
+def storage_options(specs: Dict[str, Dict[str, Any]],
+                    kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The `Dataset.new` options storing columns as their specifications declare (time
+    resolutions and quantization), overridden by any given in `kwargs`.
+    """
+    declared = {
+        'time_resolution': {col: spec['resolution'] for col, spec in specs.items()
+                            if spec.get('type') == 'time' and 'resolution' in spec},
+        'quantize': {col: {key: spec[key] for key in ('gain', 'offset', 'units', 'inferred')
+                           if key in spec}
+                     for col, spec in specs.items() if 'gain' in spec}
+    }
+    options = dict(kwargs)
+    for key, value in declared.items():
+        if isinstance(options.get(key), dict):
+            options[key] = {**value, **options[key]}
+        elif options.get(key) is None and len(value) > 0:
+            options[key] = value
+    return options
+
+
+def with_levels(frame: pd.DataFrame, specs: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Give the categorical columns of a batch the levels of their factor specifications, in
+    order (followed by any other categories), so that their codes are stored against them.
+    """
+    for col, spec in specs.items():
+        if spec.get('type') != 'factor' or col not in frame or \
+                not isinstance(frame[col].dtype, pd.CategoricalDtype):
+            continue
+        levels = list(spec['levels'])
+        known = set(levels)
+        levels += [lvl for lvl in frame[col].cat.categories if lvl not in known]
+        frame[col] = frame[col].cat.set_categories(levels, ordered=bool(spec.get('ordered')))
+    return frame
+
+
+def describe(meta: Dict[str, Any], specs: Dict[str, Dict[str, Any]]):
+    """Copy the descriptive entries (e.g. comments) of column specifications into meta."""
+    for col, spec in specs.items():
+        if col in meta.get('columns', {}):
+            col_meta = meta['columns'][col]
+            for key, value in spec.items():
+                if key not in STORAGE_KEYS:
+                    col_meta.setdefault(key, value)
+
+
+def index_dtypes(schema: 'pa.Schema') -> Dict[str, np.dtype]:
+    """The dtype of the indices of each dictionary column of an Arrow schema."""
+    return {field.name: np.dtype(field.type.index_type.to_pandas_dtype()) for field in schema
+            if pa.types.is_dictionary(field.type)}
@@ -0,0 +1 @@
+"""Benchmarks for audata's storage and access paths."""
@@ -0,0 +1,62 @@
+"""
+Benchmark dataset layouts: compound records versus one HDF5 dataset per column.
+
+For each compression setting, the same waveform is written with both layouts, reporting
+the file size, the time to read a single column, and the time to read every column.
+
+Run with `python -m audata._bench.layout [--rows N]`.
+"""
+import os
+import time
+import argparse
+import tempfile
+import datetime as dt
+
+from audata import File
+from audata._bench.profiles import _waveform
+
+
+def run(rows: int, repeat: int = 3, profiles=('default', 'archive', 'streaming')):
+    """Write the same waveform with each layout and profile, and read it back."""
+    data = _waveform(rows)
+    nbytes = data.memory_usage(index=False).sum() / 1e6
+    time_ref = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+
+    print(f'{rows} rows ({nbytes:.1f} MB uncompressed)')
+    print(f'{"profile":>10} {"layout":>9} {"file MB":>8} {"ratio":>6} {"column s":>9} '
+          f'{"all s":>7}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in profiles:
+            for layout in ('compound', 'columnar'):
+                filename = os.path.join(tmp, f'{profile}-{layout}.h5')
+                with File.new(filename, time_reference=time_ref) as au_file:
+                    au_file.new_dataset('ecg', data, time_cols={'time'},
+                                        storage={'profile': profile, 'layout': layout})
+
+                column_times, all_times = [], []
+                with File.open(filename) as au_file:
+                    dataset = au_file['ecg']
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        dataset.to_numpy(columns='II')
+                        column_times.append(time.perf_counter() - start)
+
+                        start = time.perf_counter()
+                        dataset.to_numpy()
+                        all_times.append(time.perf_counter() - start)
+
+                size = os.path.getsize(filename) / 1e6
+                print(f'{profile:>10} {layout:>9} {size:>8.2f} {nbytes / size:>6.2f} '
+                      f'{min(column_times):>9.3f} {min(all_times):>7.3f}')
+
+
+def main():
+    """Run the layout benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark audata dataset layouts.')
+    parser.add_argument('--rows', type=int, default=2000000, help='Number of rows to write.')
+    args = parser.parse_args()
+    run(args.rows)
+
+
+if __name__ == '__main__':
+    main()
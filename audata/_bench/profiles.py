@@ -0,0 +1,76 @@
+"""
+Benchmark storage profiles: write and read throughput and file size per profile.
+
+Run with `python -m audata._bench.profiles [--rows N]`.
+"""
+import os
+import time
+import argparse
+import tempfile
+import datetime as dt
+
+import pandas as pd
+import numpy as np
+
+from audata import File
+from audata._storage import PROFILES
+
+
+def _waveform(rows: int, rate: float = 500.0) -> pd.DataFrame:
+    """Multi-channel waveform-like table."""
+    rng = np.random.default_rng(0)
+    phase = np.arange(rows) / rate
+    return pd.DataFrame(data={
+        'time': phase,
+        'II': np.round(np.sin(2 * np.pi * phase) + rng.normal(0, 0.05, rows), 3),
+        'III': np.round(np.cos(2 * np.pi * phase) + rng.normal(0, 0.05, rows), 3),
+        'V': np.round(rng.normal(0, 1, rows), 3),
+    })
+
+
+def run(rows: int, slices: int = 1000, slice_rows: int = 500):
+    """Write and read the same waveform with each storage profile."""
+    data = _waveform(rows)
+    nbytes = rows * 4 * 8 / 1e6
+    rng = np.random.default_rng(1)
+    starts = rng.integers(0, rows - slice_rows, slices)
+
+    print(f'{rows} rows ({nbytes:.1f} MB uncompressed), {slices} random reads of {slice_rows} rows')
+    print(f'{"profile":>14} {"chunk":>7} {"file MB":>8} {"write MB/s":>11} {"read MB/s":>10} '
+          f'{"slices/s":>9}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in PROFILES:
+            filename = os.path.join(tmp, f'{profile}.h5')
+            time_ref = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+            start = time.perf_counter()
+            with File.new(filename, time_reference=time_ref, storage=profile) as au_file:
+                au_file.new_dataset('ecg', data, time_cols={'time'})
+            write_time = time.perf_counter() - start
+
+            with File.open(filename) as au_file:
+                dataset = au_file['ecg']
+                chunk = dataset.hdf.chunks[0] if dataset.hdf.chunks is not None else '-'
+                start = time.perf_counter()
+                dataset.get(slice(None), raw=True)
+                read_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for row in starts:
+                    dataset.get(slice(row, row + slice_rows), raw=True)
+                slice_time = time.perf_counter() - start
+
+            size = os.path.getsize(filename) / 1e6
+            print(f'{profile:>14} {chunk:>7} {size:>8.2f} {nbytes / write_time:>11.1f} '
+                  f'{nbytes / read_time:>10.1f} {slices / slice_time:>9.0f}')
+
+
+def main():
+    """Run the storage profile benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark audata storage profiles.')
+    parser.add_argument('--rows', type=int, default=2000000, help='Number of rows to write.')
+    args = parser.parse_args()
+    run(args.rows)
+
+
+if __name__ == '__main__':
+    main()
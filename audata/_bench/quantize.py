@@ -0,0 +1,87 @@
+"""
+Benchmark scaled-integer storage of ADC-derived signals: float64 versus int16 counts.
+
+A 12-bit ADC waveform (a random walk over counts, at 5 V over 4096 counts) sampled at 500 Hz
+is stored as float64 values, as int16 counts with an inferred (lossless) gain, and as int16
+counts with a declared gain, with the default storage profile and the columnar layout,
+reporting the compression ratio of the signal, the decode throughput (reading it back as
+float64 values, and as raw counts) and the largest round-trip error.
+
+Run with `python -m audata._bench.quantize [--rows N]`.
+"""
+import os
+import time
+import argparse
+import tempfile
+
+import pandas as pd
+import numpy as np
+
+from audata import File
+
+# Volts per count of a 12-bit ADC with a 5 V range, in mV.
+GAIN = 5000 / 4096
+
+
+def _signal(rows: int, rate: float = 500.0) -> pd.DataFrame:
+    """A 12-bit ADC waveform, in mV."""
+    rng = np.random.default_rng(0)
+    counts = np.clip(np.cumsum(rng.integers(-4, 5, rows)), -2047, 2047)
+    return pd.DataFrame(data={'time': np.arange(rows) / rate, 'II': counts * GAIN})
+
+
+def _read(filename: str, counts: bool, repeat: int) -> float:
+    """Best time to read the signal, opening the file each time so that no chunk is cached."""
+    times = []
+    for _ in range(repeat):
+        with File.open(filename) as au_file:
+            dataset = au_file['signal']
+            start = time.perf_counter()
+            dataset.to_numpy(columns='II', counts=counts)
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(rows: int, repeat: int = 3):
+    """Store the same signal with each encoding, reporting size and decode speed."""
+    data = _signal(rows)
+    nbytes = rows * 8 / 1e6
+    print(f'{rows} samples ({nbytes:.1f} MB as float64)')
+    print(f'{"layout":>9} {"encoding":>9} {"file MB":>8} {"ratio":>7} {"values Mrows/s":>15} '
+          f'{"counts Mrows/s":>15} {"max error":>10}')
+    encodings = {
+        'float64': None,
+        'inferred': {'II': True},
+        'declared': {'II': {'gain': GAIN, 'dtype': 'int16', 'units': 'mV'}}
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage in ('default', 'columnar'):
+            for name, quantize in encodings.items():
+                # The time column is stored by sample rate, so the file mostly holds the signal.
+                filename = os.path.join(tmp, f'{name}-{storage}.h5')
+                with File.new(filename) as au_file:
+                    au_file.new_dataset('signal', data, sample_rate=500.0, storage=storage,
+                                        quantize=quantize)
+
+                values_time = _read(filename, False, repeat)
+                counts_time = _read(filename, True, repeat)
+                with File.open(filename) as au_file:
+                    decoded = au_file['signal'].to_numpy(columns='II')['II']
+                error = np.abs(decoded - data['II'].values).max()
+
+                size = os.path.getsize(filename) / 1e6
+                print(f'{storage:>9} {name:>9} {size:>8.2f} {nbytes / size:>7.1f} '
+                      f'{rows / values_time / 1e6:>15.1f} {rows / counts_time / 1e6:>15.1f} '
+                      f'{error:>10.2g}')
+
+
+def main():
+    """Run the quantized storage benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark audata quantized storage.')
+    parser.add_argument('--rows', type=int, default=2000000, help='Number of samples.')
+    args = parser.parse_args()
+    run(args.rows)
+
+
+if __name__ == '__main__':
+    main()
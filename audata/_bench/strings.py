@@ -0,0 +1,64 @@
+"""
+Benchmark string storage modes: fixed-length (compressed) versus variable-length strings.
+
+Run with `python -m audata._bench.strings [--rows N]`.
+"""
+import os
+import time
+import argparse
+import tempfile
+import datetime as dt
+
+import pandas as pd
+import numpy as np
+import lorem
+
+from audata import File
+
+
+def _notes(rows: int) -> pd.DataFrame:
+    """Annotation-like table of free text notes."""
+    sentences = [lorem.sentence() for _ in range(min(rows, 5000))]
+    return pd.DataFrame(data={
+        'time': np.arange(rows, dtype='f8'),
+        'note': [sentences[i % len(sentences)] for i in range(rows)]
+    })
+
+
+def run(rows: int, repeat: int = 3):
+    """Write and read the same table with each string mode, reporting size and read time."""
+    data = _notes(rows)
+    print(f'{rows} rows of notes')
+    print(f'{"mode":>6} {"dtype":>8} {"file MB":>9} {"write s":>9} {"read s":>9}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ('vlen', 'fixed'):
+            filename = os.path.join(tmp, f'{mode}.h5')
+            time_ref = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+            start = time.perf_counter()
+            with File.new(filename, time_reference=time_ref) as au_file:
+                au_file.new_dataset('notes', data, time_cols={'time'}, strings=mode)
+            write_time = time.perf_counter() - start
+
+            read_times = []
+            with File.open(filename) as au_file:
+                dtype = au_file['notes'].hdf.dtype['note']
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    au_file['notes'][:]
+                    read_times.append(time.perf_counter() - start)
+
+            size = os.path.getsize(filename) / 1e6
+            print(f'{mode:>6} {str(dtype):>8} {size:>9.2f} {write_time:>9.3f} '
+                  f'{min(read_times):>9.3f}')
+
+
+def main():
+    """Run the string storage benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark audata string storage modes.')
+    parser.add_argument('--rows', type=int, default=200000, help='Number of rows to write.')
+    args = parser.parse_args()
+    run(args.rows)
+
+
+if __name__ == '__main__':
+    main()
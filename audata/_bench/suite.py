@@ -0,0 +1,358 @@
+"""
+Benchmark suite for the main read, write, append and conversion paths.
+
+Synthetic waveform, vitals and annotation tables are generated (with fixed seeds) and each
+benchmark reports rows/s, MB/s (of in-memory data, or of CSV text for conversion) and the
+peak memory allocated while it runs. Results can be saved as JSON and compared across
+commits:
+
+    audata-bench --output before.json
+    audata-bench --output after.json
+    audata-bench --compare before.json after.json
+
+Peak memory is measured with `tracemalloc` in a separate, untimed run, so it covers
+allocations made through Python (including numpy and pandas buffers) but not those made
+inside the HDF5 library.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+import datetime as dt
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import h5py as h5
+import lorem
+
+import audata
+from audata import File
+from audata import _utils as utils
+from audata.bin import csv2audata
+from audata._bench.profiles import _waveform
+
+TIME_REFERENCE = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+
+# Rows of each dataset at scale 1.
+SIZES = {'waveform': 1000000, 'vitals': 100000, 'annotations': 10000}
+
+BENCHMARKS = ('create', 'read', 'slice', 'column', 'decode', 'append', 'stream', 'csv')
+
+# A benchmark prepares its inputs and returns (work, rows processed, bytes processed).
+Benchmark = Callable[['Case', str], Tuple[Callable[[], Any], int, float]]
+
+
+def vitals(rows: int) -> pd.DataFrame:
+    """Vital signs every 5 seconds with timestamps, integer and real values and a factor."""
+    rng = np.random.default_rng(1)
+    return pd.DataFrame(data={
+        'time': pd.date_range(TIME_REFERENCE, periods=rows, freq='5s'),
+        'HR': rng.integers(40, 180, rows),
+        'SpO2': np.round(rng.normal(96, 2, rows), 1),
+        'MAP': np.round(rng.normal(80, 10, rows), 1),
+        'source': pd.Categorical(rng.choice(['monitor', 'manual', 'device'], rows)),
+    })
+
+
+def annotations(rows: int) -> pd.DataFrame:
+    """Irregular free-text annotations with a label factor."""
+    rng = np.random.default_rng(2)
+    sentences = [lorem.sentence() for _ in range(min(rows, 1000))]
+    offsets = np.cumsum(rng.exponential(60, rows))
+    return pd.DataFrame(data={
+        'time': TIME_REFERENCE + pd.to_timedelta(offsets, unit='s'),
+        'label': pd.Categorical(rng.choice(['alarm', 'note', 'event', 'medication'], rows)),
+        'text': [sentences[i] for i in rng.integers(0, len(sentences), rows)],
+    })
+
+
+GENERATORS = {'waveform': _waveform, 'vitals': vitals, 'annotations': annotations}
+
+
+class Case:
+    """A synthetic dataset along with a file and CSV holding it."""
+
+    def __init__(self, name: str, rows: int, tmp: str):
+        self.name = name
+        self.rows = rows
+        self.data = GENERATORS[name](rows)
+        self.kwargs = {'time_cols': {'time'}} if name == 'waveform' else {}
+        self.row_bytes = self.data.memory_usage(index=False, deep=True).sum() / rows
+        self.filename = os.path.join(tmp, f'{name}.h5')
+        self.csv = os.path.join(tmp, f'{name}.csv')
+        with File.new(self.filename, time_reference=TIME_REFERENCE) as au_file:
+            au_file.new_dataset(name, self.data, **self.kwargs)
+        self.data.to_csv(self.csv, index=False)
+
+
+def _create(case: Case, tmp: str):
+    filename = os.path.join(tmp, 'create.h5')
+
+    def work():
+        with File.new(filename, overwrite=True, time_reference=TIME_REFERENCE) as au_file:
+            au_file.new_dataset(case.name, case.data, **case.kwargs)
+
+    return work, case.rows, case.rows * case.row_bytes
+
+
+def _read(case: Case, _):
+
+    def work():
+        with File.open(case.filename) as au_file:
+            _ = au_file[case.name][:]
+
+    return work, case.rows, case.rows * case.row_bytes
+
+
+def _slice(case: Case, _, slices: int = 200, slice_rows: int = 1000):
+    slice_rows = min(slice_rows, case.rows)
+    starts = np.random.default_rng(3).integers(0, case.rows - slice_rows + 1, slices)
+
+    def work():
+        with File.open(case.filename) as au_file:
+            dataset = au_file[case.name]
+            for start in starts:
+                _ = dataset[start:start + slice_rows]
+
+    return work, slices * slice_rows, slices * slice_rows * case.row_bytes
+
+
+def _column(case: Case, _):
+    col = case.data.columns[-1]
+    col_bytes = case.data[col].memory_usage(index=False, deep=True)
+
+    def work():
+        with File.open(case.filename) as au_file:
+            _ = au_file[case.name].get(columns=col)
+
+    return work, case.rows, col_bytes
+
+
+def _decode(case: Case, _):
+    # Only the conversion of records already in memory, with the time columns decoded
+    # both as times and as time deltas.
+    with File.open(case.filename) as au_file:
+        dataset = au_file[case.name]
+        recs, columns = dataset.hdf[:], dataset.columns
+    deltas = {col: {'type': 'timedelta'} if spec['type'] == 'time' else spec
+              for col, spec in columns.items()}
+
+    def work():
+        _ = utils.df_from_audata(recs, columns, TIME_REFERENCE, datetimes=True)
+        _ = utils.df_from_audata(recs, deltas, TIME_REFERENCE, datetimes=True)
+
+    return work, case.rows, case.rows * case.row_bytes
+
+
+def _batches(case: Case, rows: int = 20000, batch: int = 100) -> List[pd.DataFrame]:
+    data = case.data.iloc[:min(rows, case.rows)]
+    return [data.iloc[i:i + batch].copy() for i in range(0, len(data), batch)]
+
+
+def _append(case: Case, tmp: str):
+    filename = os.path.join(tmp, 'append.h5')
+    batches = _batches(case)
+    rows = sum(len(batch) for batch in batches)
+
+    def work():
+        with File.new(filename, overwrite=True, time_reference=TIME_REFERENCE) as au_file:
+            au_file.new_dataset(case.name, batches[0], **case.kwargs)
+            dataset = au_file[case.name]
+            for batch in batches[1:]:
+                dataset.append(batch, **case.kwargs)
+
+    return work, rows, rows * case.row_bytes
+
+
+def _stream(case: Case, tmp: str):
+    filename = os.path.join(tmp, 'stream.h5')
+    batches = _batches(case)
+    rows = sum(len(batch) for batch in batches)
+
+    def work():
+        with File.new(filename, overwrite=True, time_reference=TIME_REFERENCE) as au_file:
+            with au_file.stream_writer(case.name, **case.kwargs) as writer:
+                for batch in batches:
+                    writer.write(batch)
+
+    return work, rows, rows * case.row_bytes
+
+
+def _csv(case: Case, tmp: str):
+    filename = os.path.join(tmp, 'csv.h5')
+
+    def work():
+        with File.new(filename, overwrite=True, time_reference=TIME_REFERENCE) as au_file:
+            csv2audata._addcsv(au_file, case.name, case.csv)
+
+    return work, case.rows, os.path.getsize(case.csv)
+
+
+RUNNERS: Dict[str, Benchmark] = {
+    'create': _create,
+    'read': _read,
+    'slice': _slice,
+    'column': _column,
+    'decode': _decode,
+    'append': _append,
+    'stream': _stream,
+    'csv': _csv,
+}
+
+
+def _quiet(work: Callable[[], Any]) -> float:
+    """Run without printing, returning the elapsed time."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        work()
+        return time.perf_counter() - start
+
+
+def _peak_memory(work: Callable[[], Any]) -> int:
+    """Peak memory (bytes) traced while running."""
+    tracemalloc.start()
+    try:
+        _quiet(work)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _commit() -> Optional[str]:
+    """The git commit of the audata source, if known."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=os.path.dirname(audata.__file__), capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scale: float = 1.0,
+        datasets: Optional[List[str]] = None,
+        benchmarks: Optional[List[str]] = None,
+        repeat: int = 3) -> Dict[str, Any]:
+    """
+    Run the benchmark suite.
+
+    Args:
+        scale: Multiplier for the number of rows of each dataset (see `SIZES`).
+        datasets: Names of the datasets to benchmark (default all).
+        benchmarks: Names of the benchmarks to run (default all of `BENCHMARKS`).
+        repeat: Number of timed runs of each benchmark; the fastest is reported.
+
+    Returns:
+        Dictionary of the environment, parameters and list of results.
+    """
+    datasets = list(SIZES) if datasets is None else datasets
+    benchmarks = list(BENCHMARKS) if benchmarks is None else benchmarks
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in datasets:
+            case = Case(name, max(1, int(SIZES[name] * scale)), tmp)
+            for benchmark in benchmarks:
+                work, rows, nbytes = RUNNERS[benchmark](case, tmp)
+                seconds = min(_quiet(work) for _ in range(repeat))
+                peak = _peak_memory(work)
+                results.append({
+                    'dataset': name,
+                    'benchmark': benchmark,
+                    'rows': int(rows),
+                    'seconds': seconds,
+                    'rows_per_s': rows / seconds,
+                    'mb_per_s': nbytes / 1e6 / seconds,
+                    'peak_mb': peak / 1e6,
+                })
+                _print_result(results[-1])
+
+    return {
+        'commit': _commit(),
+        'time': dt.datetime.now(dt.timezone.utc).isoformat(),
+        'versions': {
+            'audata': audata.__VERSION__,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'h5py': h5.__version__,
+            'hdf5': h5.version.hdf5_version,
+        },
+        'params': {'scale': scale, 'repeat': repeat},
+        'results': results,
+    }
+
+
+def _print_result(result: Dict[str, Any]):
+    print(f'{result["dataset"]:>12} {result["benchmark"]:>8} {result["rows"]:>9} '
+          f'{result["rows_per_s"]:>12.0f} {result["mb_per_s"]:>9.1f} {result["peak_mb"]:>9.1f}')
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], threshold: float = 0.1) -> int:
+    """
+    Print the change in throughput and peak memory between two sets of results.
+
+    Args:
+        before: Baseline results, as returned by `run`.
+        after: New results.
+        threshold: Relative slowdown above which a benchmark is flagged as a regression.
+
+    Returns:
+        The number of regressions.
+    """
+    print(f'{before.get("commit")} -> {after.get("commit")}')
+    print(f'{"dataset":>12} {"bench":>8} {"rows/s before":>14} {"rows/s after":>13} '
+          f'{"change":>8} {"peak MB":>15}')
+    baseline = {(r['dataset'], r['benchmark']): r for r in before['results']}
+    regressions = 0
+    for result in after['results']:
+        old = baseline.get((result['dataset'], result['benchmark']))
+        if old is None:
+            continue
+        change = result['rows_per_s'] / old['rows_per_s'] - 1
+        flag = ''
+        if change < -threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f'{result["dataset"]:>12} {result["benchmark"]:>8} {old["rows_per_s"]:>14.0f} '
+              f'{result["rows_per_s"]:>13.0f} {change:>+8.0%} '
+              f'{old["peak_mb"]:>7.1f}->{result["peak_mb"]:<7.1f}{flag}')
+    return regressions
+
+
+def main():
+    """Run the benchmark suite, or compare two saved results."""
+    parser = argparse.ArgumentParser(description='Benchmark audata read, write and conversion.')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help=f'Multiplier for the dataset sizes {SIZES}.')
+    parser.add_argument('--datasets', nargs='+', choices=list(SIZES), help='Datasets to use.')
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, help='Benchmarks to run.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of timed runs; the fastest is reported.')
+    parser.add_argument('--output', type=str, help='Save the results as JSON.')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='Compare two JSON results instead of running.')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown reported as a regression when comparing.')
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            regressions = compare(json.load(before), json.load(after), args.threshold)
+        sys.exit(1 if regressions > 0 else 0)
+
+    print(f'{"dataset":>12} {"bench":>8} {"rows":>9} {"rows/s":>12} {"MB/s":>9} {"peak MB":>9}')
+    results = run(args.scale, args.datasets, args.benchmarks, args.repeat)
+    if args.output is not None:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark time encodings: float64 seconds versus int64 ticks at each time resolution.
+
+Regular (500 Hz) and irregular (jittered) timestamps in 2020 are stored with each encoding
+in a file whose time reference is the Unix epoch (the default without a `time_origin`),
+reporting the compression ratio of the time column, the decode throughput (reading it back
+as datetimes) and the largest round-trip error.
+
+Run with `python -m audata._bench.ticks [--rows N]`.
+"""
+import os
+import time
+import argparse
+import tempfile
+import datetime as dt
+
+import pandas as pd
+import numpy as np
+
+from audata import File
+from audata._utils import TIME_RESOLUTIONS
+
+TIME_REFERENCE = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def _times(rows: int, regular: bool, rate: float = 500.0) -> pd.DataFrame:
+    """Timestamps at `rate`, on average."""
+    rng = np.random.default_rng(0)
+    step = int(1e9 / rate)
+    steps = np.full(rows, step) if regular else rng.integers(step // 2, step * 3 // 2, rows)
+    start = pd.Timestamp('2020-01-01', tz='UTC')
+    return pd.DataFrame(data={'time': start + pd.to_timedelta(np.cumsum(steps), unit='ns')})
+
+
+def run(rows: int, repeat: int = 3):
+    """Store the same timestamps with each encoding, reporting size and decode speed."""
+    nbytes = rows * 8 / 1e6
+    print(f'{rows} timestamps ({nbytes:.1f} MB as float64 or int64)')
+    print(f'{"times":>9} {"encoding":>9} {"file MB":>8} {"ratio":>7} {"decode Mrows/s":>15} '
+          f'{"max error ns":>13}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for regular in (True, False):
+            data = _times(rows, regular)
+            for resolution in [None] + list(TIME_RESOLUTIONS):
+                name = resolution if resolution is not None else 'float64'
+                filename = os.path.join(tmp, f'{name}-{regular}.h5')
+                with File.new(filename, time_reference=TIME_REFERENCE) as au_file:
+                    au_file.new_dataset('times', data, time_resolution=resolution)
+
+                decode_times = []
+                with File.open(filename) as au_file:
+                    dataset = au_file['times']
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        decoded = dataset.to_numpy(columns='time', datetimes=True)['time']
+                        decode_times.append(time.perf_counter() - start)
+                error = np.abs(decoded.view('i8') - data['time'].values.view('i8')).max()
+
+                size = os.path.getsize(filename) / 1e6
+                print(f'{"regular" if regular else "irregular":>9} {name:>9} {size:>8.2f} '
+                      f'{nbytes / size:>7.1f} {rows / min(decode_times) / 1e6:>15.1f} '
+                      f'{error:>13}')
+
+
+def main():
+    """Run the time encoding benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark audata time encodings.')
+    parser.add_argument('--rows', type=int, default=2000000, help='Number of timestamps.')
+    args = parser.parse_args()
+    run(args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Columnar dataset layout helpers.
+
+Datasets stored with the 'columnar' layout (see `audata._storage`) are HDF5 groups holding
+one chunked dataset per column, in column order, instead of a single dataset of compound
+records. Each column is then compressed on its own, which suits the shuffle filter far
+better than interleaved fields, and reading a column only decompresses that column. The
+group carries the dataset `.meta` attribute as usual, plus a `.layout` attribute marking it
+as a columnar dataset.
+
+`Columns` wraps such a group in the parts of the `h5py.Dataset` interface used by audata,
+so that `audata.Dataset` (and its time index, summary and writer) work on either layout.
+"""
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import h5py as h5
+
+from audata import _utils as utils
+
+# Attribute marking a group as a columnar dataset, and its value.
+LAYOUT_ATTR = '.layout'
+COLUMNAR = 'columnar'
+
+
+def is_columnar(obj: h5.HLObject) -> bool:
+    """Whether an HDF5 object is a columnar dataset."""
+    return isinstance(obj, h5.Group) and obj.attrs.get(LAYOUT_ATTR) == COLUMNAR
+
+
+def is_columnar_path(loc: h5.Group, path: str) -> bool:
+    """Whether the group at `path` is a columnar dataset, without opening it."""
+    return h5.h5a.exists(loc.id, LAYOUT_ATTR.encode(), obj_name=path.encode())
+
+
+def create(parent: h5.Group, name: str, recs: np.ndarray, options: Dict[str, Any]
+          ) -> h5.Group:
+    """
+    Create a columnar dataset from records.
+
+    Args:
+        parent: The parent group.
+        name: Name (or path) of the new dataset.
+        recs: The converted records.
+        options: The `h5py.Group.create_dataset` keyword arguments of every column (see
+            `audata._storage.dataset_options`).
+
+    Returns:
+        The new group.
+    """
+    invalid = [col for col in recs.dtype.names if '/' in col or col in ('', '.')]
+    if len(invalid) > 0:
+        raise ValueError(f'Cannot store columns {invalid} with the columnar layout.')
+
+    group = parent.create_group(name, track_order=True)
+    group.attrs[LAYOUT_ATTR] = COLUMNAR
+    options = dict(options)
+    for col in recs.dtype.names:
+        column = group.create_dataset(col, data=recs[col], **options)
+        # Columns share chunk boundaries, so that rows are read a chunk at a time.
+        options['chunks'] = column.chunks
+    return group
+
+
+class Columns:
+    """
+    The columns of a columnar dataset, read and written as records. Provides the parts of
+    the `h5py.Dataset` interface used by audata.
+    """
+
+    def __init__(self, group: h5.Group):
+        self.group = group
+        self._load()
+
+    def _load(self):
+        """(Re)open the column datasets."""
+        self.columns = {col: self.group[col] for col in self.group}
+        self.dtype = np.dtype([(col, column.dtype) for col, column in self.columns.items()])
+
+    @property
+    def name(self) -> str:
+        """Path of the group."""
+        return self.group.name
+
+    @property
+    def parent(self) -> h5.Group:
+        """Parent group."""
+        return self.group.parent
+
+    @property
+    def file(self) -> h5.File:
+        """The HDF5 file."""
+        return self.group.file
+
+    @property
+    def attrs(self) -> h5.AttributeManager:
+        """Attributes of the group (e.g. `.meta`)."""
+        return self.group.attrs
+
+    @property
+    def chunks(self) -> Optional[tuple]:
+        """Chunk shape, shared by all columns."""
+        return next(iter(self.columns.values())).chunks if self.columns else None
+
+    @property
+    def shape(self) -> tuple:
+        """Dataset shape (rows,)."""
+        return next(iter(self.columns.values())).shape if self.columns else (0,)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, idx) -> Union[np.ndarray, np.void]:
+        return self.fields(list(self.dtype.names))[idx]
+
+    def __setitem__(self, idx, arr: np.ndarray):
+        for col, column in self.columns.items():
+            column[idx] = arr[col]
+
+    def fields(self, names: Union[str, List[str]]) -> '_Fields':
+        """Select columns to read, as `h5py.Dataset.fields`."""
+        return _Fields(self, names)
+
+    def read_direct(self, dest: np.ndarray, source_sel=None):
+        """Read rows into the fields of contiguous records, one column at a time."""
+        for col in dest.dtype.names:
+            self.columns[col].read_direct(dest[col], source_sel=source_sel)
+
+    def resize(self, shape: tuple):
+        """Resize every column."""
+        for column in self.columns.values():
+            column.resize(shape)
+
+    def refresh(self):
+        """Refresh every column (SWMR mode)."""
+        for column in self.columns.values():
+            column.refresh()
+
+    def retype(self, dtypes: Dict[str, np.dtype]):
+        """Rewrite columns as other dtypes (e.g. wider strings), see `utils.retype_values`."""
+        for col, dtype in dtypes.items():
+            column = self.columns[col]
+            names = list(self.group)
+            tmp = self.group.create_dataset(f'.{col}.retype',
+                                            shape=column.shape,
+                                            dtype=dtype,
+                                            chunks=column.chunks,
+                                            maxshape=column.maxshape,
+                                            compression=column.compression,
+                                            compression_opts=column.compression_opts,
+                                            shuffle=column.shuffle,
+                                            fletcher32=column.fletcher32)
+            step = column.chunks[0] * 64
+            for row in range(0, len(column), step):
+                tmp[row:row + step] = utils.retype_values(column[row:row + step], dtype)
+            # Keep the column order: the group tracks creation order, so move every
+            # following column after the rewritten one.
+            del self.group[col]
+            self.group.move(tmp.name, col)
+            for name in names[names.index(col) + 1:]:
+                self.group.move(name, f'.{name}.move')
+                self.group.move(f'.{name}.move', name)
+        self._load()
+
+    def __repr__(self):
+        return f'<columnar dataset "{self.name}": shape {self.shape}, {len(self.columns)} columns>'
+
+
+class _Fields:
+    """Columns selected for reading, as returned by `Columns.fields`."""
+
+    def __init__(self, columns: Columns, names: Union[str, List[str]]):
+        self._columns = columns
+        self._names = names
+
+    def __getitem__(self, idx) -> Union[np.ndarray, np.void]:
+        if isinstance(self._names, str):
+            return self._columns.columns[self._names][idx]
+
+        values = [self._columns.columns[col][idx] for col in self._names]
+        dtype = np.dtype([(col, self._columns.dtype[col]) for col in self._names])
+        recs = np.empty(np.shape(values[0]) if values else (0,), dtype=dtype)
+        for col, col_values in zip(self._names, values):
+            recs[col] = col_values
+        return recs[()] if recs.ndim == 0 else recs
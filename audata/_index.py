@@ -0,0 +1,178 @@
+"""
+Sparse time index helpers.
+
+Each indexed time column keeps one (min, max, sorted) entry per block of rows in a
+companion dataset (see `audata._utils.companion`), so range queries only need to read
+the blocks overlapping the requested window. Entries and bounds are in the stored units:
+float seconds, or int64 ticks for time columns stored as ticks (where blocks of missing
+times have min > max).
+"""
+from typing import Any, Optional, Tuple
+
+import numpy as np
+import h5py as h5
+
+from audata import _utils as utils
+
+INDEX_GROUP = 'index'
+DEFAULT_BLOCK = 4096
+INDEX_DTYPE = np.dtype([('min', 'f8'), ('max', 'f8'), ('sorted', '?')])
+TICKS_INDEX_DTYPE = np.dtype([('min', 'i8'), ('max', 'i8'), ('sorted', '?')])
+
+
+def present(times: np.ndarray) -> np.ndarray:
+    """Mask of the time values that are not missing."""
+    if times.dtype.kind == 'f':
+        return ~np.isnan(times)
+    return times != utils.MISSING_TICKS
+
+
+def block_rows(hdf: h5.Dataset) -> int:
+    """Number of rows summarized by each index entry (the HDF5 chunk length if chunked)."""
+    return hdf.chunks[0] if hdf.chunks is not None else DEFAULT_BLOCK
+
+
+def summarize(times: np.ndarray, block: int) -> np.ndarray:
+    """Summarize a run of time values, starting on a block boundary, into index entries."""
+    starts = np.arange(0, len(times), block)
+    ticks = times.dtype.kind in 'iu'
+    entries = np.empty(len(starts), dtype=TICKS_INDEX_DTYPE if ticks else INDEX_DTYPE)
+    if len(starts) == 0:
+        return entries
+
+    # Rows compare against their predecessor, except at block boundaries.
+    valid = present(times)
+    with np.errstate(invalid='ignore'):
+        ordered = np.ones(len(times), dtype=bool)
+        ordered[1:] = times[1:] >= times[:-1]
+    ordered[starts] = True
+    ordered &= valid
+
+    if ticks:
+        # Missing ticks are left out of the bounds.
+        limits = np.iinfo(times.dtype)
+        entries['min'] = np.minimum.reduceat(np.where(valid, times, limits.max), starts)
+        entries['max'] = np.maximum.reduceat(np.where(valid, times, limits.min), starts)
+    else:
+        entries['min'] = np.fmin.reduceat(times, starts)
+        entries['max'] = np.fmax.reduceat(times, starts)
+    entries['sorted'] = np.logical_and.reduceat(ordered, starts)
+    return entries
+
+
+def get(hdf: h5.Dataset, col: str) -> Optional[h5.Dataset]:
+    """Get the persisted index dataset for a column, if it exists."""
+    group = utils.companion(hdf)
+    if group is None or INDEX_GROUP not in group or col not in group[INDEX_GROUP]:
+        return None
+    return group[INDEX_GROUP][col]
+
+
+def build(hdf: h5.Dataset, col: str, block: Optional[int] = None) -> h5.Dataset:
+    """(Re)build and persist the index for a time column."""
+    if block is None:
+        block = block_rows(hdf)
+
+    group = utils.companion(hdf, create=True).require_group(INDEX_GROUP)
+    if col in group:
+        del group[col]
+
+    entries = compute(hdf, col, block)
+    index = group.create_dataset(col, data=entries, chunks=(1024,), maxshape=(None,))
+    index.attrs['.meta'] = utils.dict2json({'column': col, 'block': block})
+    return index
+
+
+def compute(hdf: h5.Dataset, col: str, block: int, start: int = 0, stop: Optional[int] = None
+           ) -> np.ndarray:
+    """Compute index entries for rows [start, stop), where start is on a block boundary."""
+    if stop is None:
+        stop = len(hdf)
+    parts = []
+    step = block * max(1, (1 << 20) // block)
+    for row in range(start, stop, step):
+        parts.append(summarize(hdf.fields(col)[row:min(row + step, stop)], block))
+    if len(parts) == 0:
+        return np.empty(0, dtype=TICKS_INDEX_DTYPE if hdf.dtype[col].kind in 'iu' else
+                        INDEX_DTYPE)
+    return np.concatenate(parts)
+
+
+def update(hdf: h5.Dataset, col: str, start: int, stop: Optional[int] = None):
+    """Refresh the persisted index after rows from `start` onward were written."""
+    index = get(hdf, col)
+    if index is None:
+        return
+    block = utils.json2dict(index.attrs['.meta'])['block']
+    first = start // block
+    entries = compute(hdf, col, block, first * block, stop)
+    index.resize((first + len(entries),))
+    index[first:] = entries
+
+
+def load(hdf: h5.Dataset, col: str) -> Tuple[int, np.ndarray, bool]:
+    """
+    Load the index for a column, computing it in memory if it was never persisted.
+
+    Returns:
+        Tuple of (block rows, index entries, whether the column is globally sorted).
+    """
+    index = get(hdf, col)
+    if index is None:
+        block = block_rows(hdf)
+        entries = compute(hdf, col, block)
+    else:
+        block = utils.json2dict(index.attrs['.meta'])['block']
+        entries = index[:]
+
+    is_sorted = bool(np.all(entries['sorted'])) and \
+        bool(np.all(entries['max'][:-1] <= entries['min'][1:]))
+    return block, entries, is_sorted
+
+
+def find_rows(hdf: h5.Dataset, col: str, lo: Optional[float], hi: Optional[float]
+             ) -> Tuple[Optional[slice], Optional[np.ndarray]]:
+    """
+    Find the rows whose time value `t` satisfies lo <= t < hi (either bound may be None).
+
+    Returns:
+        Tuple of (slice, None) when the column is sorted and the rows are contiguous, or
+        (None, row indices) otherwise.
+    """
+    block, entries, is_sorted = load(hdf, col)
+    nrow = len(hdf)
+    lo = -np.inf if lo is None else lo
+    hi = np.inf if hi is None else hi
+
+    if is_sorted:
+        # Binary search the block bounds, then the boundary blocks themselves.
+        def position(value):
+            blk = np.searchsorted(entries['max'], value, side='left')
+            if blk >= len(entries):
+                return nrow
+            start = blk * block
+            times = hdf.fields(col)[start:min(start + block, nrow)]
+            return start + int(np.searchsorted(times, value, side='left'))
+
+        start = 0 if lo == -np.inf else position(lo)
+        stop = nrow if hi == np.inf else position(hi)
+        return slice(start, max(start, stop)), None
+
+    # Unsorted: scan only the blocks whose [min, max] overlaps the window.
+    blocks = np.flatnonzero((entries['max'] >= lo) & (entries['min'] < hi))
+    rows = []
+    for run in np.split(blocks, np.flatnonzero(np.diff(blocks) != 1) + 1):
+        if len(run) == 0:
+            continue
+        start = run[0] * block
+        times = hdf.fields(col)[start:min((run[-1] + 1) * block, nrow)]
+        rows.append(start + np.flatnonzero((times >= lo) & (times < hi) & present(times)))
+    return None, np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+
+def span(entries: np.ndarray) -> Optional[Tuple[Any, Any]]:
+    """First and last time values covered by index entries, or None if all are missing."""
+    valid = entries['min'] <= entries['max']
+    if not np.any(valid):
+        return None
+    return entries['min'][valid].min(), entries['max'][valid].max()
@@ -0,0 +1,112 @@
+"""
+Memory-mapped access to contiguous datasets.
+
+Datasets stored with the 'contiguous' storage profile (see `audata._storage`) keep their
+records uncompressed in a single block of the file, so the block can be mapped into memory
+with `numpy.memmap` instead of being read through HDF5. Rows are then only read from disk
+as they are accessed, and the pages are shared by all processes mapping the same file.
+"""
+import datetime as dt
+from typing import Any, Dict, Optional
+
+import numpy as np
+import h5py as h5
+
+from audata import _utils as utils
+from audata import _sampling
+
+
+def records(hdf: h5.Dataset) -> np.ndarray:
+    """
+    Map the records of a contiguous dataset into memory (read-only).
+
+    Returns:
+        A `numpy.memmap` of the records as stored in the file (or an empty array if no
+        storage was allocated yet).
+    """
+    if hdf.chunks is not None:
+        raise ValueError(f'{hdf.name} is chunked; only datasets stored with the '
+                         '"contiguous" storage profile can be memory mapped.')
+    if hdf.file.driver not in ('sec2', 'stdio'):
+        raise ValueError(f'Cannot memory map datasets of files opened with the '
+                         f'"{hdf.file.driver}" driver.')
+
+    dtype = hdf.id.get_type().dtype
+    vlen = [col for col in dtype.names or () if dtype[col].kind == 'O']
+    if len(vlen) > 0:
+        raise ValueError(f'Cannot memory map {hdf.name}: variable-length columns {vlen} are '
+                         'stored on the heap (store them as fixed-length strings instead).')
+
+    # The mapping reads the file itself, so anything still in HDF5's cache must be written.
+    if hdf.file.mode != 'r':
+        hdf.file.flush()
+    offset = hdf.id.get_offset()
+    if offset is None or len(hdf) == 0:
+        return np.empty(hdf.shape, dtype=dtype)
+    return np.memmap(hdf.file.filename, dtype=dtype, mode='r', offset=offset, shape=hdf.shape)
+
+
+class MappedColumn:
+    """
+    A column of a memory-mapped dataset, converted as in `Dataset.to_numpy` only when rows
+    are selected from it. The stored values (e.g. integer counts) are available, without
+    copying, as `raw`.
+    """
+
+    def __init__(self,
+                 raw: Optional[np.ndarray],
+                 spec: Dict[str, Any],
+                 time_ref: dt.datetime,
+                 datetimes: bool,
+                 sampling: Optional[Dict[str, Any]] = None,
+                 nrow: Optional[int] = None):
+        self.raw = raw
+        self.type = spec['type']
+        self.resolution = spec.get('resolution')
+        self.gain, self.offset = spec.get('gain'), spec.get('offset')
+        self.levels = np.array(spec['levels']) if self.type == 'factor' else None
+        self._time_ref = time_ref
+        self._datetimes = datetimes
+        self._sampling = sampling
+        self._nrow = len(raw) if raw is not None else nrow
+
+    def __len__(self) -> int:
+        return self._nrow
+
+    @property
+    def shape(self):
+        """Number of rows, as a tuple."""
+        return (self._nrow,)
+
+    def __getitem__(self, idx) -> np.ndarray:
+        if self.raw is None:
+            values = _sampling.times_for_rows(self._sampling, utils.index_rows(idx, self._nrow))
+            if isinstance(idx, (int, np.integer)):
+                values = values[0]
+        else:
+            values = self.raw[idx]
+
+        if self.type in ('time', 'timedelta'):
+            # Copy, as the mapping is read-only and the conversion is done in place.
+            time_ref = self._time_ref if self.type == 'time' else None
+            if self.resolution is not None:
+                values = np.array(values, dtype='i8', ndmin=1)
+                values = utils.decode_ticks(values, self.resolution, time_ref, self._datetimes)
+            else:
+                values = np.array(values, dtype='f8', ndmin=1)
+                values = utils.decode_seconds(values, time_ref, self._datetimes)
+            return values if not isinstance(idx, (int, np.integer)) else values[0]
+        elif self.gain is not None:
+            values = utils.decode_counts(np.atleast_1d(values), self.gain, self.offset)
+            return values if not isinstance(idx, (int, np.integer)) else values[0]
+        elif self.type == 'string':
+            return utils.decode_strings(values) if isinstance(values, np.ndarray) else \
+                values.decode('utf-8')
+        return values
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+    def __repr__(self):
+        return f'MappedColumn({self.type}, {self._nrow} rows)'
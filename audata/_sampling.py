@@ -0,0 +1,111 @@
+"""
+Uniform sampling helpers.
+
+Uniformly sampled datasets do not store a time column. Instead the dataset `.meta` holds
+the sample rate and a list of segments, each a pair of (first row, time offset of that
+row). A new segment starts wherever there is a gap (or any other break in the sampling
+grid), so the time of row `i` is `offset + (i - row) / rate` for the segment containing it.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Number of samples first compared to the grid of a segment (see `segments_from_times`).
+GRID_WINDOW = 1024
+
+
+def segments_from_times(times: np.ndarray,
+                        rate: float,
+                        first_row: int = 0,
+                        expected: Optional[float] = None) -> List[List[float]]:
+    """
+    Find the segments describing a run of sample times.
+
+    A new segment starts wherever a sample is off the grid of the current segment
+    (`offset + (i - row) / rate`) by more than half a period, whether after a gap or as the
+    clock drifts from the declared rate, so that every time is rebuilt to within half a
+    period.
+
+    Args:
+        times: Sample time offsets.
+        rate: Sample rate (Hz).
+        first_row: Row number of the first sample.
+        expected: Time at which the first sample would continue an existing segment, if
+            any. No segment is started at the first sample if it falls on this time.
+
+    Returns:
+        List of [row, offset] segments.
+    """
+    if len(times) == 0:
+        return []
+
+    half = 0.5 / rate
+    breaks = []
+    if expected is None or abs(times[0] - expected) > half:
+        breaks.append(0)
+        row, offset = 0, float(times[0])
+    else:
+        row, offset = 0, expected
+
+    # Compare windows of samples to the grid, doubling the window while no sample is off it,
+    # so that long segments are checked in few steps and short ones without rescanning.
+    pos, window = row + 1, GRID_WINDOW
+    while pos < len(times):
+        end = min(pos + window, len(times))
+        grid = offset + (np.arange(pos, end) - row) / rate
+        off = np.flatnonzero(np.abs(times[pos:end] - grid) > half)
+        if len(off) == 0:
+            pos, window = end, window * 2
+        else:
+            row = pos + int(off[0])
+            offset = float(times[row])
+            breaks.append(row)
+            pos, window = row + 1, GRID_WINDOW
+    return [[first_row + i, float(times[i])] for i in breaks]
+
+
+def times_for_rows(sampling: Dict[str, Any], rows: np.ndarray) -> np.ndarray:
+    """Compute the time offsets of the given rows."""
+    seg_rows, seg_offsets = _unzip(sampling)
+    seg = np.searchsorted(seg_rows, rows, side='right') - 1
+    return seg_offsets[seg] + (rows - seg_rows[seg]) / sampling['rate']
+
+
+def next_time(sampling: Dict[str, Any], nrow: int) -> Optional[float]:
+    """Time offset at which a sample appended after `nrow` rows continues the last segment."""
+    if len(sampling['segments']) == 0:
+        return None
+    row, offset = sampling['segments'][-1]
+    return offset + (nrow - row) / sampling['rate']
+
+
+def rows_in_range(sampling: Dict[str, Any], nrow: int, lo: Optional[float],
+                  hi: Optional[float]) -> Tuple[Optional[slice], Optional[np.ndarray]]:
+    """
+    Find the rows whose time `t` satisfies lo <= t < hi using only index arithmetic.
+
+    Returns:
+        Tuple of (slice, None) if the rows are contiguous, or (None, row indices) otherwise.
+    """
+    seg_rows, seg_offsets = _unzip(sampling)
+    seg_ends = np.append(seg_rows[1:], nrow).astype(np.int64)
+    rate = sampling['rate']
+
+    # Sample k of a segment is at offset + k / rate; clip the window to each segment.
+    first = np.zeros(len(seg_rows)) if lo is None else np.ceil((lo - seg_offsets) * rate - 1e-9)
+    last = seg_ends - seg_rows if hi is None else np.ceil((hi - seg_offsets) * rate - 1e-9)
+    starts = seg_rows + np.clip(first, 0, seg_ends - seg_rows).astype(np.int64)
+    stops = seg_rows + np.clip(last, 0, seg_ends - seg_rows).astype(np.int64)
+
+    keep = stops > starts
+    starts, stops = starts[keep], stops[keep]
+    if len(starts) == 0:
+        return slice(0, 0), None
+    if np.all(starts[1:] == stops[:-1]):
+        return slice(int(starts[0]), int(stops[-1])), None
+    return None, np.unique(np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)]))
+
+
+def _unzip(sampling: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    segments = np.array(sampling['segments'], dtype='f8').reshape((-1, 2))
+    return segments[:, 0].astype(np.int64), segments[:, 1]
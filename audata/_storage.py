@@ -0,0 +1,149 @@
+"""
+Dataset storage profiles (chunking and compression).
+
+A profile is either the name of one of the predefined `PROFILES` or a dictionary with any
+of the keys below, optionally extending a predefined profile named by its `profile` key:
+
+    chunk_bytes: Target size of each HDF5 chunk in bytes, from which the number of rows
+        per chunk is computed. If None, h5py's heuristic is used.
+    chunk_rows: Explicit number of rows per chunk (overrides `chunk_bytes`).
+    compression: HDF5 compression filter ('gzip', 'lzf', or None).
+    compression_opts: Compression options (the gzip level).
+    shuffle: Whether to use the byte shuffle filter.
+    fletcher32: Whether to store checksums.
+    contiguous: Whether to store the records uncompressed in a single block instead of in
+        chunks, so that the dataset can be memory mapped (see `Dataset.memmap`). Such
+        datasets cannot grow, so they cannot be appended to.
+    layout: 'compound' to store the records in one dataset, or 'columnar' to store each
+        column in its own dataset of a group (see `audata._columnar`), where chunks hold
+        `chunk_bytes` of the widest column.
+"""
+from typing import Any, Dict, Union
+
+import numpy as np
+
+PROFILES = {
+    # The original audata settings.
+    'default': {
+        'chunk_bytes': None,
+        'compression': 'gzip',
+        'compression_opts': None,
+        'shuffle': True,
+        'fletcher32': True,
+        'contiguous': False,
+        'layout': 'compound',
+    },
+    # Large, highly compressed chunks for long-term storage.
+    'archive': {
+        'chunk_bytes': 1 << 20,
+        'compression': 'gzip',
+        'compression_opts': 9,
+        'shuffle': True,
+        'fletcher32': True,
+        'contiguous': False,
+        'layout': 'compound',
+    },
+    # Small chunks with fast decompression for reading short slices.
+    'random-access': {
+        'chunk_bytes': 16 << 10,
+        'compression': 'lzf',
+        'compression_opts': None,
+        'shuffle': True,
+        'fletcher32': False,
+        'contiguous': False,
+        'layout': 'compound',
+    },
+    # Moderate chunks with cheap compression for frequent appends.
+    'streaming': {
+        'chunk_bytes': 64 << 10,
+        'compression': 'gzip',
+        'compression_opts': 1,
+        'shuffle': True,
+        'fletcher32': False,
+        'contiguous': False,
+        'layout': 'compound',
+    },
+    # Uncompressed records in a single block, for memory-mapped reads of hot datasets.
+    'contiguous': {
+        'chunk_bytes': None,
+        'compression': None,
+        'compression_opts': None,
+        'shuffle': False,
+        'fletcher32': False,
+        'contiguous': True,
+        'layout': 'compound',
+    },
+    # One dataset per column, each compressed on its own and read without the others.
+    'columnar': {
+        'chunk_bytes': 256 << 10,
+        'compression': 'gzip',
+        'compression_opts': None,
+        'shuffle': True,
+        'fletcher32': True,
+        'contiguous': False,
+        'layout': 'columnar',
+    },
+}
+
+LAYOUTS = ('compound', 'columnar')
+
+
+def resolve(storage: Union[str, Dict[str, Any], None]) -> Dict[str, Any]:
+    """Resolve a storage profile name or dictionary to a complete profile."""
+    if storage is None:
+        storage = 'default'
+    if isinstance(storage, str):
+        storage = {'profile': storage}
+    if not isinstance(storage, dict):
+        raise ValueError(f'Invalid storage profile: {storage}')
+
+    base = storage.get('profile', 'default')
+    if base not in PROFILES:
+        raise ValueError(f'Unknown storage profile "{base}", expected one of {list(PROFILES)}')
+    unknown = set(storage) - set(PROFILES[base]) - {'profile', 'chunk_rows'}
+    if len(unknown) > 0:
+        raise ValueError(f'Unknown storage profile options: {sorted(unknown)}')
+    profile = {**PROFILES[base], **storage}
+    if profile['layout'] not in LAYOUTS:
+        raise ValueError(f'Unknown layout "{profile["layout"]}", expected one of {LAYOUTS}')
+    return profile
+
+
+def dataset_options(storage: Union[str, Dict[str, Any], None], dtype: np.dtype
+                   ) -> Dict[str, Any]:
+    """
+    Get the `h5py.Group.create_dataset` keyword arguments for a storage profile.
+
+    Args:
+        storage: The storage profile.
+        dtype: The record dtype, used to size chunks.
+
+    Returns:
+        Dictionary of keyword arguments (of each column, for the columnar layout).
+    """
+    profile = resolve(storage)
+    if profile['contiguous'] and profile['layout'] == 'columnar':
+        raise ValueError('Columnar datasets cannot be stored contiguously.')
+    if profile['contiguous']:
+        filters = [opt for opt in ('compression', 'shuffle', 'fletcher32') if profile[opt]]
+        if len(filters) > 0 or profile.get('chunk_rows') is not None:
+            raise ValueError(f'Contiguous datasets cannot be chunked or filtered: {filters}')
+        return {}
+
+    if profile.get('chunk_rows') is not None:
+        chunks = (int(profile['chunk_rows']),)
+    elif profile['chunk_bytes'] is not None:
+        itemsize = dtype.itemsize if profile['layout'] == 'compound' else \
+            max((dtype[col].itemsize for col in dtype.names or ()), default=1)
+        chunks = (max(1, int(profile['chunk_bytes']) // max(1, itemsize)),)
+    else:
+        chunks = True
+
+    return {
+        'chunks': chunks,
+        'maxshape': (None,),
+        'compression': profile['compression'],
+        'compression_opts': profile['compression_opts'],
+        'shuffle': profile['shuffle'],
+        'fletcher32': profile['fletcher32'],
+    }
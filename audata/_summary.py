@@ -0,0 +1,218 @@
+"""
+Multi-resolution summary (pyramid) helpers.
+
+Summarized datasets keep, in their companion group (see `audata._utils.companion`), one
+dataset per level with the min, max, mean and count of every numeric column over fixed
+buckets of rows. Level 0 buckets hold `base` rows and each following level merges `factor`
+buckets of the level below, so a zoomed-out view of any window can be drawn from a few
+thousand entries instead of all of its rows. Levels are added as the dataset grows.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import h5py as h5
+
+from audata import _utils as utils
+from audata import _sampling
+
+SUMMARY_GROUP = 'summary'
+DEFAULT_BASE = 64
+DEFAULT_FACTOR = 4
+STATS = np.dtype([('min', 'f8'), ('max', 'f8'), ('mean', 'f8'), ('count', 'i8')])
+
+# Rows (or lower level entries) processed at a time, to bound memory.
+STEP_ENTRIES = 1 << 14
+
+
+def summary_dtype(columns: List[str]) -> np.dtype:
+    """Entry dtype holding the statistics of each column."""
+    return np.dtype([(col, STATS) for col in columns])
+
+
+def summarizable(dataset: 'Dataset') -> List[str]:
+    """
+    The columns that can be summarized: all but factors, strings, and complex columns
+    (which have no order, and whose imaginary part would be dropped).
+    """
+    return [col for col, spec in dataset.columns.items()
+            if spec['type'] not in ('factor', 'string', 'complex')]
+
+
+def reduce(values: Dict[str, np.ndarray], bucket: int) -> np.ndarray:
+    """Summarize rows, starting on a bucket boundary, into entries of `bucket` rows."""
+    nrow = len(next(iter(values.values()))) if len(values) > 0 else 0
+    starts = np.arange(0, nrow, bucket)
+    entries = np.empty(len(starts), dtype=summary_dtype(list(values)))
+    if len(starts) == 0:
+        return entries
+
+    for col, col_values in values.items():
+        col_values = col_values.astype('f8', copy=False)
+        present = ~np.isnan(col_values)
+        count = np.add.reduceat(present, starts)
+        total = np.add.reduceat(np.where(present, col_values, 0.0), starts)
+        entries[col]['min'] = np.fmin.reduceat(col_values, starts)
+        entries[col]['max'] = np.fmax.reduceat(col_values, starts)
+        entries[col]['count'] = count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            entries[col]['mean'] = total / count
+    return entries
+
+
+def merge(entries: np.ndarray, factor: int) -> np.ndarray:
+    """Merge entries, starting on a boundary of the next level, `factor` at a time."""
+    starts = np.arange(0, len(entries), factor)
+    merged = np.empty(len(starts), dtype=entries.dtype)
+    if len(starts) == 0:
+        return merged
+
+    for col in entries.dtype.names:
+        stats = entries[col]
+        count = np.add.reduceat(stats['count'], starts)
+        total = np.add.reduceat(np.where(stats['count'] > 0, stats['mean'] * stats['count'], 0.0),
+                                starts)
+        merged[col]['min'] = np.fmin.reduceat(stats['min'], starts)
+        merged[col]['max'] = np.fmax.reduceat(stats['max'], starts)
+        merged[col]['count'] = count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            merged[col]['mean'] = total / count
+    return merged
+
+
+def read(dataset: 'Dataset', columns: List[str], start: int, stop: int
+        ) -> Dict[str, np.ndarray]:
+    """
+    Read the stored values (e.g. time offsets, in seconds) of rows [start, stop), computing
+    the time column of a uniformly sampled signal.
+    """
+    sampling = dataset.sampling
+    virtual = sampling['time_column'] if sampling is not None else None
+    stored = [col for col in columns if col != virtual]
+    rec = dataset.hdf.fields(stored)[start:stop] if len(stored) > 0 else None
+    cols = dataset.columns
+    values = {}
+    for col in columns:
+        if col == virtual:
+            values[col] = _sampling.times_for_rows(sampling, np.arange(start, stop))
+        elif 'resolution' in cols[col]:
+            # Summarize times stored as ticks in seconds, as any other time column.
+            values[col] = utils.stored_seconds(rec[col], cols[col])
+        elif 'gain' in cols[col]:
+            values[col] = utils.decode_counts(rec[col], cols[col]['gain'], cols[col]['offset'])
+        else:
+            values[col] = rec[col]
+    return values
+
+
+def get(hdf: h5.Dataset) -> Optional[h5.Group]:
+    """Get the persisted summary group of a dataset, if it exists."""
+    group = utils.companion(hdf)
+    if group is None or SUMMARY_GROUP not in group:
+        return None
+    return group[SUMMARY_GROUP]
+
+
+def meta(group: h5.Group) -> Dict[str, Any]:
+    """The summary parameters: columns, base bucket rows and factor between levels."""
+    return utils.json2dict(group.attrs['.meta'])
+
+
+def build(dataset: 'Dataset',
+          columns: Optional[List[str]] = None,
+          base: int = DEFAULT_BASE,
+          factor: int = DEFAULT_FACTOR) -> h5.Group:
+    """(Re)build and persist the summary pyramid of a dataset."""
+    allowed = summarizable(dataset)
+    if columns is None:
+        columns = allowed
+    else:
+        columns = list(dict.fromkeys(dataset.time_columns + list(columns)))
+        invalid = [col for col in columns if col not in allowed]
+        if len(invalid) > 0:
+            raise ValueError(f'Cannot summarize columns: {invalid}')
+    if base < 1 or factor < 2:
+        raise ValueError(f'Invalid summary base ({base}) or factor ({factor}).')
+
+    companion = utils.companion(dataset.hdf, create=True)
+    if SUMMARY_GROUP in companion:
+        del companion[SUMMARY_GROUP]
+    group = companion.create_group(SUMMARY_GROUP)
+    group.attrs['.meta'] = utils.dict2json({'columns': columns, 'base': base, 'factor': factor})
+    update(dataset, 0, dataset.nrow)
+    return group
+
+
+def update(dataset: 'Dataset', start: int, stop: Optional[int] = None):
+    """Refresh the persisted summary after rows from `start` up to `stop` were written."""
+    group = get(dataset.hdf)
+    if group is None:
+        return
+    params = meta(group)
+    columns, base, factor = params['columns'], params['base'], params['factor']
+    if stop is None:
+        stop = dataset.nrow
+
+    first = start // base
+    step = base * STEP_ENTRIES
+    _write_level(group, 0, first, columns,
+                 (reduce(read(dataset, columns, row, min(row + step, stop)), base)
+                  for row in range(first * base, stop, step)))
+
+    # Refresh the affected entries of each level, and add levels while the top one has
+    # more than `factor` entries (except in SWMR mode, where no dataset can be created).
+    level = 1
+    grow = not dataset.hdf.file.swmr_mode
+    while str(level) in group or (grow and len(group[str(level - 1)]) > factor):
+        first //= factor
+        below = group[str(level - 1)]
+        step = factor * STEP_ENTRIES
+        _write_level(group, level, first, columns,
+                     (merge(below[row:min(row + step, len(below))], factor)
+                      for row in range(first * factor, len(below), step)))
+        level += 1
+
+
+def _write_level(group: h5.Group, level: int, first: int, columns: List[str],
+                 parts: Iterable[np.ndarray]):
+    """Replace the entries of a level from `first` onward."""
+    name = str(level)
+    if name not in group:
+        group.create_dataset(name, shape=(0,), dtype=summary_dtype(columns), chunks=(1024,),
+                             maxshape=(None,))
+    entries = group[name]
+    entries.resize((min(first, len(entries)),))
+    for part in parts:
+        start = len(entries)
+        entries.resize((start + len(part),))
+        entries[start:] = part
+
+
+def load(dataset: 'Dataset', start: int, stop: int, max_points: int
+        ) -> Tuple[int, int, np.ndarray]:
+    """
+    Load summary entries covering rows [start, stop), from the finest level with at most
+    `max_points` entries in the window. Rows are summarized one per entry if there are no
+    more than `max_points` of them, and on the fly if the dataset has no summary.
+
+    Returns:
+        Tuple of (rows per entry, first row of the first entry, entries).
+    """
+    group = get(dataset.hdf)
+    columns = summarizable(dataset) if group is None else meta(group)['columns']
+    if stop - start <= max_points:
+        return 1, start, reduce(read(dataset, columns, start, stop), 1)
+
+    if group is None:
+        bucket = -(-(stop - start) // max_points)
+        step = bucket * max(1, STEP_ENTRIES * DEFAULT_BASE // bucket)
+        parts = [reduce(read(dataset, columns, row, min(row + step, stop)), bucket)
+                 for row in range(start, stop, step)]
+        return bucket, start, np.concatenate(parts)
+
+    params = meta(group)
+    level, bucket = 0, params['base']
+    while str(level + 1) in group and \
+            -(-stop // bucket) - start // bucket > max_points:
+        level, bucket = level + 1, bucket * params['factor']
+    first = start // bucket
+    return bucket, first * bucket, group[str(level)][first:-(-stop // bucket)]
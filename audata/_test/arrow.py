@@ -0,0 +1,55 @@
+""" Script to test importing Parquet files with factors into an audata file."""
+import os
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from audata import File
+from audata.dataset import Dataset
+
+if __name__ == '__main__':
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'alerts.parquet')
+
+    # Two row groups whose dictionaries differ: 'Dog' is code 0 of the first and 1 of the
+    # second, and the second brings a new level.
+    first = pa.table({
+        'value': np.arange(4, dtype='f8'),
+        'animal': pa.array(['Dog', 'Cat', 'Dog', None]).dictionary_encode()
+    })
+    second = pa.table({
+        'value': np.arange(4, 8, dtype='f8'),
+        'animal': pa.array(['Liger', 'Dog', 'Liger', 'Cat']).dictionary_encode()
+    })
+    with pq.ParquetWriter(path, first.schema) as writer:
+        writer.write_table(first)
+        writer.write_table(second)
+    expected = pq.read_table(path).to_pandas()['animal'].astype(object)
+
+    f = File.new(os.path.join(tmp, 'test.h5'), overwrite=True)
+    reader = pq.ParquetFile(path).iter_batches(batch_size=4)
+    dataset = Dataset.from_arrow(f, 'alerts', reader)
+    animals = dataset[:]['animal'].astype(object)
+    assert animals.equals(expected), animals
+    assert dataset.columns['animal']['levels'] == ['Dog', 'Cat', 'Liger']
+
+    # Round trip through Arrow, keeping the levels and their order even when the batches
+    # do not hold every level.
+    f['alerts'].meta = {
+        **f['alerts'].meta, 'columns': {
+            **f['alerts'].meta['columns'], 'animal': {
+                **f['alerts'].columns['animal'], 'levels': ['Liger', 'Dog', 'Cat'],
+                'ordered': True, 'comment': 'Species.'
+            }
+        }
+    }
+    batches = list(f['alerts'].iter_arrow(rows=1))
+    copy = Dataset.from_arrow(f, 'copy', batches)
+    assert copy.columns['animal']['levels'] == ['Liger', 'Dog', 'Cat']
+    assert copy.columns['animal']['ordered']
+    assert copy.columns['animal']['comment'] == 'Species.'
+    assert copy[:]['animal'].astype(object).equals(f['alerts'][:]['animal'].astype(object))
+    f.close()
+    print('ok')
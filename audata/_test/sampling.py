@@ -0,0 +1,43 @@
+""" Script to test that uniformly sampled signals give back their sample times."""
+import os
+import tempfile
+
+import pandas as pd
+import numpy as np
+
+from audata import File
+from audata.dataset import Dataset
+
+if __name__ == '__main__':
+    f = File.new(os.path.join(tempfile.mkdtemp(), 'test.h5'), overwrite=True)
+    half = 0.5 / 500
+
+    def offsets(dataset):
+        """The time offsets of a dataset, rebuilt from its segments."""
+        return dataset.to_numpy(columns='time', datetimes=False)['time'] - \
+            f.time_reference.timestamp()
+
+    # A gap starts a new segment.
+    times = np.concatenate([np.arange(1000), 5000 + np.arange(1000)]) / 500
+    gappy = Dataset.new(f, 'gappy', pd.DataFrame(data={'time': times, 'II': np.arange(2000.0)}),
+                        time_cols={'time'}, sample_rate=500.0)
+    assert gappy.sampling['segments'] == [[0, 0.0], [1000, 10.0]]
+    assert np.abs(offsets(gappy) - times).max() < 1e-6
+
+    # Ten minutes sampled at 499 Hz but declared at 500 Hz: the clock drifts from the
+    # declared rate, so segments are started to keep every time within half a period.
+    times = np.arange(600 * 499) / 499
+    drifting = Dataset.new(f, 'drifting',
+                           pd.DataFrame(data={'time': times, 'II': np.zeros(len(times))}),
+                           time_cols={'time'}, sample_rate=500.0)
+    assert len(drifting.sampling['segments']) > 1
+    assert np.abs(offsets(drifting) - times).max() <= half
+
+    # Appended rows are checked against the grid of the last segment.
+    more = 600 + np.arange(60 * 499) / 499
+    drifting.append(pd.DataFrame(data={'time': more, 'II': np.zeros(len(more))}),
+                    time_cols={'time'})
+    read = offsets(drifting)
+    assert np.abs(read - np.concatenate([times, more])).max() <= half
+    f.close()
+    print('ok')
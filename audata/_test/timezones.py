@@ -0,0 +1,45 @@
+""" Script to test that times round-trip in a local time zone other than UTC."""
+import os
+import time
+import tempfile
+
+# The local time zone must be set before any time is converted.
+os.environ['TZ'] = 'America/New_York'
+time.tzset()
+
+import pandas as pd
+import numpy as np
+
+from audata import File
+from audata.dataset import Dataset
+from audata._utils import time_offset, time_tick
+
+if __name__ == '__main__':
+    f = File.new(os.path.join(tempfile.mkdtemp(), 'test.h5'), overwrite=True)
+
+    # Without a time origin, times are offsets from the (naive) Unix epoch, which is UTC.
+    meta = f.file_meta
+    del meta['time_origin']
+    f.file_meta = meta
+    assert f.time_reference.tzinfo is None
+
+    times = pd.Series(pd.date_range('2020-07-01', periods=100, freq='250ms'))
+    f['naive'] = pd.DataFrame(data={'time': times, 'value': np.arange(100)})
+    f['aware'] = pd.DataFrame(data={'time': times.dt.tz_localize('UTC'),
+                                    'value': np.arange(100)})
+    for name in ('naive', 'aware'):
+        offsets = f[name].hdf['time']
+        assert np.allclose(offsets, times.values.astype('i8') / 1e9), name
+        # Seconds since 1970 as float64 are precise to about a microsecond.
+        error = f[name][:]['time'].values - times.values
+        assert (np.abs(error) < np.timedelta64(1, 'us')).all(), name
+
+    # Ticks at a time resolution, and single timestamps.
+    ticks = Dataset.new(f, 'ticks_ms', pd.DataFrame(data={'time': times}), time_resolution='ms')
+    assert (ticks.hdf['time'] == times.values.astype('i8') // 10**6).all()
+    assert (ticks[:]['time'].values == times.values).all()
+    assert time_offset(times[1], f.time_reference) == times[1].timestamp()
+    assert time_offset(times[1].timestamp(), f.time_reference) == times[1].timestamp()
+    assert time_tick(times[1].timestamp(), f.time_reference, 'ms') == times[1].value // 10**6
+    f.close()
+    print('ok')
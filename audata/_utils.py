@@ -1,161 +1,299 @@
 """Helper utilities."""
 import datetime as dt
 import json
-from typing import Optional, Dict, Any, AbstractSet, Tuple, Union
+from typing import Optional, Dict, Any, AbstractSet, Tuple, Union, List
 
 import pandas as pd
 import numpy as np
 import h5py as h5
 import jsbeautifier as jsb
 
+# Strings are stored as fixed-length UTF-8 bytes (which, unlike variable-length strings,
+# are compressed) unless the fixed width would exceed this many bytes.
+FIXED_STRING_MAX = 1024
+STRING_MODES = ('auto', 'fixed', 'vlen')
+
+# Time columns may be stored as int64 ticks at one of these resolutions (ticks per second)
+# instead of float64 seconds, with this value marking missing times (as NaT does).
+TIME_RESOLUTIONS = {'ms': 10**3, 'us': 10**6, 'ns': 10**9}
+MISSING_TICKS = np.iinfo('i8').min
+
+# Real columns may be stored as integer counts of one of these types, with a gain and offset
+# (value = counts * gain + offset). The smallest value of the type marks missing values.
+QUANTIZED_DTYPES = ('i2', 'i4')
+QUANTIZE_KEYS = ('gain', 'offset', 'dtype', 'units', 'inferred')
+
+# Metadata is beautified for readability unless its JSON is longer than this (e.g. the
+# segments of a gappy signal), where beautifying would dominate the cost of every append.
+BEAUTIFY_MAX = 1 << 16
+
 
 def df_from_audata(rec,
                    columns: Dict[str, Any],
                    time_ref: Optional[dt.datetime] = None,
                    datetimes: bool = True) -> pd.DataFrame:
-    """Create a pandas DataFrame from an audata Dataset."""
-
-    data = pd.DataFrame(data=rec)
-    for col in columns:
+    """
+    Create a pandas DataFrame from an audata Dataset.
 
-        col_meta = columns[col]
+    Times and time deltas are decoded with integer arithmetic on whole columns (see
+    `decode_seconds`), without creating a Python object per value, and integer counts are
+    scaled to values (see `decode_counts`) the same way.
+    """
+    names = rec.dtype.names if isinstance(rec, np.ndarray) else list(rec)
+    data = {}
+    for col in names:
+        values = rec[col]
+        col_meta = columns.get(col, {})
+        col_type = col_meta.get('type')
 
-        if col_meta['type'] == 'factor':
-            data[col] = pd.Categorical.from_codes(data[col].values, col_meta['levels'])
+        if col_type == 'factor':
+            values = pd.Categorical.from_codes(values, col_meta['levels'])
 
-        elif col_meta['type'] == 'time':
+        elif col_type == 'time':
 
             if time_ref is None:
                 raise Exception('Cannot read timestamps without reference!')
 
-            # If datetimes were requested, convert the time column into a seconds time delta and add it to the time ref
+            # If datetimes were requested, convert the offsets to datetimes in the zone of
+            # the time reference, otherwise to Unix timestamps.
+            resolution = col_meta.get('resolution')
             if datetimes:
-                data[col] = time_ref + pd.to_timedelta(data[col], unit='s')
-
+                values = decode_times(values, time_ref, resolution)
+            elif resolution is not None:
+                values = decode_ticks(np.array(values, dtype='i8'), resolution, time_ref)
             else:
-                data[col] += time_ref.timestamp()
-        elif col_meta['type'] == 'timedelta':
-            data[col] = data[col].values * dt.timedelta(seconds=1)
-    return data
+                values = values + utc_reference(time_ref).timestamp()
+        elif col_type == 'timedelta':
+            values = decode_seconds(np.array(values, dtype='f8'), datetimes=True)
+        elif 'gain' in col_meta:
+            values = decode_counts(np.asarray(values), col_meta['gain'], col_meta['offset'])
+        elif col_type == 'string':
+            # Fixed-length strings (and, with h5py 3, variable-length strings) are read
+            # as UTF-8 bytes.
+            if len(values) > 0 and isinstance(values[0], bytes):
+                values = pd.Series(values).str.decode('utf-8').values
+        data[col] = values
+    return pd.DataFrame(data=data, columns=list(names))
+
+
+def decode_times(values: np.ndarray, time_ref: dt.datetime, resolution: Optional[str] = None
+                ) -> pd.DatetimeIndex:
+    """
+    Convert stored time offsets (seconds, or ticks at `resolution`) to timezone-aware
+    datetimes, in the zone of the time reference, without creating a Python object per value.
+    """
+    if resolution is not None:
+        nanos = decode_ticks(np.array(values, dtype='i8'), resolution, time_ref, datetimes=True)
+    else:
+        nanos = decode_seconds(np.array(values, dtype='f8'), time_ref, datetimes=True)
+    return pd.DatetimeIndex(nanos).tz_localize('UTC').tz_convert(time_ref.tzinfo)
+
+
+def utc_reference(time_ref: dt.datetime) -> dt.datetime:
+    """The time reference as an aware datetime, taking a naive reference to be UTC."""
+    if time_ref.tzinfo is None:
+        return time_ref.replace(tzinfo=dt.timezone.utc)
+    return time_ref
+
+
+def fixed_string_width(nbytes: int) -> int:
+    """Width to store fixed-length strings of up to `nbytes` bytes, leaving room to grow."""
+    return max(8, 1 << (max(nbytes, 1) - 1).bit_length())
+
+
+def encode_strings(values: Union[pd.Series, np.ndarray], mode: str = 'auto') -> np.ndarray:
+    """
+    Encode strings for storage.
+
+    Args:
+        values: The strings. Missing values are stored as empty strings.
+        mode: 'fixed' to store fixed-length UTF-8 bytes, which can be compressed; 'vlen' to
+            store variable-length strings; or 'auto' to store fixed-length strings unless
+            they would be wider than `FIXED_STRING_MAX` bytes.
+
+    Returns:
+        Array of fixed-length bytes or variable-length strings.
+    """
+    if mode not in STRING_MODES:
+        raise ValueError(f'Unknown string storage mode "{mode}", expected one of {STRING_MODES}')
+
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'S' and mode != 'vlen':
+        return values
+
+    strings = pd.Series(values).fillna('').astype(str)
+    if mode != 'vlen':
+        encoded = np.array([value.encode('utf-8') for value in strings.values], dtype='S')
+        width = fixed_string_width(encoded.itemsize)
+        if mode == 'fixed' or width <= FIXED_STRING_MAX:
+            return encoded.astype(f'S{width}')
+    return strings.values.astype(h5.string_dtype())
+
+
+def is_string_dtype(dtype) -> bool:
+    """Whether a (numpy or pandas) dtype holds strings."""
+    return dtype == h5.string_dtype() or isinstance(dtype, pd.StringDtype) or \
+        getattr(dtype, 'kind', None) in ('S', 'U')
 
 
 def audata_from_df(data: pd.DataFrame,
                    time_ref: Optional[dt.datetime] = None,
                    time_cols: Optional[AbstractSet[str]] = None,
-                   timedelta_cols: Optional[AbstractSet[str]] = None
+                   timedelta_cols: Optional[AbstractSet[str]] = None,
+                   strings: Union[str, Dict[str, str]] = 'auto',
+                   time_resolution: Union[str, Dict[str, str], None] = None,
+                   quantize: Union[bool, str, Dict[str, Any], None] = None
                   ) -> Tuple[Dict[str, Any], np.recarray]:
-    """Create the recarray and meta from a DataFrame to be stored to the audata file."""
-
-    if time_cols is None:
-        time_cols = set({})
-    if timedelta_cols is None:
-        timedelta_cols = set({})
-    cols = list(data)
-    columns = {}
-    dtype_map = {}
-    for col in cols:
-        col_meta = {}
-        col_dtype = data[col].dtype
-
-        if col_dtype == h5.string_dtype():
-            # String d-type has to be set explicitely or HDF5 won't accept it. Default to
-            # variable-length strings, although in the future we might want to support fixed-
-            # length strings which can be compressed (vlen strings are NOT compressed).
-            dtype_map[col] = h5.string_dtype()
-            col_meta['type'] = 'string'
-        elif col_dtype.name == 'category':
-            col_meta['type'] = 'factor'
-            col_meta['levels'] = list(data[col].cat.categories)
-            col_meta['ordered'] = data[col].cat.ordered
-            data[col] = data[col].cat.codes
-        elif col_dtype.kind in ['i', 'u']:
-            col_meta['type'] = 'integer'
-            col_meta['signed'] = col_dtype.kind == 'i'
-        elif col_dtype.kind == 'M':
-            if time_ref is None:
-                raise (Exception('Cannot convert timestamps without time reference!'))
-
-            col_meta['type'] = 'time'
-            if type(data[col].dtype) == type(np.array([1]).dtype):
-                print("Default timezone not provided - Localizing to UTC")
-                data[col] = data[col].dt.tz_localize(tz='UTC')
-            
-            data[col] = (data[col].dt.tz_convert(time_ref.tzinfo) -
-                         time_ref).dt.total_seconds()
-        elif col_dtype.kind == 'm':
-            col_meta['type'] = 'timedelta'
-            data[col] = data[col].dt.total_seconds()
-        elif col in time_cols:
-            # Assume offset from reference in appropriate units.
-            col_meta['type'] = 'time'
-            dtype_map[col] = 'f8'
-        elif col in timedelta_cols:
-            # Assume delta in appropriate units.
-            col_meta['type'] = 'timedelta'
-            dtype_map[col] = 'f8'
-        else:
-            typenames = {'b': 'boolean', 'f': 'real', 'c': 'complex'}
-            col_meta['type'] = typenames[col_dtype.kind]
-        columns[col] = col_meta
-
-    meta = {'columns': columns}
-    rec = data.to_records(index=False, column_dtypes=dtype_map)
-    return meta, rec
+    """
+    Create the recarray and meta from a DataFrame to be stored to the audata file, as in
+    `encode_records`.
+    """
+    return encode_records(data, time_ref, time_cols, timedelta_cols, strings, time_resolution,
+                          quantize)
 
 
 def audata_from_arr(arr: Union[np.ndarray, np.recarray],
                     time_ref: Optional[dt.datetime] = None,
                     time_cols: Optional[AbstractSet[str]] = None,
-                    timedelta_cols: Optional[AbstractSet[str]] = None
+                    timedelta_cols: Optional[AbstractSet[str]] = None,
+                    strings: Union[str, Dict[str, str]] = 'auto',
+                    time_resolution: Union[str, Dict[str, str], None] = None,
+                    quantize: Union[bool, str, Dict[str, Any], None] = None
                    ) -> Tuple[Dict[str, Any], np.recarray]:
-    """Create the recarray and meta from a recarray or ndarray to be stored to the audata file."""
+    """
+    Create the recarray and meta from a recarray or ndarray to be stored to the audata file,
+    as in `encode_records`. Note that `datetime64` values are taken to be in the time zone
+    of the time reference.
+    """
+    return encode_records(arr, time_ref, time_cols, timedelta_cols, strings, time_resolution,
+                          quantize)
+
+
+def encode_records(data: Union[pd.DataFrame, np.ndarray],
+                   time_ref: Optional[dt.datetime] = None,
+                   time_cols: Optional[AbstractSet[str]] = None,
+                   timedelta_cols: Optional[AbstractSet[str]] = None,
+                   strings: Union[str, Dict[str, str]] = 'auto',
+                   time_resolution: Union[str, Dict[str, str], None] = None,
+                   quantize: Union[bool, str, Dict[str, Any], None] = None
+                  ) -> Tuple[Dict[str, Any], np.recarray]:
+    """
+    Convert a DataFrame or record array to the records and meta to be stored, without
+    modifying it.
+
+    The column types are inferred first (encoding string columns, whose width is needed),
+    then the records are allocated once and filled one column at a time, so that peak
+    memory stays close to one copy of the output.
+
+    Args:
+        data: The data.
+        time_ref: The file time reference, needed to store timestamps.
+        time_cols: Numeric columns holding time offsets (seconds) from the time reference.
+        timedelta_cols: Numeric columns holding time deltas (seconds).
+        strings: The storage mode of string columns, either a mode accepted by
+            `encode_strings` or a dictionary of modes by column.
+        time_resolution: Store time columns as int64 ticks at this resolution ('ms', 'us'
+            or 'ns'), or a dictionary of resolutions by column, instead of float64 seconds.
+        quantize: Store real columns as integer counts with a gain and offset: True (or
+            'auto') to do so for every float column whose values can be stored losslessly,
+            or a dictionary of quantizations (see `quantization`) by column.
 
-    # Issue 4: Factor types are not supported in this mode. Also not supported: non-string objects.
+    Returns:
+        Tuple of (meta, records).
+    """
     if time_cols is None:
         time_cols = set({})
     if timedelta_cols is None:
-        time_cols = set({})
-    cols = arr.dtype.names
-    columns = {}
+        timedelta_cols = set({})
+    frame = isinstance(data, pd.DataFrame)
+    cols = list(data.columns) if frame else list(data.dtype.names)
+
+    columns, dtypes, encoded = {}, [], {}
     for col in cols:
-        col_meta = {}
-        col_dtype = arr.dtype[col]
+        values = data[col]
+        col_dtype = values.dtype
+        dtype = np.dtype('f8')
 
-        if col_dtype.kind == 'M':
+        if is_string_dtype(col_dtype):
+            # String d-type has to be set explicitely or HDF5 won't accept it. Prefer fixed-
+            # length strings, which can be compressed (vlen strings are NOT compressed).
+            mode = strings.get(col, 'auto') if isinstance(strings, dict) else strings
+            encoded[col] = encode_strings(values, mode)
+            dtype = encoded[col].dtype
+            col_meta = {'type': 'string'}
+        elif isinstance(col_dtype, pd.CategoricalDtype):
+            col_meta = {
+                'type': 'factor',
+                'levels': list(values.cat.categories),
+                'ordered': bool(values.cat.ordered)
+            }
+            dtype = values.cat.codes.dtype
+        elif col_dtype.kind == 'M':
             if time_ref is None:
-                raise (Exception('Cannot convert timestamps without time reference!'))
-
-            # Note: Since numpy datetime64 types are not timezone aware, we must
-            # assume the datetimes use the same timezone.
-            col_meta['type'] = 'time'
-            arr[col] = (arr[col] - np.datetime64(time_ref.replace(tzinfo=None))) / np.timedelta64(1, 's')
+                raise Exception('Cannot convert timestamps without time reference!')
+            if frame and values.dt.tz is None:
+                print("Default timezone not provided - Localizing to UTC")
+            col_meta = {'type': 'time'}
         elif col_dtype.kind == 'm':
-            col_meta['type'] = 'timedelta'
-            arr[col] = arr[col] / np.timedelta64(1, 's')
-        elif col_dtype == h5.string_dtype():
-            if h5.check_vlen_dtype(col_dtype) != str:
-                arr[col] = arr[col].astype(h5.string_dtype())
-            col_meta['type'] = 'string'
+            col_meta = {'type': 'timedelta'}
         elif col in time_cols:
             # Assume offset from reference in appropriate units.
-            col_meta['type'] = 'time'
-            if col_dtype.type != 'f':
-                arr[col] = arr[col].astype('f8')
+            col_meta = {'type': 'time'}
         elif col in timedelta_cols:
             # Assume delta in appropriate units.
-            col_meta['type'] = 'timedelta'
-            if col_dtype.type != 'f':
-                arr[col] = arr[col].astype('f8')
+            col_meta = {'type': 'timedelta'}
         elif col_dtype.kind in ['i', 'u']:
-            col_meta['type'] = 'integer'
-            col_meta['signed'] = col_dtype.kind == 'i'
+            col_meta = {'type': 'integer', 'signed': col_dtype.kind == 'i'}
+            dtype = col_dtype
         else:
             typenames = {'b': 'boolean', 'f': 'real', 'c': 'complex'}
-            col_meta['type'] = typenames[col_dtype.kind]
+            col_meta = {'type': typenames[col_dtype.kind]}
+            dtype = col_dtype
+
+        resolution = time_resolution.get(col) if isinstance(time_resolution, dict) else \
+            time_resolution
+        if col_meta['type'] == 'time' and resolution is not None:
+            if resolution not in TIME_RESOLUTIONS:
+                raise ValueError(f'Unknown time resolution "{resolution}", expected one of '
+                                 f'{list(TIME_RESOLUTIONS)}')
+            col_meta['resolution'] = resolution
+            dtype = np.dtype('i8')
+
+        spec = quantize.get(col) if isinstance(quantize, dict) else quantize
+        if spec is not None and spec is not False:
+            if col_meta['type'] in ('real', 'integer') and \
+                    (col_dtype.kind == 'f' or isinstance(quantize, dict)):
+                quantized, counts_dtype = quantization(values, spec)
+                if counts_dtype is not None:
+                    col_meta = {'type': 'real', **quantized}
+                    dtype = counts_dtype
+                else:
+                    col_meta.update(quantized)
+            elif isinstance(quantize, dict):
+                raise ValueError(f'Cannot quantize {col_meta["type"]} column {col}.')
         columns[col] = col_meta
+        dtypes.append((str(col), dtype))
+
+    rec = np.empty(len(data), dtype=dtypes)
+    for col, (name, _) in zip(cols, dtypes):
+        values = data[col]
+        col_type = columns[col]['type']
+        if col in encoded:
+            rec[name] = encoded.pop(col)
+        elif col_type == 'factor':
+            rec[name] = values.cat.codes.values
+        elif col_type == 'time' and 'resolution' in columns[col]:
+            rec[name] = time_ticks(values, time_ref, columns[col]['resolution'])
+        elif 'gain' in columns[col]:
+            rec[name] = encode_counts(values, columns[col], rec.dtype[name])
+        elif col_type == 'time':
+            rec[name] = time_offsets(values, time_ref)
+        elif col_type == 'timedelta':
+            rec[name] = timedelta_seconds(values)
+        else:
+            rec[name] = values
 
     meta = {'columns': columns}
-    return meta, arr
+    return meta, rec.view(np.recarray)
 
 # Makes a best effort to determine column type based only on dtype. Returns a
 # dict containing keys 'type' and, if applicable, 'signed'.
@@ -167,7 +305,7 @@ def get_coltype_from_dtype_only(dtype) -> Dict[str, Any]:
         return { 'type': 'time' }
     elif dtype.kind == 'm':
         return { 'type': 'timedelta' }
-    elif dtype == h5.string_dtype():
+    elif dtype == h5.string_dtype() or dtype.kind == 'S':
         return { 'type': 'string' }
     elif dtype.kind == 'i':
         return {
@@ -188,20 +326,500 @@ def get_coltype_from_dtype_only(dtype) -> Dict[str, Any]:
     else:
         raise Exception('Unrecognized column type.')
 
+def time_offset(value: Any, time_ref: dt.datetime) -> Optional[float]:
+    """
+    Convert a timestamp to a time offset (seconds) from the file time reference.
+
+    Datetime-like values (including strings) are converted directly, assuming UTC if they
+    are naive. Numeric values are treated as Unix timestamps, matching what is returned when
+    datetimes are not requested.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (dt.datetime, np.datetime64, str)):
+        stamp = pd.Timestamp(value)
+        ref = pd.Timestamp(time_ref)
+        if stamp.tzinfo is None:
+            stamp = stamp.tz_localize('UTC')
+        if ref.tzinfo is None:
+            ref = ref.tz_localize('UTC')
+        return (stamp - ref).total_seconds()
+    return float(value) - utc_reference(time_ref).timestamp()
+
+
+def time_offsets(values: Union[pd.Series, np.ndarray], time_ref: dt.datetime) -> np.ndarray:
+    """
+    Convert a column of timestamps to time offsets (seconds) from the file time reference.
+
+    Numeric values are assumed to already be offsets, as for `time_cols`.
+    """
+    nanos = offset_nanos(values, time_ref)
+    if nanos is not None:
+        offsets = nanos / 1e9
+        offsets[nanos == MISSING_TICKS] = np.nan
+        return offsets
+    return np.asarray(values).astype('f8')
+
+
+def offset_nanos(values: Union[pd.Series, np.ndarray], time_ref: dt.datetime
+                ) -> Optional[np.ndarray]:
+    """
+    Convert a column of datetimes to integer time offsets (nanoseconds) from the file time
+    reference, with whole-array integer arithmetic. Missing times are `MISSING_TICKS`.
+
+    Naive times in a pandas Series are taken to be UTC, while numpy `datetime64` values are
+    taken to be in the time zone of the time reference. A naive time reference is taken to
+    be UTC.
+
+    Returns:
+        The offsets, or None if the values are not datetimes.
+    """
+    if isinstance(values, pd.Series) and values.dtype.kind == 'M':
+        ref = utc_reference(time_ref).astimezone(dt.timezone.utc).replace(tzinfo=None)
+        values = values.values
+    else:
+        ref = time_ref.replace(tzinfo=None)
+        values = np.asarray(values)
+        if values.dtype.kind != 'M':
+            return None
+    nanos = np.asarray(values).astype('M8[ns]', copy=False).view('i8')
+    offsets = nanos - np.datetime64(ref, 'ns').astype('i8')
+    offsets[nanos == MISSING_TICKS] = MISSING_TICKS
+    return offsets
+
+
+def time_ticks(values: Union[pd.Series, np.ndarray], time_ref: dt.datetime, resolution: str
+              ) -> np.ndarray:
+    """
+    Convert a column of timestamps to int64 ticks at a time resolution from the file time
+    reference, rounding to the nearest tick. Missing times are `MISSING_TICKS`.
+
+    Numeric values are assumed to be offsets in seconds, as for `time_cols`.
+    """
+    per_second = TIME_RESOLUTIONS[resolution]
+    nanos = offset_nanos(values, time_ref)
+    if nanos is not None:
+        unit = 10**9 // per_second
+        ticks = (nanos + unit // 2) // unit
+        ticks[nanos == MISSING_TICKS] = MISSING_TICKS
+        return ticks
+
+    seconds = np.asarray(values, dtype='f8')
+    missing = np.isnan(seconds)
+    with np.errstate(invalid='ignore'):
+        ticks = np.rint(seconds * per_second).astype('i8')
+    ticks[missing] = MISSING_TICKS
+    return ticks
+
+
+def time_tick(value: Any, time_ref: dt.datetime, resolution: str) -> Optional[int]:
+    """
+    Convert a timestamp, as in `time_offset`, to the first tick at or after it at a time
+    resolution.
+    """
+    if value is None:
+        return None
+    per_second = TIME_RESOLUTIONS[resolution]
+    if isinstance(value, (dt.datetime, np.datetime64, str)):
+        stamp = pd.Timestamp(value)
+        ref = pd.Timestamp(time_ref)
+        if stamp.tzinfo is None:
+            stamp = stamp.tz_localize('UTC')
+        if ref.tzinfo is None:
+            ref = ref.tz_localize('UTC')
+        return -(-(stamp - ref).value // (10**9 // per_second))
+    reference = utc_reference(time_ref).timestamp()
+    return int(np.ceil(np.round((float(value) - reference) * per_second, 3)))
+
+
+def stored_seconds(values: np.ndarray, col_meta: Dict[str, Any]) -> np.ndarray:
+    """Convert the stored values of a time column (seconds or ticks) to float64 seconds."""
+    resolution = col_meta.get('resolution')
+    if resolution is None:
+        return np.asarray(values).astype('f8', copy=False)
+    values = np.asarray(values)
+    seconds = values / TIME_RESOLUTIONS[resolution]
+    seconds[values == MISSING_TICKS] = np.nan
+    return seconds
+
+
+def timedelta_seconds(values: Union[pd.Series, np.ndarray]) -> np.ndarray:
+    """Convert a column of time deltas to seconds. Numeric values are assumed to be seconds."""
+    values = np.asarray(values)
+    if values.dtype.kind == 'm':
+        return values / np.timedelta64(1, 's')
+    return values.astype('f8')
+
+
+def quantization(values: Union[pd.Series, np.ndarray], spec: Union[bool, str, Dict[str, Any]]
+                ) -> Tuple[Dict[str, Any], Optional[np.dtype]]:
+    """
+    Resolve how a column is to be stored as integer counts.
+
+    Args:
+        values: The column.
+        spec: True (or 'auto') to infer the gain and offset, or a dictionary with the `gain`,
+            `offset` (default 0), `dtype` ('int16' or 'int32', by default the smallest
+            holding the counts) and `units` of the column. The gain and offset are inferred
+            if no gain is given. `inferred` marks a given gain and offset as inferred, as
+            when appending to a column whose gain was.
+
+    Returns:
+        Tuple of (column specification entries, stored dtype). The entries record whether
+        the gain and offset were `inferred`. Inferred gains and offsets must give back every
+        value exactly; if none do, the dtype is None and the column is stored as is.
+    """
+    if spec is True or spec == 'auto':
+        spec = {}
+    elif not isinstance(spec, dict):
+        raise ValueError(f'Invalid quantization {spec!r}, expected True, "auto" or a '
+                         'dictionary.')
+    unknown = [key for key in spec if key not in QUANTIZE_KEYS]
+    if len(unknown) > 0:
+        raise ValueError(f'Unknown quantization options {unknown}, expected any of '
+                         f'{list(QUANTIZE_KEYS)}.')
+    dtypes = [np.dtype(dtype) for dtype in QUANTIZED_DTYPES]
+    if spec.get('dtype') is not None:
+        if np.dtype(spec['dtype']) not in dtypes:
+            raise ValueError(f'Cannot store counts as {spec["dtype"]}, expected one of '
+                             f'{list(QUANTIZED_DTYPES)}.')
+        dtypes = [np.dtype(spec['dtype'])]
+    col_meta = {'units': str(spec['units'])} if spec.get('units') is not None else {}
+
+    if spec.get('gain') is None:
+        if spec.get('offset') is not None:
+            raise ValueError('A quantization offset requires a gain.')
+        inferred = infer_quantization(values, dtypes)
+        if inferred is None:
+            return col_meta, None
+        gain, offset, dtype = inferred
+        return {'gain': gain, 'offset': offset, 'inferred': True, **col_meta}, dtype
+
+    gain, offset = float(spec['gain']), float(spec.get('offset') or 0.0)
+    if not np.isfinite(gain) or gain <= 0 or not np.isfinite(offset):
+        raise ValueError(f'Invalid quantization gain ({gain}) or offset ({offset}).')
+    counts = np.rint((np.asarray(values, dtype='f8') - offset) / gain)
+    counts = counts[~np.isnan(counts)]
+    lowest, highest = counts.min(initial=0), counts.max(initial=0)
+    fits = [dtype for dtype in dtypes
+            if np.iinfo(dtype).min < lowest and highest <= np.iinfo(dtype).max]
+    if len(fits) == 0:
+        raise ValueError(f'Counts from {lowest:g} to {highest:g} (gain {gain:g}, offset '
+                         f'{offset:g}) do not fit in {dtypes[-1]}.')
+    return {'gain': gain, 'offset': offset, 'inferred': bool(spec.get('inferred', False)),
+            **col_meta}, fits[0]
+
+
+def infer_quantization(values: Union[pd.Series, np.ndarray], dtypes: List[np.dtype]
+                      ) -> Optional[Tuple[float, float, np.dtype]]:
+    """
+    Find a gain and offset storing a float column losslessly as counts of one of `dtypes`.
+
+    Candidate gains are the most common step between successive distinct values, that step
+    rounded to the precision of the values, and the range over the number of steps; candidate
+    offsets are zero and the middle of the range. A candidate is only used if decoding the
+    counts (as `decode_counts` does) gives back every distinct value exactly, at the precision
+    of the column.
+
+    Returns:
+        Tuple of (gain, offset, dtype), or None if no candidate is lossless.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind != 'f':
+        return None
+    present = values[~np.isnan(values)]
+    if len(present) == 0 or not np.isfinite(present).all():
+        return None
+    levels = np.unique(present)
+    exact = levels.astype('f8')
+    lo, hi = float(exact[0]), float(exact[-1])
+    if len(levels) == 1:
+        gains = [1.0]
+    else:
+        steps, counts = np.unique(np.diff(exact), return_counts=True)
+        step = float(steps[np.argmax(counts)])
+        if (hi - lo) / step > np.iinfo(dtypes[-1]).max:
+            return None
+        # Steps between large values are only exact to the precision left at their scale.
+        digits = np.finfo(values.dtype).precision - int(np.log10(max(-lo, hi) / step))
+        gains = [step, float(f'{step:.{max(digits, 1)}g}'), (hi - lo) / round((hi - lo) / step)]
+
+    for gain in dict.fromkeys(gains):
+        if not np.isfinite(gain) or gain <= 0 or (hi - lo) / gain > np.iinfo(dtypes[-1]).max:
+            continue
+        middle = float(f'{lo + round((hi - lo) / gain / 2) * gain:.12g}')
+        for offset in dict.fromkeys([0.0, middle]):
+            counts = np.rint((exact - offset) / gain)
+            fits = [dtype for dtype in dtypes
+                    if np.iinfo(dtype).min < counts[0] and counts[-1] <= np.iinfo(dtype).max]
+            if len(fits) > 0 and np.array_equal(
+                    decode_counts(counts.astype(fits[0]), gain, offset).astype(levels.dtype),
+                    levels):
+                return gain, offset, fits[0]
+    return None
+
+
+def encode_counts(values: Union[pd.Series, np.ndarray], col_meta: Dict[str, Any],
+                  dtype: np.dtype) -> np.ndarray:
+    """
+    Convert a column to integer counts, rounding to the nearest count. Missing (NaN) values
+    become the smallest value of `dtype`.
+
+    Values are only rounded if the gain and offset were declared: if they were `inferred`
+    (to store the column losslessly), values they do not give back exactly raise an error.
+    """
+    values = np.asarray(values)
+    counts = values.astype('f8') - col_meta['offset']
+    counts /= col_meta['gain']
+    np.rint(counts, out=counts)
+    info = np.iinfo(dtype)
+    missing = np.isnan(counts)
+    with np.errstate(invalid='ignore'):
+        outside = ~missing & ((counts <= info.min) | (counts > info.max))
+    if outside.any():
+        raise ValueError(f'{np.count_nonzero(outside)} values are outside the range of '
+                         f'{dtype} counts (gain {col_meta["gain"]:g}, offset '
+                         f'{col_meta["offset"]:g}).')
+    counts[missing] = info.min
+    counts = counts.astype(dtype)
+    if col_meta.get('inferred', False):
+        # Compare at the precision of the values, as `infer_quantization` does.
+        decoded = decode_counts(counts, col_meta['gain'], col_meta['offset'])
+        inexact = ~missing & (decoded.astype(values.dtype) != values)
+        if inexact.any():
+            raise ValueError(f'{np.count_nonzero(inexact)} values (e.g. '
+                             f'{values[inexact][0]:g}) cannot be stored exactly with the '
+                             f'inferred gain {col_meta["gain"]:g} and offset '
+                             f'{col_meta["offset"]:g}.')
+    return counts
+
+
+def decode_counts(values: np.ndarray, gain: float, offset: float,
+                  out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Scale stored integer counts to values (counts * gain + offset), with NaN marking missing
+    values.
+
+    Args:
+        values: The counts.
+        gain: The gain of the column.
+        offset: The offset of the column.
+        out: Optional float array to write the values into.
+
+    Returns:
+        The values, as float64 unless `out` is given.
+    """
+    missing = values == np.iinfo(values.dtype).min
+    out = np.multiply(values, gain, out=out)
+    out += offset
+    out[missing] = np.nan
+    return out
+
+
+def factor_codes(values: Union[pd.Series, np.ndarray], levels: List[Any]
+                ) -> Tuple[np.ndarray, List[Any]]:
+    """
+    Convert a column to codes into an existing list of factor levels.
+
+    Integer columns are assumed to hold codes already. Values that are not yet levels are
+    assigned codes after the existing levels.
+
+    Returns:
+        Tuple of (codes, new levels to append to `levels`).
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype) and values.dtype.kind in 'iu':
+        return np.asarray(values), []
+
+    cat = pd.Categorical(values)
+    known = pd.Index(levels)
+    new = [lvl for lvl, pos in zip(cat.categories, known.get_indexer(cat.categories)) if pos < 0]
+    lookup = known.append(pd.Index(new)).get_indexer(cat.categories)
+    codes = np.where(cat.codes >= 0, lookup[cat.codes], -1)
+    return codes, new
+
+
+def encode_column(values: Union[pd.Series, np.ndarray],
+                  col_meta: Dict[str, Any],
+                  dtype: np.dtype,
+                  time_ref: Optional[dt.datetime] = None) -> np.ndarray:
+    """
+    Convert a column for storage according to an existing column specification.
+
+    Args:
+        values: The column.
+        col_meta: The column specification. New factor levels are appended to its levels.
+        dtype: The stored dtype of the column.
+        time_ref: The file time reference.
+
+    Returns:
+        The converted column.
+    """
+    col_type = col_meta['type']
+    if col_type == 'factor':
+        codes, new = factor_codes(values, col_meta['levels'])
+        if len(new) > 0:
+            col_meta['levels'] = list(col_meta['levels']) + new
+            if len(col_meta['levels']) - 1 > np.iinfo(dtype).max:
+                raise ValueError(f'Too many factor levels ({len(col_meta["levels"])}) to store '
+                                 f'as {dtype}.')
+        return codes.astype(dtype, copy=False)
+    elif col_type == 'time':
+        if time_ref is None:
+            raise Exception('Cannot convert timestamps without time reference!')
+        if 'resolution' in col_meta:
+            return time_ticks(values, time_ref, col_meta['resolution'])
+        return time_offsets(values, time_ref)
+    elif col_type == 'timedelta':
+        return timedelta_seconds(values)
+    elif col_type == 'string':
+        return encode_strings(values, 'fixed' if dtype.kind == 'S' else 'vlen')
+    elif 'gain' in col_meta:
+        return encode_counts(values, col_meta, dtype)
+    values = np.asarray(values)
+    if dtype.kind in ('i', 'u', 'b') and values.dtype.kind == 'f' and np.isnan(values).any():
+        raise ValueError(f'Cannot store missing values in a {col_type} column.')
+    return values.astype(dtype, copy=False)
+
+
+def decode_seconds(values: np.ndarray,
+                   time_ref: Optional[dt.datetime] = None,
+                   datetimes: bool = False) -> np.ndarray:
+    """
+    Convert stored (float64) seconds in place, reusing the memory of `values`.
+
+    Args:
+        values: Time offsets from `time_ref`, or time deltas if `time_ref` is None.
+        time_ref: The file time reference, taken to be UTC if naive.
+        datetimes: If True, return `datetime64[ns]` (UTC) times or `timedelta64[ns]` deltas,
+            otherwise Unix (UTC) timestamps or seconds.
+
+    Returns:
+        The converted values, a view of `values`.
+    """
+    if not datetimes:
+        if time_ref is not None:
+            values += utc_reference(time_ref).timestamp()
+        return values
+
+    missing = np.isnan(values)
+    nanos = values.view('i8')
+    with np.errstate(invalid='ignore'):
+        nanos[...] = np.rint(values * 1e9)
+    if time_ref is not None:
+        utc = utc_reference(time_ref).astimezone(dt.timezone.utc).replace(tzinfo=None)
+        nanos += np.datetime64(utc, 'ns').astype('i8')
+    nanos[missing] = np.iinfo('i8').min
+    return nanos.view('M8[ns]' if time_ref is not None else 'm8[ns]')
+
+
+def decode_ticks(values: np.ndarray,
+                 resolution: str,
+                 time_ref: Optional[dt.datetime] = None,
+                 datetimes: bool = False) -> np.ndarray:
+    """
+    Convert stored (int64) ticks in place, as `decode_seconds` does for seconds.
+
+    Args:
+        values: Time offsets from `time_ref` in ticks at `resolution`.
+        resolution: The time resolution.
+        time_ref: The file time reference.
+        datetimes: If True, return `datetime64[ns]` (UTC) times, otherwise Unix (UTC)
+            timestamps.
+
+    Returns:
+        The converted values, a view of `values`.
+    """
+    per_second = TIME_RESOLUTIONS[resolution]
+    missing = values == MISSING_TICKS
+    if not datetimes:
+        seconds = values.view('f8')
+        seconds[...] = values / per_second
+        if time_ref is not None:
+            seconds += utc_reference(time_ref).timestamp()
+        seconds[missing] = np.nan
+        return seconds
+
+    values *= 10**9 // per_second
+    if time_ref is not None:
+        utc = utc_reference(time_ref).astimezone(dt.timezone.utc).replace(tzinfo=None)
+        values += np.datetime64(utc, 'ns').astype('i8')
+    values[missing] = MISSING_TICKS
+    return values.view('M8[ns]')
+
+
+def retype_values(values: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """
+    Convert stored values to another stored dtype: integers to reals, fixed-length strings to
+    wider ones, or numbers to fixed-length strings (missing values becoming empty strings).
+    """
+    dtype = np.dtype(dtype)
+    converted = values.astype(dtype)
+    if dtype.kind == 'S' and values.dtype.kind == 'f':
+        converted[np.isnan(values)] = b''
+    return converted
+
+
+def decode_strings(values: np.ndarray) -> np.ndarray:
+    """Decode fixed-length (or h5py 3 variable-length) UTF-8 bytes to str."""
+    if values.dtype.kind == 'S':
+        return np.char.decode(values, 'utf-8')
+    for i, value in enumerate(values):
+        if isinstance(value, bytes):
+            values[i] = value.decode('utf-8')
+    return values
+
+
+def index_rows(idx: Any, nrow: int) -> np.ndarray:
+    """Convert a row selection (index, slice, mask or list of indices) to row numbers."""
+    if isinstance(idx, slice):
+        return np.arange(*idx.indices(nrow))
+    rows = np.atleast_1d(np.asarray(idx))
+    if rows.dtype == bool:
+        return np.flatnonzero(rows)
+    return np.where(rows < 0, rows + nrow, rows)
+
+
+def companion(hdf: h5.HLObject, create: bool = False) -> Optional[h5.Group]:
+    """
+    Get the period-prefixed companion group holding derived data (e.g. indices) for a
+    dataset, which lives next to it as `.<name>`.
+    """
+    name = '.' + hdf.name.rsplit('/', 1)[-1]
+    if name in hdf.parent:
+        return hdf.parent[name]
+    elif create:
+        return hdf.parent.create_group(name)
+    return None
+
+
+def delete_node(parent: h5.Group, key: str):
+    """Delete a group or dataset along with its companion group, if any."""
+    if key not in parent:
+        return
+    group = companion(parent[key])
+    if group is not None:
+        del parent[group.name]
+    del parent[key]
+
+
 def json2dict(json_str: str) -> Dict[str, Any]:
     """Convert JSON string to python dictionary."""
     return json.loads(json_str)
 
 
 def dict2json(json_dict: Dict[str, Any], beautify: bool = True) -> str:
-    """Convert JSON-compatible python dictionary to beautified JSON string."""
+    """
+    Convert JSON-compatible python dictionary to beautified JSON string. JSON longer than
+    `BEAUTIFY_MAX` characters is left compact.
+    """
     if not isinstance(json_dict, dict):
         raise Exception(f'Expecting dictionary, found {type(json_dict)}')
 
-    if beautify:
-        return jsb.beautify(json.dumps(json_dict))
+    compact = json.dumps(json_dict)
+    if beautify and len(compact) <= BEAUTIFY_MAX:
+        return jsb.beautify(compact)
     else:
-        return json.dumps(json_dict)
+        return compact
 
 #def validate_categorical(cat1 : pd.DataFrame, cat2 : pd.DataFrame):
 
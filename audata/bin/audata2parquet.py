@@ -0,0 +1,76 @@
+"""Tool for exporting audata datasets to Parquet files."""
+import os
+import time
+import argparse
+
+import audata
+from audata import _arrow
+from audata.dataset import Dataset
+
+
+def main():
+    """
+    Exports datasets of an audata file to Parquet files (requires pyarrow).
+
+    Each dataset is written to its own Parquet file, named after its path in the audata file,
+    one record batch at a time so that datasets larger than memory can be exported. Times are
+    written as UTC timestamps, time deltas as durations, factors as dictionaries of their
+    levels, and strings as large strings.
+
+    Args:
+        file (str): Path to the audata file.
+        datasets (str): Datasets to export. Defaults to every dataset in the file.
+        --output (str): Directory to write the Parquet files to (default: the file's name
+            without extension).
+        --rows (int): Approximate number of rows per record batch (and Parquet row group).
+        --compression (str): Parquet compression codec.
+    """
+    parser = argparse.ArgumentParser(
+        description='Exports datasets of an audata file to Parquet files.')
+    parser.add_argument('file', type=str, help='Path to the audata file.')
+    parser.add_argument('datasets',
+                        type=str,
+                        nargs='*',
+                        help='Datasets to export (default: all).')
+    parser.add_argument('--output',
+                        type=str,
+                        default=None,
+                        help='Output directory (default: the file name without extension).')
+    parser.add_argument('--rows',
+                        type=int,
+                        default=_arrow.DEFAULT_BATCH_ROWS,
+                        help='Rows per record batch (default: {}).'.format(
+                            _arrow.DEFAULT_BATCH_ROWS))
+    parser.add_argument('--compression',
+                        type=str,
+                        default='zstd',
+                        help='Parquet compression codec (default: zstd).')
+    args = parser.parse_args()
+
+    _arrow.require()
+    import pyarrow.parquet as pq
+
+    output = args.output if args.output is not None else os.path.splitext(args.file)[0]
+    with audata.File.open(args.file) as au_file:
+        if len(args.datasets) > 0:
+            datasets = [(au_file[name], name) for name in args.datasets]
+        else:
+            datasets = list(au_file.recurse())
+
+        for dataset, name in datasets:
+            if not isinstance(dataset, Dataset):
+                print('Skipping {}: not a dataset'.format(name))
+                continue
+            start = time.perf_counter()
+            path = os.path.join(output, name.strip('/') + '.parquet')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with pq.ParquetWriter(path, _arrow.schema(dataset, list(dataset.columns)),
+                                  compression=args.compression) as writer:
+                for batch in dataset.iter_arrow(rows=args.rows):
+                    writer.write_batch(batch)
+            print('Exported {} ({} rows) to {} in {:.2f} s'.format(
+                name, dataset.nrow, path, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
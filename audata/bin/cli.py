@@ -0,0 +1,98 @@
+"""The `audata` command line tool."""
+import sys
+import time
+import argparse
+
+from audata.catalog import Catalog
+
+
+def _index(args: argparse.Namespace):
+    """Build or update the catalog of a directory."""
+    tic = time.perf_counter()
+    with Catalog(args.catalog if args.catalog is not None else args.directory) as catalog:
+        counts = catalog.update(args.directory, pattern=args.pattern, workers=args.workers,
+                                verbose=args.verbose)
+        print('Indexed {} in {:.2f} s: {}'.format(
+            args.directory, time.perf_counter() - tic,
+            ', '.join('{} {}'.format(count, what) for what, count in counts.items())))
+        for path, error in catalog.failed().items():
+            print('  failed {}: {}'.format(path, error))
+
+
+def _query(args: argparse.Namespace):
+    """Query the catalog of a directory."""
+    with Catalog(args.catalog) as catalog:
+        if args.files:
+            for path in catalog.files(args.dataset, args.start, args.end, args.columns):
+                print(path)
+        else:
+            data = catalog.query(args.dataset, args.start, args.end, args.columns)
+            data.drop(columns='columns').to_csv(sys.stdout, index=False)
+
+
+def main():
+    """
+    The `audata` command line tool.
+
+    Commands:
+        index: Build or incrementally update the catalog of the audata files in a directory,
+            see `audata.Catalog`.
+
+            Args:
+                directory (str): The directory to scan recursively.
+                --catalog (str): The catalog file. Defaults to `.audata-catalog.sqlite` in the
+                    directory.
+                --pattern (str): File name pattern of the audata files (default: *.h5).
+                --workers (int): Number of scanning processes (defaults to the number of CPUs).
+                --verbose: Print each file scanned.
+
+        query: Find datasets in a catalog, printed as CSV.
+
+            Args:
+                catalog (str): The catalog file, or the directory holding it.
+                dataset (str): Dataset path pattern, e.g. 'vitals/*/MAP'.
+                --start, --end (str): Only datasets with samples within [start, end).
+                --columns (str): Only datasets with all of these columns.
+                --files: Print the matching file paths only.
+    """
+    parser = argparse.ArgumentParser(description='Tools for audata files.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    index = commands.add_parser('index', help='Build or update the catalog of a directory.')
+    index.add_argument('directory', type=str, help='The directory to scan recursively.')
+    index.add_argument('--catalog',
+                       type=str,
+                       default=None,
+                       help='The catalog file (default: .audata-catalog.sqlite in directory).')
+    index.add_argument('--pattern',
+                       type=str,
+                       default='*.h5',
+                       help='File name pattern of the audata files (default: *.h5).')
+    index.add_argument('--workers',
+                       type=int,
+                       default=None,
+                       help='Number of scanning processes (default: number of CPUs).')
+    index.add_argument('--verbose', action='store_true', help='Print each file scanned.')
+    index.set_defaults(run=_index)
+
+    query = commands.add_parser('query', help='Find datasets in a catalog.')
+    query.add_argument('catalog', type=str,
+                       help='The catalog file, or the directory holding it.')
+    query.add_argument('dataset', type=str, nargs='?', default=None,
+                       help="Dataset path pattern, e.g. 'vitals/*/MAP'.")
+    query.add_argument('--start', type=str, default=None,
+                       help='Only datasets with samples at or after this time.')
+    query.add_argument('--end', type=str, default=None,
+                       help='Only datasets with samples before this time.')
+    query.add_argument('--columns', type=str, nargs='+', default=None,
+                       help='Only datasets with all of these columns.')
+    query.add_argument('--files', action='store_true',
+                       help='Print the matching file paths only.')
+    query.set_defaults(run=_query)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
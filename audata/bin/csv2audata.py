@@ -1,15 +1,40 @@
 """Tool for automagically converting CSV files to audata files."""
 import os
+import time
 import argparse
 from glob import glob
 import datetime as dt
-from typing import Optional
+import multiprocessing as mp
+from queue import Empty
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Tuple, Iterator
 
 from dateutil.parser import parse, ParserError
+import numpy as np
 import pandas as pd
 import h5py as h5
 
 import audata
+from audata._utils import decode_times
+from audata.writer import DatasetWriter
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:
+    guess_datetime_format = None
+
+# Default number of CSV rows to read at a time.
+DEFAULT_CHUNKSIZE = 100000
+
+# Number of values sampled from a column to decide whether it holds timestamps.
+SAMPLE_SIZE = 100
+
+# Width of the strings numeric columns are rewritten as if later values are not numbers
+# (enough for any int64 or float64; wider strings widen the column as usual).
+STRING_WIDTH = 32
+
+# Seconds to wait for parsed chunks before checking whether a worker process died.
+POLL_SECONDS = 1.0
 
 
 def _mkfn(path: str) -> str:
@@ -20,9 +45,86 @@ def _mkfn(path: str) -> str:
         return os.path.splitext(os.path.basename(path))[0] + '.h5'
 
 
-def _addcsv(au_file: audata.File, name: str, path: str):
-    """Add CSV file to the audata file."""
-    data = pd.read_csv(path)
+def _sample(values: pd.Series, size: int = SAMPLE_SIZE) -> pd.Series:
+    """Sample non-null values spread evenly over a column."""
+    values = values.dropna()
+    if len(values) <= size:
+        return values
+    return values.iloc[np.linspace(0, len(values) - 1, size).astype(int)]
+
+
+def _time_format(sample: pd.Series) -> Optional[str]:
+    """
+    Infer the format of a sample of timestamp strings for vectorized parsing.
+
+    Returns:
+        The strptime format, 'ISO8601', or None if the sample is not consistently formatted
+        (in which case the timestamps are parsed with dateutil).
+    """
+    if len(sample) == 0:
+        return None
+    formats = [guess_datetime_format(sample.iloc[0])] if guess_datetime_format else []
+    for fmt in formats + ['ISO8601']:
+        if fmt is None:
+            continue
+        try:
+            if pd.to_datetime(sample, format=fmt, errors='coerce', utc=True).notna().all():
+                return fmt
+        except ValueError:
+            pass
+    return None
+
+
+def _is_time(sample: pd.Series, fmt: Optional[str]) -> bool:
+    """Check whether all values of a sample can be parsed as timestamps."""
+    if fmt is not None or len(sample) == 0:
+        return fmt is not None
+    try:
+        for value in sample:
+            _ = parse(value)
+        return True
+    except (ParserError, OverflowError):
+        return False
+
+
+def _parse_times(values: pd.Series, fmt: Optional[str]) -> pd.Series:
+    """
+    Parse a column of timestamp strings, vectorized with the inferred format, falling back
+    to dateutil for the values not matching it.
+
+    Timestamps are parsed as UTC, as their offsets may differ (e.g. across a DST change), and
+    converted to the zone of the first timestamp. Timestamps without a zone are kept naive.
+    """
+    if fmt is None:
+        times = pd.to_datetime(values.map(parse, na_action='ignore'), utc=True)
+    else:
+        times = pd.to_datetime(values, format=fmt, errors='coerce', utc=True)
+        failed = times.isna() & values.notna()
+        if failed.any():
+            times = times.mask(failed, pd.to_datetime(values[failed].map(parse), utc=True))
+
+    present = values.dropna()
+    zone = _zone(present.iloc[0]) if len(present) > 0 else None
+    return times.dt.tz_localize(None) if zone is None else times.dt.tz_convert(zone)
+
+
+def _zone(value: str) -> Optional[dt.tzinfo]:
+    """The time zone (or UTC offset) of a timestamp string, None if it has none."""
+    try:
+        return pd.Timestamp(value).tz
+    except ValueError:
+        return parse(value).tzinfo
+
+
+def _plan(data: pd.DataFrame) -> Tuple[Dict[str, Tuple[str, Optional[str]]], List[str]]:
+    """
+    Decide how to convert each column, based on the first chunk of a CSV file.
+
+    Returns:
+        Tuple of (dictionary of column name to (conversion, timestamp format), messages
+        describing them).
+    """
+    plan, messages = {}, []
     for col in data.columns:
         # Does it have a name that can be interpreted as a "numeric" time?
         is_datetime = col.lower() in ('time', 'timestamp', 'index')
@@ -30,51 +132,207 @@ def _addcsv(au_file: audata.File, name: str, path: str):
 
         if is_datetime or is_str:
             # Can we convert to date?
+            fmt = None
             if is_str:
-                try:
-                    _ = parse(data[col].values[0])
-                    is_datetime = True
-                except ParserError:
-                    pass
+                sample = _sample(data[col])
+                fmt = _time_format(sample)
+                is_datetime = _is_time(sample, fmt)
 
             if is_datetime:
-                if data[col].dtype in (str, h5.string_dtype()):
-                    print('    Parsing time string column: {}'.format(col))
-                    data[col] = data[col].apply(parse)
+                if is_str:
+                    messages.append('    Parsing time string column: {} (format {})'.format(
+                        col, fmt if fmt is not None else 'dateutil'))
+                    plan[col] = ('time-string', fmt)
                 else:
-                    print('    Parsing time offset column: {}'.format(col))
-                    data[col] = au_file.time_reference + data[col] * dt.timedelta(seconds=1)
+                    messages.append('    Parsing time offset column: {}'.format(col))
+                    plan[col] = ('time-offset', None)
 
             else:
                 arity = len(data[col].unique())
                 pct = float(arity) / len(data) * 100
                 if pct > 10:
-                    print('    Found string column: {} (arity {}%)'.format(
+                    messages.append('    Found string column: {} (arity {}%)'.format(
                         col, round(pct)))
                 else:
-                    print('    Parsing categorical column: {} (arity {} / {}%)'.
-                          format(col, arity, round(pct)))
-                    data[col] = pd.Series(data[col], dtype='category')
+                    messages.append('    Parsing categorical column: {} (arity {} / {}%)'.
+                                    format(col, arity, round(pct)))
+                    plan[col] = ('category', None)
         else:
-            print('    Found {} column: {}'.format(data[col].dtype, col))
-    au_file[name] = data
+            messages.append('    Found {} column: {}'.format(data[col].dtype, col))
+    return plan, messages
+
+
+def _convert(data: pd.DataFrame, plan: Dict[str, Tuple[str, Optional[str]]],
+             time_ref: dt.datetime) -> pd.DataFrame:
+    """Convert a chunk of a CSV file according to the plan made from its first chunk."""
+    for col, (conversion, fmt) in plan.items():
+        if conversion == 'time-string':
+            data[col] = _parse_times(data[col], fmt)
+        elif conversion == 'time-offset':
+            data[col] = decode_times(data[col].values, time_ref)
+        elif conversion == 'category':
+            data[col] = pd.Series(data[col], dtype='category')
+    return data
+
+
+def _readcsv(path: str, chunksize: int,
+             time_ref: dt.datetime) -> Iterator[Tuple[Optional[pd.DataFrame], List[str]]]:
+    """
+    Read and convert a CSV file in chunks, with the schema inferred from the first chunk.
+
+    Returns:
+        Iterable (generator) of tuples of (chunk, messages). Messages describing the columns
+        are given with the first chunk, and the last tuple has no chunk but a message with
+        the number of rows and time spent.
+    """
+    plan = None
+    rows, seconds = 0, 0.0
+    tic = time.perf_counter()
+    for data in pd.read_csv(path, chunksize=chunksize):
+        messages = []
+        if plan is None:
+            plan, messages = _plan(data)
+        rows += len(data)
+        data = _convert(data, plan, time_ref)
+        seconds += time.perf_counter() - tic
+        yield data, messages
+        tic = time.perf_counter()
+    seconds += time.perf_counter() - tic
+    yield None, ['    Read {} rows from {} in {:.2f} s'.format(rows, path, seconds)]
+
+
+def _write(writer: DatasetWriter, data: pd.DataFrame):
+    """
+    Write a chunk of a CSV file, first changing how columns are stored if the chunk does not
+    fit the types inferred from the earlier chunks: integer (or boolean) columns with missing
+    or fractional values become reals, and numeric columns with values that are not numbers
+    become strings.
+    """
+    if writer.dataset is not None:
+        columns = writer.dataset.columns
+        dtypes, specs = {}, {}
+        for col in data.columns:
+            stored, kind = columns.get(col, {}).get('type'), data[col].dtype.kind
+            if stored in ('integer', 'real', 'boolean') and kind not in ('b', 'i', 'u', 'f'):
+                dtypes[col], specs[col] = np.dtype(f'S{STRING_WIDTH}'), {'type': 'string'}
+            elif stored in ('integer', 'boolean') and kind == 'f':
+                dtypes[col], specs[col] = np.dtype('f8'), {'type': 'real'}
+        for col, spec in specs.items():
+            print('    Storing {} column {} as {} from row {}'.format(
+                columns[col]['type'], col, spec['type'], writer.rows_written))
+        if len(dtypes) > 0:
+            writer.retype(dtypes, specs)
+    writer.write(data)
+
+
+def _addcsv(au_file: audata.File, name: str, path: str, chunksize: int = DEFAULT_CHUNKSIZE):
+    """Add CSV file to the audata file."""
+    tic = time.perf_counter()
+    with au_file.stream_writer(name) as writer:
+        for data, messages in _readcsv(path, chunksize, au_file.time_reference):
+            for message in messages:
+                print(message)
+            if data is not None:
+                _write(writer, data)
+    print('    Added {} in {:.2f} s'.format(name, time.perf_counter() - tic))
+
+
+# Results of the CSV parsing workers, set by `_init_worker`.
+_QUEUE = None
+
+
+def _init_worker(queue):
+    """Set the queue to which a worker process sends its results."""
+    global _QUEUE  # pylint: disable=global-statement
+    _QUEUE = queue
+
+
+def _parse_worker(name: str, path: str, chunksize: int, time_ref: dt.datetime):
+    """
+    Parse a CSV file in a worker process, sending (name, chunk, messages, error) tuples
+    to the writer. A chunk of None marks the end of the file.
+    """
+    try:
+        for data, messages in _readcsv(path, chunksize, time_ref):
+            _QUEUE.put((name, data, messages, None))
+    except Exception as e:  # pylint: disable=broad-except
+        _QUEUE.put((name, None, [], f'{type(e).__name__}: {e}'))
+
+
+def _addcsvs(au_file: audata.File, jobs: List[Tuple[str, str]], workers: int, chunksize: int):
+    """
+    Add CSV files to the audata file, parsing them in worker processes. This process is the
+    only one writing to the HDF5 file, appending chunks to each dataset as they arrive.
+    """
+    writers, started = {}, {}
+    with mp.Manager() as manager:
+        # Bound the queue so fast parsers cannot outrun the writer's memory.
+        queue = manager.Queue(maxsize=2 * workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(queue,)) as executor:
+            futures = {executor.submit(_parse_worker, name, path, chunksize,
+                                       au_file.time_reference): name for name, path in jobs}
+
+            # Keep consuming after a failure so that no worker blocks on a full queue.
+            finished = set()
+            while len(finished) < len(jobs):
+                try:
+                    name, data, messages, error = queue.get(timeout=POLL_SECONDS)
+                except Empty:
+                    # A worker process that died (e.g. killed when out of memory) never sends
+                    # the end of its file, so fail the files whose parsing did not complete.
+                    for future, name in futures.items():
+                        if name not in finished and future.done() and \
+                                future.exception() is not None:
+                            print('  failed to add {}: {}: {}'.format(
+                                name, type(future.exception()).__name__, future.exception()))
+                            writers[name] = None
+                            finished.add(name)
+                    continue
+                if name in finished:
+                    continue
+                if name not in writers:
+                    print('  adding {}'.format(name))
+                    writers[name] = au_file.stream_writer(name)
+                    started[name] = time.perf_counter()
+                for message in messages:
+                    print(message)
+                try:
+                    if writers[name] is not None:
+                        if data is not None:
+                            _write(writers[name], data)
+                        else:
+                            writers[name].close()
+                            print('    Added {} in {:.2f} s'.format(
+                                name, time.perf_counter() - started[name]))
+                except Exception as e:  # pylint: disable=broad-except
+                    error = f'{type(e).__name__}: {e}'
+                if error is not None and writers[name] is not None:
+                    print('  failed to add {}: {}'.format(name, error))
+                    writers[name] = None
+                if data is None:
+                    finished.add(name)
+
 
+def _walk(path: str, prefix: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Recurse a directory in search of CSV files to add.
 
-def _walk(au_file: audata.File, path: str, prefix: Optional[str] = None):
-    """Recurse a directory in search of CSV files to add."""
+    Returns:
+        Iterable (generator) of tuples of (dataset name, CSV path).
+    """
     if path is None or len(path) == 0 or path[0] == '.':
         return
     elif os.path.isdir(path):
         prefix = '' if prefix is None else os.path.basename(path)
         for next_path in glob('{}/*'.format(path)):
-            _walk(au_file, next_path, prefix)
+            yield from _walk(next_path, prefix)
     elif os.path.splitext(path)[1].lower() == '.csv':
         if prefix is None:
             prefix = ''
         name = '{}{}{}'.format(prefix, '/' if prefix != '' else '',
                                os.path.splitext(os.path.basename(path))[0])
-        print('  adding {}'.format(name))
-        _addcsv(au_file, name, path)
+        yield name, path
     else:
         return
 
@@ -88,14 +346,22 @@ def main():
     and store the output to a file (with the same name as the CSV or directory, ending in '.h5').
 
     The tool will infer a datetime column if it is named time, timestamp, or index, or if it is a
-    string column whose first element can be parsed as a datetime object using
-    `dateutils.parser.parse`. This parsing does rely on the first row being valid.
+    string column whose values (sampled from the first chunk) can all be parsed as datetime
+    objects. The timestamp format is inferred from the sample so that the column can be parsed in
+    one vectorized pass, falling back to `dateutils.parser.parse` for values not matching it.
 
     Other string columns will be treated either as factor/categorical columns if the arity (unique
     values) is less than 10% of the total number of rows, otherwise a string column.
 
+    CSV files are read in chunks, and the column types are decided from the first chunk of each
+    file. Files are parsed in parallel by worker processes, while this process writes the chunks
+    to the HDF5 file.
+
     Args:
         path (str): Path to a CSV file or directory to be recursively scanned for CSVs.
+        --workers (int): Number of CSV parsing processes (defaults to the number of CPUs). With
+            1, files are converted one at a time without worker processes.
+        --chunksize (int): Number of CSV rows to read at a time.
     """
     parser = argparse.ArgumentParser(
         description=
@@ -106,12 +372,29 @@ def main():
         type=str,
         help=
         'Path to a CSV file or directory to be recursively scanned for CSVs.')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of CSV parsing processes (default: number of CPUs).')
+    parser.add_argument(
+        '--chunksize',
+        type=int,
+        default=DEFAULT_CHUNKSIZE,
+        help='Number of CSV rows to read at a time (default: {}).'.format(DEFAULT_CHUNKSIZE))
     args = parser.parse_args()
 
+    jobs = list(_walk(args.path))
+    workers = min(args.workers, len(jobs))
     filename = _mkfn(args.path)
     print('Creating {}'.format(filename))
     with audata.File.new(filename, overwrite=True) as au_file:
-        _walk(au_file, args.path)
+        if workers > 1:
+            _addcsvs(au_file, jobs, workers, args.chunksize)
+        else:
+            for name, path in jobs:
+                print('  adding {}'.format(name))
+                _addcsv(au_file, name, path, args.chunksize)
         print(au_file)
 
 
@@ -0,0 +1,60 @@
+"""Tool for importing Parquet files into audata files."""
+import os
+import time
+import argparse
+
+import audata
+from audata import _arrow
+from audata.dataset import Dataset
+
+
+def main():
+    """
+    Imports Parquet files as datasets of an audata file (requires pyarrow).
+
+    Each Parquet file is added as a dataset named after the file (without extension), one
+    record batch at a time so that files larger than memory can be imported. Timestamps are
+    stored as times, durations as time deltas, dictionaries as factors, and strings as strings.
+
+    Args:
+        files (str): Paths to the Parquet files.
+        --output (str): The audata file to add the datasets to. It is created if needed.
+        --prefix (str): Group to add the datasets to.
+        --rows (int): Number of rows per record batch read.
+        --storage (str): Storage profile of the new datasets.
+        --overwrite: Replace existing datasets of the same name.
+    """
+    parser = argparse.ArgumentParser(
+        description='Imports Parquet files as datasets of an audata file.')
+    parser.add_argument('files', type=str, nargs='+', help='Paths to the Parquet files.')
+    parser.add_argument('--output', type=str, required=True, help='The audata file.')
+    parser.add_argument('--prefix', type=str, default='', help='Group to add datasets to.')
+    parser.add_argument('--rows',
+                        type=int,
+                        default=_arrow.DEFAULT_BATCH_ROWS,
+                        help='Rows per record batch (default: {}).'.format(
+                            _arrow.DEFAULT_BATCH_ROWS))
+    parser.add_argument('--storage', type=str, default=None,
+                        help='Storage profile of the new datasets.')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='Replace existing datasets of the same name.')
+    args = parser.parse_args()
+
+    _arrow.require()
+    import pyarrow.parquet as pq
+
+    with audata.File.open(args.output, create=True, readonly=False) as au_file:
+        for path in args.files:
+            start = time.perf_counter()
+            name = '/'.join(part for part in (args.prefix.strip('/'),
+                                              os.path.splitext(os.path.basename(path))[0])
+                            if part != '')
+            dataset = Dataset.from_arrow(au_file, name,
+                                         pq.ParquetFile(path).iter_batches(batch_size=args.rows),
+                                         overwrite=args.overwrite, storage=args.storage)
+            print('Imported {} ({} rows) as {} in {:.2f} s'.format(
+                path, dataset.nrow, name, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Tool for building multi-resolution summaries of datasets in an audata file."""
+import argparse
+import time
+
+import audata
+from audata import _summary
+from audata.dataset import Dataset
+
+
+def main():
+    """
+    Builds (or rebuilds) the multi-resolution summaries used by `Dataset.get_summary`.
+
+    Once built, summaries are updated whenever rows are appended to the dataset.
+
+    Args:
+        file (str): Path to the audata file.
+        datasets (str): Datasets to summarize. Defaults to every dataset in the file.
+        --base (int): Rows per entry of the finest level.
+        --factor (int): Entries of each level merged into one entry of the next level.
+    """
+    parser = argparse.ArgumentParser(
+        description='Builds multi-resolution summaries of datasets in an audata file.')
+    parser.add_argument('file', type=str, help='Path to the audata file.')
+    parser.add_argument('datasets',
+                        type=str,
+                        nargs='*',
+                        help='Datasets to summarize (default: all).')
+    parser.add_argument('--base',
+                        type=int,
+                        default=_summary.DEFAULT_BASE,
+                        help='Rows per entry of the finest level (default: {}).'.format(
+                            _summary.DEFAULT_BASE))
+    parser.add_argument('--factor',
+                        type=int,
+                        default=_summary.DEFAULT_FACTOR,
+                        help='Entries merged into each entry of the next level (default: {}).'.
+                        format(_summary.DEFAULT_FACTOR))
+    args = parser.parse_args()
+
+    with audata.File.open(args.file, readonly=False) as au_file:
+        if len(args.datasets) > 0:
+            datasets = [(au_file[name], name) for name in args.datasets]
+        else:
+            datasets = list(au_file.recurse())
+
+        for dataset, name in datasets:
+            if not isinstance(dataset, Dataset):
+                print('Skipping {}: not a dataset'.format(name))
+                continue
+            start = time.perf_counter()
+            dataset.build_summary(base=args.base, factor=args.factor)
+            levels = _summary.get(dataset.hdf)
+            print('Summarized {} ({} rows, {} levels) in {:.2f} s'.format(
+                name, dataset.nrow, len(levels), time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
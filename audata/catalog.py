@@ -0,0 +1,303 @@
+"""Catalog of the datasets in a directory of audata files."""
+import os
+import json
+import sqlite3
+import datetime as dt
+from fnmatch import fnmatch
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union, List, Tuple, Dict, Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from audata import _index, _sampling
+from audata import _utils as utils
+from audata.file import File
+
+# Name of the catalog file when a directory is given instead.
+DEFAULT_NAME = '.audata-catalog.sqlite'
+
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS datasets (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    nrow INTEGER NOT NULL,
+    columns TEXT NOT NULL,
+    time_start REAL,
+    time_end REAL,
+    sample_rate REAL,
+    uniform INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS datasets_name ON datasets(name);
+CREATE INDEX IF NOT EXISTS datasets_file ON datasets(file_id);
+'''
+
+
+def _time_span(dataset: 'Dataset') -> Tuple[Optional[float], Optional[float]]:
+    """
+    First and last timestamps (time offsets) of a dataset's first time column, from its
+    sampling specification or time index (computed if it was never persisted).
+    """
+    nrow = dataset.nrow
+    if nrow == 0 or len(dataset.time_columns) == 0:
+        return None, None
+    time_col = dataset.time_columns[0]
+    if time_col not in dataset.stored_time_columns:
+        times = _sampling.times_for_rows(dataset.sampling, np.array([0, nrow - 1]))
+        return float(times[0]), float(times[1])
+
+    _, entries, _ = _index.load(dataset.hdf, time_col)
+    bounds = _index.span(entries)
+    if bounds is None:
+        return None, None
+    start, end = utils.stored_seconds(np.array(bounds), dataset.columns[time_col])
+    return float(start), float(end)
+
+
+def _scan(path: str) -> Tuple[str, List[Dict[str, Any]], Optional[str]]:
+    """Describe the datasets of one file, returning (path, datasets, error message)."""
+    try:
+        datasets = []
+        with File.open(path, return_datetimes=False) as au_file:
+            ref = utils.utc_reference(au_file.time_reference).timestamp()
+            for dataset, name in au_file.recurse():
+                start, end = _time_span(dataset)
+                sampling = dataset.sampling
+                if sampling is not None:
+                    rate = sampling['rate']
+                elif start is not None and end > start:
+                    rate = (dataset.nrow - 1) / (end - start)
+                else:
+                    rate = None
+                datasets.append({
+                    'name': name.lstrip('/'),
+                    'nrow': dataset.nrow,
+                    'columns': {col: spec['type'] for col, spec in dataset.columns.items()},
+                    'time_start': None if start is None else ref + start,
+                    'time_end': None if end is None else ref + end,
+                    'sample_rate': rate,
+                    'uniform': sampling is not None
+                })
+        return path, datasets, None
+    except Exception as e:
+        return path, [], f'{type(e).__name__}: {e}'
+
+
+class Catalog:
+    """
+    A catalog of the datasets in a directory of audata files, kept in a SQLite database.
+
+    For every dataset it records the columns and their types, the number of rows, the time
+    span and the sample rate, so that questions like "which files have `vitals/*/MAP`
+    during this week" are answered without opening any of the files. The catalog is
+    updated incrementally: only new files, and files whose modification time or size
+    changed, are scanned again.
+
+    Example:
+        >>> with audata.Catalog('cohort') as catalog:
+        ...     catalog.update(workers=8)
+        ...     paths = catalog.files('vitals/*/MAP', '2020-01-01', '2020-01-08')
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens (or creates) a catalog.
+
+        Args:
+            path: The catalog file, or a directory to keep it in (as `DEFAULT_NAME`).
+                Files are recorded relative to the directory holding the catalog.
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, DEFAULT_NAME)
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA foreign_keys = ON')
+        self._db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the catalog."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def update(self,
+               directory: Optional[str] = None,
+               pattern: str = '*.h5',
+               workers: Optional[int] = None,
+               verbose: bool = False) -> Dict[str, int]:
+        """
+        Scan a directory for new, modified and deleted audata files.
+
+        Args:
+            directory: The directory to scan recursively. Defaults to the directory holding
+                the catalog.
+            pattern: File name pattern of the audata files.
+            workers: Number of worker processes scanning files. Defaults to the number of
+                CPUs; 1 scans the files in this process.
+            verbose: If True, print a line for each file scanned.
+
+        Returns:
+            Number of files 'added', 'updated', 'removed', 'unchanged' and 'failed'.
+        """
+        if directory is None:
+            directory = self.root
+        known = {path: (file_id, mtime, size) for file_id, path, mtime, size in
+                 self._db.execute('SELECT id, path, mtime, size FROM files')}
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'failed': 0}
+
+        stats = {}
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            for filename in sorted(filenames):
+                if fnmatch(filename, pattern):
+                    path = os.path.join(dirpath, filename)
+                    stat = os.stat(path)
+                    stats[self._relative(path)] = (stat.st_mtime, stat.st_size)
+
+        for path, (file_id, mtime, size) in known.items():
+            if path not in stats and not os.path.exists(self._absolute(path)):
+                self._db.execute('DELETE FROM files WHERE id = ?', (file_id,))
+                counts['removed'] += 1
+
+        scan = []
+        for path, stat in stats.items():
+            if path in known and known[path][1:] == stat:
+                counts['unchanged'] += 1
+            else:
+                scan.append(path)
+
+        paths = [self._absolute(path) for path in scan]
+        for path, datasets, error in self._scan_files(paths, workers):
+            path = self._relative(path)
+            if verbose:
+                print('{} {}{}'.format('Updated' if path in known else 'Added', path,
+                                       '' if error is None else f' (failed: {error})'))
+            counts['failed' if error is not None else 'updated' if path in known else
+                   'added'] += 1
+            self._record(path, stats[path], datasets, error)
+        self._db.commit()
+        return counts
+
+    @staticmethod
+    def _scan_files(paths: List[str], workers: Optional[int]
+                   ) -> Iterable[Tuple[str, List[Dict[str, Any]], Optional[str]]]:
+        """Scan files, in worker processes unless `workers` is 1."""
+        if workers is not None and workers <= 1:
+            return map(_scan, paths)
+
+        # HDF5 does not support concurrent reads from threads, so use processes.
+        def results():
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                yield from executor.map(_scan, paths, chunksize=16)
+        return results()
+
+    def _record(self, path: str, stat: Tuple[float, int], datasets: List[Dict[str, Any]],
+                error: Optional[str]):
+        """Replace the entries of one file."""
+        self._db.execute('DELETE FROM files WHERE path = ?', (path,))
+        file_id = self._db.execute('INSERT INTO files (path, mtime, size, error) '
+                                   'VALUES (?, ?, ?, ?)', (path, *stat, error)).lastrowid
+        self._db.executemany(
+            'INSERT INTO datasets (file_id, name, nrow, columns, time_start, time_end, '
+            'sample_rate, uniform) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(file_id, d['name'], d['nrow'], json.dumps(d['columns']), d['time_start'],
+              d['time_end'], d['sample_rate'], int(d['uniform'])) for d in datasets])
+
+    def _relative(self, path: str) -> str:
+        """Path relative to the directory holding the catalog, as recorded."""
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def _absolute(self, path: str) -> str:
+        """Absolute path of a recorded file."""
+        return os.path.normpath(os.path.join(self.root, path))
+
+    def query(self,
+              dataset: Optional[str] = None,
+              start: Any = None,
+              end: Any = None,
+              columns: Optional[Union[str, List[str]]] = None,
+              datetimes: bool = True) -> pd.DataFrame:
+        """
+        Find datasets by name, time span and columns, without opening the files.
+
+        Args:
+            dataset: Dataset path pattern, where '*' matches any characters (including
+                '/') and '?' any single character, e.g. 'vitals/*/MAP'. None for all.
+            start: Only datasets with samples at or after this time, as a datetime (or
+                string) or Unix timestamp. None for no bound.
+            end: Only datasets with samples before this time, as for `start`.
+            columns: Only datasets with all of these columns.
+            datetimes: If True, return the time spans as datetimes, otherwise as Unix
+                timestamps.
+
+        Returns:
+            One row per dataset with the file path, dataset name, number of rows, first
+            and last timestamps, sample rate (the mean rate if not uniformly sampled),
+            whether it is uniformly sampled, and the column types.
+        """
+        where, args = ['files.error IS NULL'], []
+        if dataset is not None:
+            where.append('datasets.name GLOB ?')
+            args.append(dataset.lstrip('/'))
+        if start is not None:
+            where.append('datasets.time_end >= ?')
+            args.append(utils.time_offset(start, EPOCH))
+        if end is not None:
+            where.append('datasets.time_start < ?')
+            args.append(utils.time_offset(end, EPOCH))
+
+        rows = self._db.execute(
+            'SELECT files.path, datasets.name, datasets.nrow, datasets.time_start, '
+            'datasets.time_end, datasets.sample_rate, datasets.uniform, datasets.columns '
+            'FROM datasets JOIN files ON files.id = datasets.file_id WHERE ' +
+            ' AND '.join(where) + ' ORDER BY files.path, datasets.name', args).fetchall()
+
+        if isinstance(columns, str):
+            columns = [columns]
+        data = pd.DataFrame(
+            [(self._absolute(path), name, nrow, t0, t1, rate, bool(uniform), json.loads(cols))
+             for path, name, nrow, t0, t1, rate, uniform, cols in rows],
+            columns=['file', 'dataset', 'nrow', 'start', 'end', 'sample_rate', 'uniform',
+                     'columns'])
+        if columns is not None:
+            data = data[[all(col in cols for col in columns) for cols in data['columns']]]
+            data = data.reset_index(drop=True)
+        if datetimes:
+            for col in ('start', 'end'):
+                data[col] = pd.to_datetime(data[col].astype('f8'), unit='s', utc=True)
+        return data
+
+    def files(self,
+              dataset: Optional[str] = None,
+              start: Any = None,
+              end: Any = None,
+              columns: Optional[Union[str, List[str]]] = None) -> List[str]:
+        """
+        Find the files with a matching dataset, as in `query`.
+
+        Returns:
+            The file paths, sorted.
+        """
+        return list(dict.fromkeys(self.query(dataset, start, end, columns)['file']))
+
+    def failed(self) -> Dict[str, str]:
+        """Files that could not be scanned, with the error message."""
+        return {self._absolute(path): error for path, error in
+                self._db.execute('SELECT path, error FROM files WHERE error IS NOT NULL '
+                                 'ORDER BY path')}
@@ -1,20 +1,34 @@
 """
 Classes for wrapping HDF5 datasets.
 """
-from typing import Union, AbstractSet, Optional, Tuple, Any, Dict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, AbstractSet, Optional, Tuple, Any, Dict, List, Iterable, Iterator
 
 import numpy as np
+import numpy.lib.recfunctions as rfn
 import pandas as pd
 import h5py as h5
 
 from audata import _utils as utils
+from audata import _arrow
+from audata import _columnar
+from audata import _index
+from audata import _mmap
+from audata import _sampling
+from audata import _storage
+from audata import _summary
 from audata.element import Element
+from audata.writer import DatasetWriter
 
 
 class Dataset(Element):
     """
     Maps to an HDF5 dataset, maintaining the `audata` schema and facilitating translation of
     higher-level data types. Generally should not be instantiated directly.
+
+    Datasets stored with the columnar layout map to an HDF5 group of per-column datasets
+    instead (see `audata._columnar`), with the same interface.
     """
 
     def __init__(self, au_parent: Element, name: str):
@@ -25,12 +39,17 @@ class Dataset(Element):
         if not isinstance(parent, h5.Group):
             raise Exception(f'Invalid parent: {type(parent)}')
 
-        if name not in parent or not isinstance(parent[name], h5.Dataset):
+        cls = parent.get(name, getclass=True)
+        columnar = cls is not None and issubclass(cls, h5.Group) and \
+            _columnar.is_columnar(parent[name])
+        if cls is None or not (issubclass(cls, h5.Dataset) or columnar):
             raise Exception(
                 f'Path {name} is not a dataset in {parent.file.filename}:{parent.name}'
             )
 
         super().__init__(au_parent, name)
+        if columnar:
+            self._h5 = _columnar.Columns(self._h5)
 
     @classmethod
     def new(cls,
@@ -38,8 +57,44 @@ class Dataset(Element):
             name: str,
             value: Union[h5.Dataset, np.ndarray, np.recarray, pd.DataFrame],
             overwrite: bool = False,
+            sample_rate: Optional[float] = None,
+            time_col: str = 'time',
+            start_time: Any = None,
+            storage: Union[str, Dict[str, Any], None] = None,
+            summary: Union[bool, List[str]] = False,
             **kwargs) -> 'Dataset':
-        """Create a new Dataset object."""
+        """
+        Create a new Dataset object.
+
+        Args:
+            au_parent: The parent element.
+            name: Name (or path) of the new dataset relative to the parent.
+            value: The data to store. It is converted for storage without being modified.
+            overwrite: If True, an existing dataset of the same name is replaced.
+            sample_rate: If given, the data is stored as a uniformly sampled signal at this
+                rate (Hz): the time column is not stored, but reconstructed from the start
+                time and sample rate (see the format specification).
+            time_col: Name of the time column of a uniformly sampled signal.
+            start_time: Time of the first sample of a uniformly sampled signal, as in
+                `get_range`. Only needed if the data has no time column.
+            storage: Chunking and compression profile: 'default', 'archive',
+                'random-access', 'streaming', 'contiguous' (uncompressed and unchunked, for
+                `memmap`), 'columnar' (one HDF5 dataset per column), or a dictionary (see
+                `audata._storage`). Defaults to the file's storage profile.
+            summary: If True (or a list of columns), maintain a multi-resolution summary of
+                the numeric columns for `get_summary`.
+            **kwargs: Additional conversion options (`time_cols`, `timedelta_cols`,
+                `strings`, the string storage mode as in `audata._utils.encode_strings`, and
+                `time_resolution`, to store time columns as int64 ticks at a resolution of
+                'ms', 'us' or 'ns' instead of float64 seconds, and `quantize`, to store real
+                columns as int16 or int32 counts with a gain and offset: True to do so for
+                every column that can be stored losslessly, or a dictionary by column of
+                True (to infer the gain and offset) or of the `gain`, `offset`, `dtype` and
+                `units`, e.g. `quantize={'II': {'gain': 0.005, 'units': 'mV'}}`).
+
+        Returns:
+            The new dataset.
+        """
 
         if not isinstance(au_parent, Element):
             raise Exception('Must send Element.')
@@ -48,24 +103,140 @@ class Dataset(Element):
         if not isinstance(parent, h5.Group):
             raise Exception(f'Invalid parent: {type(parent)}')
 
-        if name in parent and not overwrite:
-            raise Exception(f'{name} already exists.')
+        if name in parent:
+            if not overwrite:
+                raise Exception(f'{name} already exists.')
+            utils.delete_node(parent, name)
 
         # If given an HDF5 dataset or an Dataset, read in all of its data
         # (HDF5 dataset as a numpy ndarray, Dataset as a pandas DataFrame).
         if isinstance(value, (h5.Dataset, Dataset)):
             value = value[:]
 
+        # Uniformly sampled signals keep the time column out of the stored data.
+        times = None
+        if sample_rate is not None:
+            value, times = cls._split_times(value, time_col, au_parent.file.time_reference)
+            if times is None:
+                start = utils.time_offset(start_time, au_parent.file.time_reference)
+                times = (0.0 if start is None else start) + np.arange(len(value)) / sample_rate
+
+        if storage is None:
+            storage = au_parent.file_meta.get('storage')
+
         # Try to create a class now.
 
         if isinstance(value, (np.ndarray, np.recarray)):
-            return cls.__new_from_array(au_parent, name, value, **kwargs)
+            dataset = cls.__new_from_array(au_parent, name, value, storage=storage, **kwargs)
 
         elif isinstance(value, pd.DataFrame):
-            return cls.__new_from_dataframe(au_parent, name, value)
+            dataset = cls.__new_from_dataframe(au_parent, name, value, storage=storage, **kwargs)
 
         else:
             raise Exception(f'Unsure how to convert type {type(value)}')
+        au_parent._forget_nodes()
+
+        if sample_rate is not None:
+            segments = _sampling.segments_from_times(times, sample_rate)
+            if len(segments) == 0 and start_time is not None:
+                segments = [[0, utils.time_offset(start_time, au_parent.file.time_reference)]]
+            meta = dataset.meta
+            meta['columns'] = {time_col: {'type': 'time'}, **meta.get('columns', {})}
+            meta['sampling'] = {
+                'time_column': time_col,
+                'rate': float(sample_rate),
+                'segments': segments
+            }
+            dataset.meta = meta
+
+        if summary:
+            dataset.build_summary(None if summary is True else summary)
+        return dataset
+
+    @classmethod
+    def from_arrow(cls,
+                   au_parent: Element,
+                   name: str,
+                   data: Union['pa.Table', 'pa.RecordBatchReader', Iterable['pa.RecordBatch']],
+                   overwrite: bool = False,
+                   rows: Optional[int] = None,
+                   **kwargs) -> 'Dataset':
+        """
+        Create a new dataset from Arrow data, one record batch at a time (requires pyarrow).
+
+        Timestamps are stored as times, durations as time deltas, dictionaries as factors
+        (with the dictionaries of all batches as levels), and strings as strings. Columns
+        exported by audata (see `iter_arrow`) are stored as their specification in the field
+        metadata declares: factors keep their levels, and times their resolution and real
+        columns their quantization, unless overridden in `kwargs`.
+
+        Example:
+            >>> reader = pq.ParquetFile('vitals.parquet').iter_batches()
+            >>> audata.Dataset.from_arrow(f, 'vitals', reader)
+
+        Args:
+            au_parent: The parent element.
+            name: Name of the new dataset.
+            data: A table, a record batch reader, or an iterable of record batches.
+            overwrite: If True, an existing dataset of the same name is replaced.
+            rows: Number of rows per batch written, when converting a table.
+            **kwargs: Additional keyword arguments passed on to `new` (e.g. `storage`).
+
+        Returns:
+            The new dataset.
+        """
+        writer, widened = None, False
+        for batch in _arrow.batches(data, rows):
+            specs = _arrow.column_specs(batch.schema)
+            frame = _arrow.with_levels(_arrow.to_dataframe(batch), specs)
+            if writer is None:
+                dataset = cls.new(au_parent, name, frame, overwrite=overwrite,
+                                  **_arrow.storage_options(specs, kwargs))
+                meta = dataset.meta
+                _arrow.describe(meta, specs)
+                dataset.meta = meta
+                writer = dataset.writer()
+                continue
+            if not widened:
+                # Later batches may bring more levels than the codes of the first can hold.
+                stored = dataset.hdf.dtype
+                narrow = {col: dtype for col, dtype in _arrow.index_dtypes(batch.schema).items()
+                          if dataset.columns.get(col, {}).get('type') == 'factor' and
+                          stored[col].itemsize < dtype.itemsize}
+                if len(narrow) > 0:
+                    writer.retype(narrow)
+                widened = True
+            # Dictionary indices of each batch are relative to its own dictionary: the writer
+            # maps them onto the stored levels, adding new ones.
+            writer.write(frame)
+        if writer is None:
+            raise ValueError(f'No record batches to create {name} from.')
+        writer.close()
+        return dataset
+
+    @staticmethod
+    def _split_times(value: Union[np.ndarray, pd.DataFrame], time_col: str,
+                      time_ref: 'dt.datetime'
+                     ) -> Tuple[Union[np.ndarray, pd.DataFrame], Optional[np.ndarray]]:
+        """Separate the time column (as offsets), if present, from the rest of the data."""
+        if isinstance(value, pd.DataFrame) and time_col in value:
+            return value.drop(columns=[time_col]), utils.time_offsets(value[time_col], time_ref)
+        elif isinstance(value, np.ndarray) and value.dtype.names is not None and \
+                time_col in value.dtype.names:
+            times = utils.time_offsets(value[time_col], time_ref)
+            return rfn.drop_fields(value, time_col, usemask=False,
+                                   asrecarray=isinstance(value, np.recarray)), times
+        return value, None
+
+    @staticmethod
+    def _store(parent: h5.Group, name: str, recs: np.ndarray,
+               storage: Union[str, Dict[str, Any], None]):
+        """Store converted records as a new HDF5 dataset, or group of columns."""
+        options = _storage.dataset_options(storage, recs.dtype)
+        if _storage.resolve(storage)['layout'] == 'columnar':
+            _columnar.create(parent, name, recs, options)
+        else:
+            parent.create_dataset(name, data=recs, **options)
 
     @classmethod
     def __new_from_array(cls,
@@ -73,7 +244,11 @@ class Dataset(Element):
                          name: str,
                          arr: Union[np.ndarray, np.recarray],
                          time_cols: Optional[AbstractSet[str]] = None,
-                         timedelta_cols: Optional[AbstractSet[str]] = None
+                         timedelta_cols: Optional[AbstractSet[str]] = None,
+                         strings: Union[str, Dict[str, str]] = 'auto',
+                         time_resolution: Union[str, Dict[str, str], None] = None,
+                         quantize: Union[bool, str, Dict[str, Any], None] = None,
+                         storage: Union[str, Dict[str, Any], None] = None
                         ) -> 'Dataset':
         """Create a new dataset from a numpy recarray or ndarray."""
 
@@ -85,22 +260,24 @@ class Dataset(Element):
         # ATW: TODO: Less lame.
         if arr.dtype.names is None:
             return cls.__new_from_dataframe(au_parent, name,
-                                            pd.DataFrame(data=arr))
+                                            pd.DataFrame(data=arr),
+                                            strings=strings,
+                                            time_resolution=time_resolution,
+                                            quantize=quantize,
+                                            storage=storage)
 
         meta, recs = utils.audata_from_arr(
             arr,
             time_ref=au_parent.file.time_reference,
             time_cols=time_cols,
-            timedelta_cols=timedelta_cols)
-        au_parent.hdf.create_dataset(name,
-                                     chunks=True,
-                                     maxshape=(None,),
-                                     compression='gzip',
-                                     shuffle=True,
-                                     fletcher32=True,
-                                     data=recs)
-        au_parent.hdf[name].attrs['.meta'] = utils.dict2json(meta)
+            timedelta_cols=timedelta_cols,
+            strings=strings,
+            time_resolution=time_resolution,
+            quantize=quantize)
+        cls._store(au_parent.hdf, name, recs, storage)
         dataset = cls(au_parent, name)
+        dataset.meta = meta
+        dataset.build_index()
         return dataset
 
     @classmethod
@@ -109,7 +286,11 @@ class Dataset(Element):
                              name: str,
                              data: pd.DataFrame,
                              time_cols: Optional[AbstractSet[str]] = None,
-                             timedelta_cols: Optional[AbstractSet[str]] = None
+                             timedelta_cols: Optional[AbstractSet[str]] = None,
+                             strings: Union[str, Dict[str, str]] = 'auto',
+                             time_resolution: Union[str, Dict[str, str], None] = None,
+                             quantize: Union[bool, str, Dict[str, Any], None] = None,
+                             storage: Union[str, Dict[str, Any], None] = None
                             ) -> 'Dataset':
         """Create a new dataset from a pandas DataFrame."""
 
@@ -122,28 +303,64 @@ class Dataset(Element):
             data,
             time_ref=au_parent.file.time_reference,
             time_cols=time_cols,
-            timedelta_cols=timedelta_cols)
-        au_parent.hdf.create_dataset(name,
-                                     chunks=True,
-                                     maxshape=(None,),
-                                     compression='gzip',
-                                     shuffle=True,
-                                     fletcher32=True,
-                                     data=recs)
-        au_parent.hdf[name].attrs['.meta'] = utils.dict2json(meta)
+            timedelta_cols=timedelta_cols,
+            strings=strings,
+            time_resolution=time_resolution,
+            quantize=quantize)
+        cls._store(au_parent.hdf, name, recs, storage)
         dataset = cls(au_parent, name)
+        dataset.meta = meta
+        dataset.build_index()
         return dataset
 
     def __getitem__(self, idx=slice(-1)) -> pd.DataFrame:
+        # Allow projecting columns, e.g. ds['II'], ds[['time', 'II'], 1000:2000].
+        if isinstance(idx, tuple) and len(idx) == 2 and isinstance(idx[0], (str, list)):
+            return self.get(idx[1], columns=idx[0])
+        elif isinstance(idx, str) or \
+                (isinstance(idx, list) and len(idx) > 0 and all(isinstance(c, str) for c in idx)):
+            return self.get(slice(None), columns=idx)
         return self.get(idx)
 
     def get(self,
             idx=slice(-1),
             raw: Optional[bool] = False,
-            datetimes: Optional[bool] = None) -> pd.DataFrame:
-        """Return a dataset as a pandas DataFrame."""
+            datetimes: Optional[bool] = None,
+            columns: Optional[Union[str, List[str]]] = None,
+            as_: str = 'pandas') -> Union[pd.DataFrame, Dict[str, np.ndarray]]:
+        """
+        Return a dataset as a pandas DataFrame.
+
+        Args:
+            idx: Row selection (index, slice, or increasing list of indices).
+            raw: If True, return the raw record array instead of a DataFrame.
+            datetimes: If True times will be converted to `dt.datetime` objects, otherwise
+                Unix (UTC) timestamps. Defaults to the file's `return_datetimes`.
+            columns: Optional column name(s) to read. Unrequested columns are never read
+                from disk.
+            as_: 'pandas' for a DataFrame, or 'numpy' for a dictionary of arrays as returned
+                by `to_numpy`.
+
+        Returns:
+            The selected data.
+        """
+        if as_ == 'numpy':
+            return self.to_numpy(idx, columns=columns, datetimes=datetimes)
+        elif as_ != 'pandas':
+            raise ValueError(f'Unknown output type "{as_}", expected "pandas" or "numpy".')
 
-        rec = self.hdf[idx]
+        if isinstance(columns, str):
+            columns = [columns]
+
+        # The time column of a uniformly sampled signal is not stored, but computed.
+        sampling = self.sampling
+        virtual = sampling['time_column'] if sampling is not None else None
+        if virtual is not None and columns is not None and virtual in columns:
+            stored = [col for col in columns if col != virtual]
+        else:
+            stored = columns
+
+        rec = self.read(idx, stored) if stored != [] else None
         if raw:
             return rec
         if isinstance(rec, np.void):
@@ -151,21 +368,243 @@ class Dataset(Element):
 
         if datetimes is None:
             datetimes = self.file.return_datetimes
-        data = utils.df_from_audata(rec, self.columns, self.file.time_reference, datetimes)
+        cols = self.columns
+        if virtual is not None and (columns is None or virtual in columns):
+            names = [virtual] + list(rec.dtype.names) if columns is None else columns
+            times = _sampling.times_for_rows(sampling, utils.index_rows(idx, self.nrow))
+            rec = {col: times if col == virtual else rec[col] for col in names}
+        else:
+            names = rec.dtype.names
+        data = utils.df_from_audata(rec, {col: cols[col] for col in names},
+                                    self.file.time_reference, datetimes)
         return data
 
+    def read(self, idx=slice(None), columns: Optional[Union[str, List[str]]] = None
+            ) -> Union[np.ndarray, np.void]:
+        """Read raw records, using HDF5 field selection if only some columns are requested."""
+        if columns is None:
+            return self.hdf[idx]
+
+        if isinstance(columns, str):
+            columns = [columns]
+        missing = [col for col in columns if col not in self.hdf.dtype.names]
+        if len(missing) > 0:
+            raise KeyError(f'Columns not found in {self.name}: {missing}')
+        return self.hdf.fields(columns)[idx]
+
+    def to_numpy(self,
+                 idx=slice(None),
+                 columns: Optional[Union[str, List[str]]] = None,
+                 datetimes: Optional[bool] = None,
+                 out: Optional[Dict[str, np.ndarray]] = None,
+                 counts: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Return columns as NumPy arrays, without building a DataFrame.
+
+        Each column is read from disk directly into its own array with `read_direct` and
+        converted in place: times to Unix (UTC) timestamps or `datetime64[ns]`, time deltas to
+        seconds or `timedelta64[ns]`, integer counts to float64 values (see `quantization`),
+        and strings to str. Factors are returned as their integer codes, with their levels
+        listed under the '.levels' key.
+
+        Example:
+            >>> buffers = {'II': np.empty(5000)}
+            >>> for start in range(0, ds.nrow - 5000, 5000):
+            ...     ds.to_numpy(slice(start, start + 5000), columns='II', out=buffers)
+
+        Args:
+            idx: Row selection (index, slice, or increasing list of indices).
+            columns: Optional column name(s) to read.
+            datetimes: If True, times and time deltas are returned as `datetime64[ns]` and
+                `timedelta64[ns]`, otherwise as float seconds. Defaults to the file's
+                `return_datetimes`.
+            out: Optional preallocated arrays to read columns into, by column name. Each must
+                be contiguous and have one element per selected row. Times and time deltas
+                must be read into float64 arrays (int64 for times stored as ticks); the
+                returned datetimes share their memory. Counts are scaled into the given
+                array, so it must be a float array unless `counts` is True.
+                Variable-length strings are copied into the given array after reading.
+            counts: If True, columns stored as integer counts are returned as the stored
+                counts, without scaling (missing values are the smallest value of their
+                dtype), for pipelines working on the raw samples.
+
+        Returns:
+            Dictionary of column name to array, plus '.levels' (if any factor columns were
+            read) holding a dictionary of factor column name to array of levels.
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        cols = self.columns
+        names = list(cols) if columns is None else columns
+        missing = [col for col in names if col not in cols]
+        if len(missing) > 0:
+            raise KeyError(f'Columns not found in {self.name}: {missing}')
+        if datetimes is None:
+            datetimes = self.file.return_datetimes
+        out = {} if out is None else out
+
+        nrow = self.nrow
+        if isinstance(idx, (int, np.integer)):
+            idx = slice(idx, idx + 1 or None)
+        count = len(range(*idx.indices(nrow))) if isinstance(idx, slice) else \
+            len(utils.index_rows(idx, nrow))
+
+        sampling = self.sampling
+        virtual = sampling['time_column'] if sampling is not None else None
+        time_ref = self.time_reference
+        data, levels = {}, {}
+        for col in names:
+            col_type = cols[col]['type']
+            scale = 'gain' in cols[col] and not counts
+            if 'resolution' in cols[col]:
+                dtype = np.dtype('i8')
+            elif col == virtual or col_type in ('time', 'timedelta') or scale:
+                dtype = np.dtype('f8')
+            else:
+                dtype = self.hdf.dtype[col]
+            arr = out.get(col)
+            if arr is None:
+                arr = np.empty(count, dtype=dtype)
+            elif arr.shape != (count,):
+                raise ValueError(f'Buffer for {col} has shape {arr.shape}, expected ({count},).')
+            elif col_type in ('time', 'timedelta') and arr.dtype != dtype:
+                raise ValueError(f'Buffer for time column {col} must be {dtype}.')
+            elif scale and arr.dtype.kind != 'f':
+                raise ValueError(f'Buffer for quantized column {col} must be a float array.')
+
+            # Counts are read as stored (converting them in HDF5 is slower), then scaled.
+            dest = np.empty(count, dtype=self.hdf.dtype[col]) if scale else arr
+            if col == virtual:
+                arr[...] = _sampling.times_for_rows(sampling, utils.index_rows(idx, nrow))
+            elif arr.dtype.kind == 'O':
+                # Arrays of references cannot be viewed as records to read into directly.
+                arr[...] = self.hdf.fields(col)[idx]
+            elif count > 0:
+                self.hdf.read_direct(dest.view(np.dtype([(col, dest.dtype)])), source_sel=idx)
+
+            if col_type == 'factor':
+                levels[col] = np.array(cols[col]['levels'])
+            elif 'resolution' in cols[col]:
+                arr = utils.decode_ticks(arr, cols[col]['resolution'], time_ref, datetimes)
+            elif col_type in ('time', 'timedelta'):
+                arr = utils.decode_seconds(arr, time_ref if col_type == 'time' else None,
+                                           datetimes)
+            elif scale:
+                arr = utils.decode_counts(dest, cols[col]['gain'], cols[col]['offset'], arr)
+            elif col_type == 'string':
+                arr = utils.decode_strings(arr)
+            data[col] = arr
+
+        if len(levels) > 0:
+            data['.levels'] = levels
+        return data
+
+    def iter_arrow(self,
+                   columns: Optional[Union[str, List[str]]] = None,
+                   rows: Optional[int] = None) -> Iterator['pa.RecordBatch']:
+        """
+        Convert the dataset to Arrow record batches, to process or export it in bounded
+        memory (requires pyarrow).
+
+        Times become UTC timestamps, time deltas durations, factors dictionaries of their
+        levels, and strings large strings. Each field's metadata holds the audata column
+        specification as JSON under the 'audata' key.
+
+        Args:
+            columns: Optional column name(s) to convert.
+            rows: Approximate number of rows per batch, rounded up to a whole number of HDF5
+                chunks. Defaults to roughly a million rows.
+
+        Returns:
+            Iterable (generator) of record batches.
+        """
+        return _arrow.iter_batches(self, columns, rows)
+
+    def to_arrow(self, columns: Optional[Union[str, List[str]]] = None) -> 'pa.Table':
+        """
+        Convert the dataset to an Arrow table (requires pyarrow), as in `iter_arrow`.
+
+        Args:
+            columns: Optional column name(s) to convert.
+
+        Returns:
+            The table.
+        """
+        _arrow.require()
+        if isinstance(columns, str):
+            columns = [columns]
+        if columns is None:
+            columns = list(self.columns)
+        return _arrow.pa.Table.from_batches(list(self.iter_arrow(columns)),
+                                            schema=_arrow.schema(self, columns))
+
+    def memmap(self,
+               columns: Optional[Union[str, List[str]]] = None,
+               datetimes: Optional[bool] = None) -> Dict[str, _mmap.MappedColumn]:
+        """
+        Map the dataset into memory, for zero-copy reads shared by all processes reading the
+        file. Only datasets stored with the 'contiguous' storage profile can be mapped, and
+        variable-length string columns cannot be.
+
+        Each column converts just the rows selected from it, as `to_numpy` does, while its
+        stored values (e.g. time offsets or factor codes) are available without any copy
+        as its `raw` memory-mapped array.
+
+        Example:
+            >>> f.new_dataset('hot', data, storage='contiguous')
+            >>> ii = f['hot'].memmap()['II']
+            >>> ii[1000:2000]
+
+        Args:
+            columns: Optional column name(s) to map.
+            datetimes: As in `to_numpy`.
+
+        Returns:
+            Dictionary of column name to `MappedColumn`.
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        cols = self.columns
+        names = list(cols) if columns is None else columns
+        missing = [col for col in names if col not in cols]
+        if len(missing) > 0:
+            raise KeyError(f'Columns not found in {self.name}: {missing}')
+        if datetimes is None:
+            datetimes = self.file.return_datetimes
+
+        recs = _mmap.records(self.hdf)
+        sampling = self.sampling
+        virtual = sampling['time_column'] if sampling is not None else None
+        return {col: _mmap.MappedColumn(None if col == virtual else recs[col], cols[col],
+                                        self.time_reference, datetimes, sampling, len(recs))
+                for col in names}
+
     def append(self,
                data: Union[pd.DataFrame, np.recarray],
                direct: bool = False,
                time_cols: Optional[AbstractSet[str]] = None,
-               timedelta_cols: Optional[AbstractSet[str]] = None):
-        """Append additional data to a dataset."""
+               timedelta_cols: Optional[AbstractSet[str]] = None,
+               summary: Union[bool, List[str]] = False):
+        """
+        Append additional data to a dataset. Existing summaries are updated incrementally;
+        if `summary` is True (or a list of columns) and the dataset has none, one is built.
+        """
 
         if time_cols is None:
             time_cols = set({})
         if timedelta_cols is None:
             timedelta_cols = set({})
 
+        sampling = self.sampling
+        times = None
+        if sampling is not None:
+            data, times = self._split_times(data, sampling['time_column'], self.time_reference)
+
+        # Store strings, times and counts the same way as the existing data.
+        strings = self.string_modes
+        resolutions = self.time_resolutions
+        quantize = self.quantization
+
         arr = None
         if isinstance(data, np.recarray):
             arr = data
@@ -173,7 +612,10 @@ class Dataset(Element):
                 _, arr = utils.audata_from_arr(arr,
                                                time_ref=self.time_reference,
                                                time_cols=time_cols,
-                                               timedelta_cols=timedelta_cols)
+                                               timedelta_cols=timedelta_cols,
+                                               strings=strings,
+                                               time_resolution=resolutions,
+                                               quantize=quantize)
         elif direct:
             raise ValueError(
                 ('Data must be in a recarray already to use direct append! '
@@ -183,16 +625,505 @@ class Dataset(Element):
             _, arr = utils.audata_from_df(data,
                                           time_ref=self.time_reference,
                                           time_cols=time_cols,
-                                          timedelta_cols=timedelta_cols)
+                                          timedelta_cols=timedelta_cols,
+                                          strings=strings,
+                                          time_resolution=resolutions,
+                                          quantize=quantize)
+
+        # Fixed-length strings that don't fit require widening the stored column.
+        widths = {col: arr.dtype[col].itemsize
+                  for col in strings
+                  if strings[col] == 'fixed' and
+                  arr.dtype[col].itemsize > self.hdf.dtype[col].itemsize}
+        if len(widths) > 0:
+            self._widen_strings(widths)
+
+        self._write(arr, self.nrow, times)
+        if summary and _summary.get(self.hdf) is None:
+            self.build_summary(None if summary is True else summary)
+
+    def refresh(self):
+        """
+        Refresh the dataset, along with its time index and summary, to see the rows
+        appended since by a writer in SWMR mode (see `File.open`).
+        """
+        self.hdf.refresh()
+        for col in self.stored_time_columns:
+            index = _index.get(self.hdf, col)
+            if index is not None:
+                index.refresh()
+        group = _summary.get(self.hdf)
+        if group is not None:
+            for level in group.values():
+                level.refresh()
+
+    def tail(self,
+             since_row: Optional[int] = None,
+             since_time: Any = None,
+             columns: Optional[Union[str, List[str]]] = None,
+             raw: Optional[bool] = False,
+             datetimes: Optional[bool] = None) -> Union[pd.DataFrame, np.ndarray]:
+        """
+        Return the rows from `since_row` on, or with a timestamp at or after `since_time`,
+        after refreshing the dataset to see rows appended by a writer in SWMR mode.
+
+        Example:
+            >>> row = ds.nrow
+            >>> while monitoring:
+            ...     new = ds.tail(row)
+            ...     row += len(new)
+
+        Args:
+            since_row: The first row to return. Defaults to 0.
+            since_time: Alternatively, the earliest timestamp to return, as in `get_range`.
+            columns: As in `get`.
+            raw: As in `get`.
+            datetimes: As in `get`.
+
+        Returns:
+            The rows.
+        """
+        self.refresh()
+        if since_time is not None:
+            idx = self.find_rows(since_time, None)
+        else:
+            idx = slice(0 if since_row is None else since_row, self.nrow)
+        return self.get(idx, raw=raw, datetimes=datetimes, columns=columns)
+
+    def follow(self,
+               since_row: Optional[int] = None,
+               interval: float = 0.05,
+               timeout: Optional[float] = None,
+               columns: Optional[Union[str, List[str]]] = None,
+               raw: Optional[bool] = False,
+               datetimes: Optional[bool] = None) -> Iterator[Union[pd.DataFrame, np.ndarray]]:
+        """
+        Follow a dataset appended to by a writer in SWMR mode, yielding new rows as they
+        become visible.
+
+        Example:
+            >>> with audata.File.open('live.h5', swmr=True) as f:
+            ...     for rows in f['vitals'].follow(timeout=60):
+            ...         update_dashboard(rows)
+
+        Args:
+            since_row: The first row to yield. Defaults to the current end of the dataset,
+                so that only rows appended from now on are yielded.
+            interval: Seconds to wait before polling again when there are no new rows.
+            timeout: Stop after this many seconds without new rows. None to never stop.
+            columns: As in `get`.
+            raw: As in `get`.
+            datetimes: As in `get`.
+
+        Returns:
+            Iterable (generator) of DataFrames (or record arrays) of new rows.
+        """
+        self.refresh()
+        row = self.nrow if since_row is None else since_row
+        idle = time.monotonic()
+        while True:
+            nrow = self.nrow
+            if nrow > row:
+                yield self.get(slice(row, nrow), raw=raw, datetimes=datetimes, columns=columns)
+                row, idle = nrow, time.monotonic()
+            elif timeout is not None and time.monotonic() - idle >= timeout:
+                return
+            else:
+                time.sleep(interval)
+            self.refresh()
+
+    def writer(self,
+               flush_rows: Optional[int] = None,
+               flush_bytes: Optional[int] = None,
+               flush_seconds: Optional[float] = None) -> DatasetWriter:
+        """
+        Get a buffered writer for streaming many small batches of rows into the dataset.
+
+        Args:
+            flush_rows: Flush once this many rows are buffered. Defaults to 16 HDF5 chunks.
+            flush_bytes: Flush once this many bytes are buffered.
+            flush_seconds: Flush once the oldest buffered row is this many seconds old.
+
+        Returns:
+            The writer, to be used as a context manager (or closed when done).
+        """
+        return DatasetWriter(self, flush_rows, flush_bytes, flush_seconds)
+
+    def _write(self, arr: np.ndarray, start: int, times: Optional[np.ndarray] = None):
+        """
+        Write converted records starting at row `start`, growing the dataset if needed, and
+        maintain the derived data (time index, sampling segments, summary).
+
+        Args:
+            arr: The converted records.
+            start: The first row to write.
+            times: Time offsets of the records, for uniformly sampled signals. If None, the
+                records are assumed to continue the last segment.
+        """
+        stop = start + len(arr)
+        if len(self.hdf) < stop and self.hdf.chunks is None:
+            raise Exception(f'{self.name} is stored contiguously and cannot grow; '
+                            'recreate it to add rows.')
+
+        # New segments are found first, so that an append whose segments cannot be stored
+        # (e.g. across a gap in SWMR mode) is refused before any row is written.
+        segments = []
+        sampling = self.sampling
+        if sampling is not None:
+            expected = _sampling.next_time(sampling, start)
+            if times is None:
+                times = (0.0 if expected is None else expected) + \
+                    np.arange(len(arr)) / sampling['rate']
+            segments = _sampling.segments_from_times(times, sampling['rate'], start, expected)
+            if len(segments) > 0:
+                self._check_meta_writable()
+
+        if len(self.hdf) < stop:
+            self.hdf.resize((stop,))
+        self.hdf[start:stop] = arr
+        for col in self.stored_time_columns:
+            _index.update(self.hdf, col, start, stop)
+        if len(segments) > 0:
+            meta = self.meta
+            meta['sampling']['segments'] = meta['sampling']['segments'] + segments
+            self.meta = meta
+        _summary.update(self, start, stop)
+
+        # Make the rows visible to readers in SWMR mode.
+        if self.hdf.file.swmr_mode:
+            self.hdf.file.flush()
+
+    @property
+    def string_modes(self) -> Dict[str, str]:
+        """Storage mode ('fixed' or 'vlen') of each string column."""
+        dtype = self.hdf.dtype
+        return {col: 'fixed' if dtype[col].kind == 'S' else 'vlen'
+                for col in dtype.names if utils.is_string_dtype(dtype[col])}
+
+    def _widen_strings(self, widths: Dict[str, int]):
+        """Rewrite the dataset with wider fixed-length string columns."""
+        self._retype({col: np.dtype(f'S{width}') for col, width in widths.items()})
+
+    def _retype(self, dtypes: Dict[str, np.dtype],
+                specs: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Rewrite the dataset with columns stored as other dtypes (see `utils.retype_values`),
+        e.g. wider strings, or integers as reals once missing values show up.
+
+        Args:
+            dtypes: The new dtype of each column to rewrite.
+            specs: The new specification of columns whose type changes.
+        """
+        hdf = self.hdf
+        if hdf.file.swmr_mode:
+            raise Exception(f'Cannot change the storage of columns {list(dtypes)} of '
+                            f'{self.name} in SWMR mode.')
+        if isinstance(hdf, _columnar.Columns):
+            hdf.retype(dtypes)
+        else:
+            dtype = np.dtype([(col, dtypes.get(col, hdf.dtype[col])) for col in hdf.dtype.names])
+            parent, name = hdf.parent, hdf.name.rsplit('/', 1)[-1]
+            tmp = parent.create_dataset(f'.{name}.retype',
+                                        shape=hdf.shape,
+                                        dtype=dtype,
+                                        chunks=hdf.chunks,
+                                        maxshape=hdf.maxshape,
+                                        compression=hdf.compression,
+                                        compression_opts=hdf.compression_opts,
+                                        shuffle=hdf.shuffle,
+                                        fletcher32=hdf.fletcher32)
+            step = hdf.chunks[0] * 64 if hdf.chunks is not None else len(hdf)
+            for row in range(0, len(hdf), max(step, 1)):
+                block = hdf[row:row + step]
+                converted = np.empty(len(block), dtype=dtype)
+                for col in dtype.names:
+                    converted[col] = utils.retype_values(block[col], dtype[col]) \
+                        if col in dtypes else block[col]
+                tmp[row:row + step] = converted
+            for attr in hdf.attrs:
+                tmp.attrs[attr] = hdf.attrs[attr]
+            del parent[name]
+            parent.move(tmp.name, name)
+            self._h5 = parent[name]
+
+        if specs:
+            meta = self.meta
+            meta.setdefault('columns', {}).update(specs)
+            self.meta = meta
+
+    @property
+    def time_resolutions(self) -> Dict[str, str]:
+        """Resolution of each time column stored as int64 ticks (see `Dataset.new`)."""
+        cols = self.columns
+        return {col: cols[col]['resolution'] for col in self.time_columns
+                if 'resolution' in cols[col]}
+
+    @property
+    def quantization(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Gain, offset, stored dtype, units (if any) and whether the gain and offset were
+        inferred of each real column stored as integer counts (see `Dataset.new`), where
+        value = counts * gain + offset.
+        """
+        cols = self.columns
+        return {col: {'gain': spec['gain'], 'offset': spec['offset'],
+                      'dtype': self.hdf.dtype[col].name,
+                      'inferred': bool(spec.get('inferred', False)),
+                      **({'units': spec['units']} if 'units' in spec else {})}
+                for col, spec in cols.items() if 'gain' in spec}
+
+    @property
+    def layout(self) -> str:
+        """Storage layout: 'compound' (one HDF5 dataset of records) or 'columnar'."""
+        return 'columnar' if isinstance(self.hdf, _columnar.Columns) else 'compound'
+
+    @property
+    def sampling(self) -> Optional[Dict[str, Any]]:
+        """Sampling specification if this is a uniformly sampled signal, otherwise None."""
+        return self.meta.get('sampling')
+
+    @property
+    def time_columns(self) -> List[str]:
+        """Names of the columns holding timestamps."""
+        cols = self.columns
+        return [col for col in cols if cols[col]['type'] == 'time']
+
+    @property
+    def stored_time_columns(self) -> List[str]:
+        """Names of the time columns stored in the dataset (i.e., not computed)."""
+        sampling = self.sampling
+        return [col for col in self.time_columns
+                if sampling is None or col != sampling['time_column']]
+
+    def build_index(self, time_col: Optional[str] = None):
+        """
+        Build (or rebuild) the persisted sparse time index used by `get_range`.
+
+        Args:
+            time_col: The time column to index, or None to index every time column.
+        """
+        for col in self.stored_time_columns if time_col is None else [time_col]:
+            _index.build(self.hdf, col)
+
+    def get_range(self,
+                  start: Any = None,
+                  end: Any = None,
+                  time_col: Optional[str] = None,
+                  raw: Optional[bool] = False,
+                  datetimes: Optional[bool] = None,
+                  columns: Optional[Union[str, List[str]]] = None) -> pd.DataFrame:
+        """
+        Return the rows whose timestamp falls within [start, end).
+
+        Only the index blocks overlapping the window are read. Sorted time columns are
+        binary searched, so just the two boundary blocks plus the selected rows are read.
+        For uniformly sampled signals the rows are found by index arithmetic alone.
+
+        Args:
+            start: Inclusive lower bound as a datetime (or string), a Unix timestamp, or
+                None for no bound.
+            end: Exclusive upper bound, in the same forms as `start`.
+            time_col: The time column to select on. Defaults to the first time column.
+            raw: If True, return the raw record array instead of a DataFrame.
+            datetimes: As in `get`.
+            columns: As in `get`. The time column is only returned if requested.
+
+        Returns:
+            The selected rows.
+        """
+        return self.get(self.find_rows(start, end, time_col),
+                        raw=raw,
+                        datetimes=datetimes,
+                        columns=columns)
+
+    def find_rows(self, start: Any = None, end: Any = None, time_col: Optional[str] = None
+                 ) -> Union[slice, np.ndarray]:
+        """
+        Find the rows whose timestamp falls within [start, end), as in `get_range`.
+
+        Returns:
+            A slice if the rows are contiguous, otherwise an array of row indices.
+        """
+        if time_col is None:
+            if len(self.time_columns) == 0:
+                raise Exception(f'Dataset {self.name} has no time column.')
+            time_col = self.time_columns[0]
+        elif time_col not in self.time_columns:
+            raise ValueError(f'{time_col} is not a time column.')
+
+        time_ref = self.time_reference
+        resolution = self.columns[time_col].get('resolution')
+        if resolution is not None:
+            # Compare ticks with ticks, exactly.
+            lo = utils.time_tick(start, time_ref, resolution)
+            hi = utils.time_tick(end, time_ref, resolution)
+        else:
+            lo, hi = utils.time_offset(start, time_ref), utils.time_offset(end, time_ref)
+        if time_col in self.stored_time_columns:
+            rows, indices = _index.find_rows(self.hdf, time_col, lo, hi)
+        else:
+            rows, indices = _sampling.rows_in_range(self.sampling, self.nrow, lo, hi)
+        return rows if rows is not None else indices
+
+    def build_summary(self,
+                      columns: Optional[List[str]] = None,
+                      base: int = _summary.DEFAULT_BASE,
+                      factor: int = _summary.DEFAULT_FACTOR):
+        """
+        Build (or rebuild) the persisted multi-resolution summary used by `get_summary`.
+        Once built, it is updated whenever rows are appended.
+
+        Args:
+            columns: The columns to summarize (time columns are always included). Defaults
+                to all but the factor and string columns.
+            base: Rows per entry of the finest level.
+            factor: Entries of each level merged into one entry of the next level.
+        """
+        _summary.build(self, columns, base, factor)
+
+    def _resolve_bounds(self, start: Any, end: Any, time_col: Optional[str]
+                       ) -> Tuple[int, int, Optional[np.ndarray]]:
+        """
+        Resolve row (int) or timestamp bounds, as taken by `iter_chunks` and `get_summary`,
+        to a row range, plus the selected rows if they are not contiguous.
+
+        Returns:
+            Tuple of (first row, row to stop before, selected rows or None).
+        """
+        rows_given = [isinstance(bound, (int, np.integer)) for bound in (start, end)
+                      if bound is not None]
+        if len(set(rows_given)) > 1:
+            raise ValueError(f'Cannot mix a row and a timestamp bound ({start!r}, {end!r}); '
+                             'give both as rows (int) or both as timestamps.')
+        if all(rows_given):
+            first, stop, _ = slice(start, end).indices(self.nrow)
+            return first, stop, None
+        found = self.find_rows(start, end, time_col)
+        if isinstance(found, slice):
+            return found.start, found.stop, None
+        first, stop = (int(found[0]), int(found[-1]) + 1) if len(found) > 0 else (0, 0)
+        return first, stop, found
+
+    def get_summary(self,
+                    start: Any = None,
+                    end: Any = None,
+                    max_points: int = 2000,
+                    time_col: Optional[str] = None,
+                    datetimes: Optional[bool] = None) -> pd.DataFrame:
+        """
+        Return the min, max, mean and count of each numeric column over buckets of rows
+        within [start, end), at the finest resolution with at most `max_points` buckets,
+        e.g. to plot a zoomed-out view of a long signal.
+
+        Buckets come from the summary (see `build_summary`), so only a few thousand entries
+        are read however long the window is; buckets at the edges of the window may include
+        some rows just outside it. Windows of at most `max_points` rows are returned one row
+        per bucket, and datasets without a summary are summarized on the fly.
+
+        Args:
+            start: First row (int), or a timestamp as in `get_range`. Note that floats are
+                Unix timestamps, not row numbers.
+            end: Row (int) or timestamp to stop before. Rows and timestamps cannot be mixed,
+                except with None.
+            max_points: Maximum number of buckets.
+            time_col: The time column for timestamp bounds, as in `get_range`.
+            datetimes: As in `get`, for the statistics of time columns.
+
+        Returns:
+            DataFrame with a (column, statistic) column index, one row per bucket.
+        """
+        first, stop, _ = self._resolve_bounds(start, end, time_col)
+        _, _, entries = _summary.load(self, first, max(first, stop), max(1, max_points))
+        if datetimes is None:
+            datetimes = self.file.return_datetimes
+        time_ref = self.time_reference
+        cols = self.columns
+        data = {}
+        for col in entries.dtype.names:
+            for stat in _summary.STATS.names:
+                values = entries[col][stat]
+                if stat != 'count' and cols[col]['type'] == 'time':
+                    if datetimes:
+                        values = utils.decode_times(values, time_ref)
+                    else:
+                        values = values + utils.utc_reference(time_ref).timestamp()
+                data[(col, stat)] = values
+        return pd.DataFrame(data=data, columns=pd.MultiIndex.from_tuples(
+            list(data), names=['column', 'statistic']))
+
+    def iter_chunks(self,
+                    rows: Optional[int] = None,
+                    columns: Optional[Union[str, List[str]]] = None,
+                    start: Any = None,
+                    end: Any = None,
+                    time_col: Optional[str] = None,
+                    raw: Optional[bool] = False,
+                    datetimes: Optional[bool] = None,
+                    prefetch: bool = False) -> Iterator[Union[pd.DataFrame, np.ndarray]]:
+        """
+        Iterate over the dataset in blocks, to process it in constant memory.
+
+        Blocks are aligned to the HDF5 chunk layout, so no chunk is read (and decompressed)
+        twice.
+
+        Args:
+            rows: Approximate number of rows per block, rounded up to a whole number of HDF5
+                chunks. Defaults to roughly a million rows.
+            columns: As in `get`.
+            start: First row (int), or a timestamp as in `get_range`. Note that floats are
+                Unix timestamps, not row numbers.
+            end: Row (int) or timestamp to stop before. Rows and timestamps cannot be mixed,
+                except with None.
+            time_col: The time column for timestamp bounds, as in `get_range`.
+            raw: If True, yield raw record arrays instead of DataFrames.
+            datetimes: As in `get`.
+            prefetch: If True, the next block is read on a background thread while the
+                current one is being processed.
+
+        Returns:
+            Iterable (generator) of DataFrames (or record arrays).
+        """
+        chunk = self.hdf.chunks[0] if self.hdf.chunks is not None else 1
+        if rows is None:
+            rows = 1 << 20
+        rows = max(1, -(-rows // chunk)) * chunk
+
+        first, stop, indices = self._resolve_bounds(start, end, time_col)
+
+        def blocks():
+            block_start = first
+            while block_start < stop:
+                block_stop = min(stop, (block_start // rows + 1) * rows)
+                if indices is None:
+                    yield slice(block_start, block_stop)
+                else:
+                    lo, hi = np.searchsorted(indices, [block_start, block_stop])
+                    if hi > lo:
+                        yield indices[lo:hi]
+                block_start = block_stop
+
+        def read(idx):
+            return self.get(idx, raw=raw, datetimes=datetimes, columns=columns)
+
+        if not prefetch:
+            for idx in blocks():
+                yield read(idx)
+            return
 
-        data_len = len(arr)
-        self.hdf.resize((self.nrow + data_len,))
-        self.hdf[-data_len:] = arr
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = None
+            for idx in blocks():
+                future = executor.submit(read, idx)
+                if pending is not None:
+                    yield pending.result()
+                pending = future
+            if pending is not None:
+                yield pending.result()
 
     @property
     def ncol(self) -> int:
         """Number of columns in dataset."""
-        return len(self.hdf.dtype)
+        return len(self.columns)
 
     @property
     def nrow(self) -> int:
@@ -203,8 +1134,8 @@ class Dataset(Element):
     def columns(self) -> Dict[str, Any]:
         """Get dictionary of column specifications."""
 
-        # Get the column definitions from the dataset meta
-        metacols = self.meta['columns'] if self.meta is not None and 'columns' in self.meta else {}
+        # Get the column definitions from the dataset meta (copied, as the meta is cached)
+        metacols = {col: dict(spec) for col, spec in self.meta.get('columns', {}).items()}
 
         # Get the column names from the dataset
         try:
@@ -215,12 +1146,12 @@ class Dataset(Element):
         # TODO: Handle non-compound datasets
 
         # Return a merge of the two, with meta cols overridding the dset cols.
-        return {**dscols, **metacols}
+        return {**metacols, **{col: dscols[col] for col in dscols if col not in metacols}}
 
     @property
     def shape(self) -> Tuple[int, int]:
         """Get dataset shape tuple (rows, cols)."""
-        return (self.nrow(), self.ncol())
+        return (self.nrow, self.ncol)
 
     def __repr__(self):
 
@@ -251,6 +1182,15 @@ class Dataset(Element):
                 if nlevels > 3:
                     lvls += ', ...'
                 tstr = f'factor with {nlevels} levels [{lvls}]'
+            elif self.sampling is not None and col == self.sampling['time_column']:
+                tstr = f'time (sampled at {self.sampling["rate"]:g} Hz)'
+            elif 'resolution' in col_meta:
+                tstr = f'{col_meta["type"]} ({col_meta["resolution"]} ticks)'
+            elif 'gain' in col_meta:
+                tstr = '{} ({} counts x {:g}{}{})'.format(
+                    col_meta['type'], self.hdf.dtype[col].name, col_meta['gain'],
+                    f' + {col_meta["offset"]:g}' if col_meta['offset'] != 0 else '',
+                    f' {col_meta["units"]}' if 'units' in col_meta else '')
             else:
                 tstr = col_meta['type']
             lines.append(f'  {col}: {tstr}')
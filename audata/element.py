@@ -4,6 +4,13 @@ import h5py as h5
 
 from audata._utils import json2dict, dict2json
 
+# Cache keys for file-level metadata (never valid HDF5 paths).
+FILE_META = '.file_meta'
+TIME_REFERENCE = '.time_reference'
+# Cache keys for the node table and the wrappers handed out (see `audata.group.Group`).
+NODES = '.nodes'
+WRAPPERS = '.wrappers'
+
 
 class Element:
     """
@@ -18,14 +25,18 @@ class Element:
             self.parent = None
             self.file = None
             self._h5 = None
+            self._cache = {}
         elif isinstance(parent, h5.File):
             self.parent = self
             self.file = self
             self._h5 = parent
+            self._cache = {}
         elif isinstance(parent, Element):
             self.parent = parent
             self.file = parent.file
             self._h5 = parent._h5 if name == '' else parent._h5[name]
+            # Parsed metadata is cached per file, shared by all of its elements.
+            self._cache = parent._cache
         else:
             raise Exception(f'Invalid parent: {type(parent)}.')
 
@@ -34,6 +45,25 @@ class Element:
         self.parent = None
         self.file = None
         self._h5 = None
+        self._cache = {}
+
+    def clear_cache(self):
+        """
+        Forget cached metadata for all elements of the file, e.g. if it may have been
+        modified by another process.
+        """
+        self._cache.clear()
+
+    def _forget_nodes(self):
+        """Forget the cached node table and wrappers once groups or datasets are created or
+        deleted."""
+        self._cache.pop(NODES, None)
+        self._cache.pop(WRAPPERS, None)
+
+    def _check_meta_writable(self):
+        """Attributes cannot be written in SWMR mode, so neither can metadata."""
+        if self._h5.file.swmr_mode:
+            raise Exception('Metadata cannot be changed while the file is in SWMR mode.')
 
     @property
     def hdf(self) -> Optional[h5.HLObject]:
@@ -65,19 +95,49 @@ class Element:
 
     @property
     def meta(self) -> Dict[str, Any]:
-        """Element meta data (HDF5 .meta attribute) (JSON dictionary)"""
-        return json2dict(self._h5.attrs['.meta']) if self.valid and '.meta' in self._h5.attrs else {}
+        """
+        Element meta data (HDF5 .meta attribute) (JSON dictionary)
+
+        The parsed metadata is cached, so the returned dictionary should not be modified
+        unless it is assigned back to `meta`. The cache is dropped whenever `meta` is
+        assigned, even if it cannot be written, so changes that never reached the file are
+        not kept.
+        """
+        if not self.valid:
+            return {}
+        key = self._h5.name
+        if key not in self._cache:
+            attrs = self._h5.attrs
+            self._cache[key] = json2dict(attrs['.meta']) if '.meta' in attrs else {}
+        return self._cache[key]
 
     @meta.setter
     def meta(self, data: Dict[str, Any]):
         if not self.valid:
             raise Exception('Attempting to set meta on invalid element!')
-        self._h5.attrs['.meta'] = dict2json(data)
+        try:
+            self._check_meta_writable()
+            self._h5.attrs['.meta'] = dict2json(data)
+        finally:
+            # Callers change the cached dictionary in place before assigning it back.
+            if self._h5.name == '/':
+                self._cache.clear()
+            else:
+                self._cache.pop(self._h5.name, None)
 
     @property
     def file_meta(self) -> Dict[str, Any]:
-        """File metadata (HDF5 .meta attribute of the built-in root group) (JSON dictionary, read-only)"""
+        """
+        File metadata (HDF5 .meta attribute of the built-in root group) (JSON dictionary)
+
+        As with `meta`, the returned dictionary should not be modified unless it is
+        assigned back to `file_meta`.
+        """
+        if FILE_META not in self._cache:
+            self._cache[FILE_META] = self.__read_file_meta()
+        return self._cache[FILE_META]
 
+    def __read_file_meta(self) -> Dict[str, Any]:
         # Get the .meta attribute if it exists, otherwise return empty object now
         try:
             ms = self._h5.file.attrs['.meta']
@@ -96,4 +156,10 @@ class Element:
     def file_meta(self, data: Dict[str, Any]):
         if not self.valid:
             raise Exception('Attempting to set file meta on invalid elemenet!')
-        self._h5.file.attrs['.meta'] = dict2json(data)
+        try:
+            self._check_meta_writable()
+            self._h5.file.attrs['.meta'] = dict2json(data)
+        finally:
+            # Anything derived from the file metadata (e.g. the time reference) is stale, and
+            # so is the cached metadata if it was changed in place but could not be written.
+            self._cache.clear()
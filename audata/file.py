@@ -1,15 +1,20 @@
 """HDF5 file wrapper class."""
 import os
 import datetime as dt
-from typing import Optional, Union, Dict, Any
+from typing import Optional, Union, Dict, Any, List
 
 import tzlocal
+import numpy as np
+import pandas as pd
 import h5py as h5
 from datetime import datetime
 from dateutil import parser
 
 from audata import __VERSION__, __DATA_VERSION__
-from audata._utils import dict2json, json2dict
+from audata import _storage, _align
+from audata._utils import dict2json, json2dict, delete_node, decode_seconds, decode_times, \
+    time_offset, utc_reference
+from audata.element import TIME_REFERENCE
 from audata.group import Group
 
 
@@ -81,9 +86,10 @@ class File(Group):
 
     def __delitem__(self, key):
         """
-        Deletes a group/dataset.
+        Deletes a group/dataset, along with its companion group.
         """
-        del self._h5[key]
+        delete_node(self._h5, key)
+        self._forget_nodes()
 
     @property
     def time_reference(self) -> dt.datetime:
@@ -93,6 +99,12 @@ class File(Group):
         Can be set with either a `dt.datetime` object or a `str` that can be parsed as
         a datetime. If a naive datetime is provided, the local timezone will be inferred.
         """
+        # Parsing is slow, so the result is cached until the file metadata is set.
+        if TIME_REFERENCE not in self._cache:
+            self._cache[TIME_REFERENCE] = self.__parse_time_reference()
+        return self._cache[TIME_REFERENCE]
+
+    def __parse_time_reference(self) -> dt.datetime:
         if 'time_origin' in self.file_meta:
             origin = self.file_meta['time_origin']
             if isinstance(origin, str):
@@ -135,6 +147,8 @@ class File(Group):
             time_reference: Union[str, dt.datetime] = 'now',
             metadata: Dict[str, Any] = {},
             return_datetimes: bool = True,
+            storage: Union[str, Dict[str, Any], None] = None,
+            swmr: bool = False,
             **kwargs) -> 'File':
         """
         Create a new file.
@@ -148,6 +162,11 @@ class File(Group):
             metadata: An optional dict containing global metadata for the file.
             return_datetimes: If True times will be converted to `dt.datetime` objects,
                 otherwise Unix (UTC) timestamps.
+            storage: Default chunking and compression profile for datasets in the file:
+                'default', 'archive', 'random-access', 'streaming', or a dictionary (see
+                `audata._storage`). It is saved in the file metadata.
+            swmr: If True, create the file in the HDF5 format required for single-writer/
+                multiple-reader access; call `start_swmr` once its datasets are created.
             **kwargs: Additional keyword arguments will be passed on to `h5.File`'s constructor.
 
         Returns:
@@ -159,6 +178,14 @@ class File(Group):
         if time_reference == 'now':
             time_reference = dt.datetime.now(tz=tzlocal.get_localzone())
 
+        if storage is not None:
+            # Validate now rather than when the first dataset is created.
+            _storage.resolve(storage)
+            metadata = {**metadata, 'storage': storage}
+
+        if swmr:
+            kwargs.setdefault('libver', 'latest')
+
         # Create the hdf5 file
         h5_file = h5.File(filename, 'w', **kwargs)
 
@@ -179,10 +206,20 @@ class File(Group):
              create: bool = False,
              readonly: bool = True,
              return_datetimes: bool = True,
+             swmr: bool = False,
              **kwargs) -> 'File':
         """
         Open an audata file.
 
+        With `swmr`, one process may append to the file while others read it (HDF5's
+        single-writer/multiple-reader mode). The file must have been created with
+        `new(..., swmr=True)`. No groups, datasets or metadata can be created or changed
+        while writing in this mode, so factor levels must all be known and fixed-length
+        strings wide enough when the datasets are created, and uniformly sampled signals
+        cannot have gaps. Readers can only open the file once the writer is in SWMR mode,
+        and see appended rows after `Dataset.refresh`, or with `Dataset.tail` and
+        `Dataset.follow`.
+
         Args:
             filename: The path to the file to open.
             create: If True, missing files will be created. Otherwise, missing files
@@ -190,6 +227,8 @@ class File(Group):
             readonly: Whether to open in read-only or mutable.
             return_datetimes: If True times will be converted to `dt.datetime` objects,
                 otherwise Unix (UTC) timestamps.
+            swmr: If True, open the file for reading while another process writes to it,
+                or (if not `readonly`) for writing while other processes read it.
             **kwargs: Additional keyword arguments will be passed on to `h5.File`'s constructor
                 if a file is to be created.
 
@@ -202,10 +241,105 @@ class File(Group):
             else:
                 raise Exception(f'File not found: {filename}')
 
-        h5_file = h5.File(filename, 'r' if readonly else 'a')
+        if swmr:
+            h5_file = h5.File(filename, 'r' if readonly else 'a', libver='latest', swmr=readonly)
+        else:
+            h5_file = h5.File(filename, 'r' if readonly else 'a')
         au_file = cls(h5_file, return_datetimes=return_datetimes)
+        if swmr and not readonly:
+            au_file.start_swmr()
         return au_file
 
+    @property
+    def swmr(self) -> bool:
+        """Whether the file is in SWMR mode (`bool`, read-only)"""
+        return self.hdf.swmr_mode
+
+    def start_swmr(self):
+        """
+        Switch a file opened for writing to SWMR mode, so that other processes can open it
+        with `open(..., swmr=True)` and read rows while they are appended. Create all
+        groups and datasets first: none can be created until the file is closed.
+        """
+        self.hdf.flush()
+        self.hdf.swmr_mode = True
+
+    def align(self,
+              paths: Union[List[str], Dict[str, Optional[List[str]]]],
+              start: Any,
+              end: Any,
+              freq: Union[float, str, dt.timedelta] = 1.0,
+              method: str = 'nearest',
+              tolerance: Union[float, str, dt.timedelta, None] = None,
+              datetimes: Optional[bool] = None,
+              as_: str = 'pandas') -> Union[pd.DataFrame, Dict[str, np.ndarray]]:
+        """
+        Align several datasets onto a common time grid.
+
+        Only the window [start, end) of each dataset is read, and of the value columns only
+        the rows next to grid times, so a 500 Hz waveform aligned onto a one second grid
+        reads its time column for the window but just one sample per second of each signal.
+
+        Example:
+            >>> f.align(['waveform/ecg', 'vitals/HR'], '2020-05-04 10:00', '2020-05-04 11:00',
+            ...         freq='1s', method='linear', tolerance='5s')
+
+        Args:
+            paths: The datasets, or a dictionary of dataset to the columns to align (None
+                for all). By default all columns but the time columns are aligned, and only
+                numeric columns when interpolating.
+            start: Start of the grid, as in `Dataset.get_range`.
+            end: End of the grid (exclusive), as in `Dataset.get_range`.
+            freq: Grid spacing, in seconds or as a string (e.g. '200ms') or timedelta.
+            method: 'nearest' for the closest sample, 'last' for the latest sample at or
+                before each grid time, or 'linear' to interpolate (numeric columns only).
+            tolerance: Maximum distance to the sample used, or for 'linear' between the two
+                samples interpolated; grid times without such samples are missing (NaN).
+                In seconds or as a string or timedelta. None for no limit.
+            datetimes: As in `Dataset.get`.
+            as_: 'pandas' for a DataFrame, or 'numpy' for a dictionary of arrays as returned by
+                `Dataset.to_numpy`.
+
+        Returns:
+            The grid times in column 'time' followed by the aligned columns, named
+            '<dataset path>/<column>'.
+        """
+        if as_ not in ('pandas', 'numpy'):
+            raise ValueError(f'Unknown output type "{as_}", expected "pandas" or "numpy".')
+        if not isinstance(paths, dict):
+            paths = {path: None for path in paths}
+        if datetimes is None:
+            datetimes = self.return_datetimes
+
+        time_ref = self.time_reference
+        lo, hi = time_offset(start, time_ref), time_offset(end, time_ref)
+        offsets = _align.grid(lo, hi, _align.seconds(freq))
+        targets = offsets + utc_reference(time_ref).timestamp()
+        tolerance = _align.seconds(tolerance)
+
+        data, levels = {'time': targets}, {}
+        for path, columns in paths.items():
+            dataset = self[path]
+            if dataset is None:
+                raise KeyError(f'Dataset {path} not found.')
+            aligned = _align.align(dataset, targets, method, tolerance, columns)
+            for col, values in aligned.pop('.levels', {}).items():
+                levels[f'{path}/{col}'] = values
+            data.update({f'{path}/{col}': values for col, values in aligned.items()})
+
+        if as_ == 'numpy':
+            if datetimes:
+                data['time'] = decode_seconds(offsets, time_ref, True)
+            if len(levels) > 0:
+                data['.levels'] = levels
+            return data
+
+        if datetimes:
+            data['time'] = decode_times(offsets, time_ref)
+        for col, values in levels.items():
+            data[col] = pd.Categorical.from_codes(data[col], values)
+        return pd.DataFrame(data=data)
+
     def close(self):
         """Close the file handle."""
         if self.hdf is not None:
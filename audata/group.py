@@ -1,10 +1,14 @@
 """Wrapper for Group types."""
-from typing import Dict, List, Iterable, Tuple, Union
+import posixpath
+from typing import Dict, List, Iterable, Tuple, Union, Optional
 
 import h5py as h5
 
-from audata.element import Element
+from audata import _utils as utils
+from audata import _columnar
+from audata.element import Element, NODES, WRAPPERS
 from audata.dataset import Dataset
+from audata.writer import DatasetWriter
 
 
 class Group(Element):
@@ -23,16 +27,12 @@ class Group(Element):
             if not isinstance(parent, h5.Group):
                 raise Exception(f'Invalid parent: {type(parent)}')
 
-            if name == '':
-                target = parent
-            else:
-                if name not in parent:
-                    raise Exception(
-                        f'Path {name} was not found in {parent.file.filename}:{parent.name}'
-                    )
-
-                target = parent[name]
-            if not isinstance(target, h5.Group):
+            cls = type(parent) if name == '' else parent.get(name, getclass=True)
+            if cls is None:
+                raise Exception(
+                    f'Path {name} was not found in {parent.file.filename}:{parent.name}'
+                )
+            if not issubclass(cls, h5.Group):
                 raise Exception(
                     f'Path "{name}" is not a group in {parent.file.filename}:{parent.name}'
                 )
@@ -42,28 +42,129 @@ class Group(Element):
     def list(self) -> Dict[str, List[str]]:
         """List all child attributes, groups, and datasets."""
         attrs = list(self.hdf.attrs)
-        others = list(self.hdf)
-        groups = [g for g in others if isinstance(self.hdf[g], h5.Group)]
-        datasets = [d for d in others if isinstance(self.hdf[d], h5.Dataset)]
+        # Look up the object types without opening the objects.
+        classes = {}
+        for name in self.hdf:
+            cls = self.hdf.get(name, getclass=True)
+            if cls is not None and issubclass(cls, h5.Group) and \
+                    _columnar.is_columnar_path(self.hdf, name):
+                cls = _columnar.Columns
+            classes[name] = cls
+        groups = [g for g, cls in classes.items() if cls is not None and issubclass(cls, h5.Group)]
+        datasets = [d for d, cls in classes.items()
+                    if cls is not None and issubclass(cls, (h5.Dataset, _columnar.Columns))]
         return {'attributes': attrs, 'groups': groups, 'datasets': datasets}
 
+    def _nodes(self) -> Dict[str, type]:
+        """
+        The node table of the file: the class (`h5.Group` or `h5.Dataset`, or
+        `audata._columnar.Columns` for columnar datasets, whose columns are left out) of
+        every group and dataset, by absolute path, in depth-first name order. It is built in
+        one pass over the objects of the file, without opening any of them, and cached until
+        groups or datasets are created or deleted through `audata`.
+
+        Objects reachable by more than one link (soft links, or further hard links) are
+        listed under every link, along with the contents of linked groups; links within
+        linked groups and dangling or external links are left out.
+        """
+        nodes = self._cache.get(NODES)
+        if nodes is None:
+            nodes = {}
+            classes = {h5.h5o.TYPE_GROUP: h5.Group, h5.h5o.TYPE_DATASET: h5.Dataset}
+            fid = self.hdf.file.id
+            columnar = []
+            paths = {}
+            visited = set()
+
+            def visit(name: bytes, info: h5.h5o.ObjInfo):
+                if info.type not in classes or name.startswith(tuple(columnar)):
+                    return
+                cls = classes[info.type]
+                if cls is h5.Group and info.num_attrs > 0 and \
+                        h5.h5a.exists(fid, _columnar.LAYOUT_ATTR.encode(), obj_name=name):
+                    cls = _columnar.Columns
+                    columnar.append(name + b'/')
+                nodes['/' + name.decode()] = cls
+                paths[info.addr] = '/' + name.decode()
+                visited.add(name)
+
+            # Objects are visited once, by their first link in name order; other links to
+            # them are found by visiting the links.
+            links = []
+
+            def visit_link(name: bytes, info: h5.h5l.LinkInfo):
+                if name not in visited and info.type in (h5.h5l.TYPE_HARD, h5.h5l.TYPE_SOFT) \
+                        and not name.startswith(tuple(columnar)):
+                    links.append(name)
+
+            h5.h5o.visit(fid, visit, info=True)
+            fid.links.visit(visit_link, info=True)
+            for name in links:
+                try:
+                    target = paths.get(h5.h5o.get_info(fid, name).addr)
+                except (KeyError, RuntimeError):
+                    # Dangling soft link.
+                    continue
+                if target is None:
+                    continue
+                path = '/' + name.decode()
+                nodes[path] = nodes[target]
+                if nodes[target] is h5.Group:
+                    prefix = target + '/'
+                    nodes.update({path + '/' + sub[len(prefix):]: cls
+                                  for sub, cls in list(nodes.items())
+                                  if sub.startswith(prefix)})
+            if len(links) > 0:
+                nodes = dict(sorted(nodes.items(), key=lambda item: item[0].split('/')))
+            self._cache[NODES] = nodes
+        return nodes
+
+    def _descendants(self) -> Iterable[Tuple[str, type]]:
+        """
+        The groups and datasets below this group from the node table, except those under
+        a period-prefixed name.
+
+        Returns:
+            Iterable (generator) of tuples of (path relative to this group: str, class: type).
+        """
+        prefix = self.hdf.name.rstrip('/') + '/'
+        for path, cls in self._nodes().items():
+            if path.startswith(prefix):
+                name = path[len(prefix):]
+                if not name.startswith('.') and '/.' not in name:
+                    yield name, cls
+
     def recurse(self) -> Iterable[Tuple[Element, str]]:
         """
         Recursively find all datasets. Groups and datasets prefixed with a period
-        are ignored.
+        are ignored. Datasets reachable through more than one link (e.g. a soft link) are
+        found under each link.
 
         Returns:
             Iterable (generator) of tuples of (object: Element, name: str).
         """
-        names = [n for n in list(self.hdf) if not n.startswith('.')]
-        for name in names:
-            elem = self.__getitem__(name)
-            if isinstance(elem, Group):
-                for stuple in elem.recurse():
-                    yield stuple
-            else:
+        for name, cls in self._descendants():
+            if issubclass(cls, (h5.Dataset, _columnar.Columns)):
+                elem = self.__getitem__(name)
                 yield (elem, elem.name)
 
+    def walk(self) -> Iterable[Tuple[str, Tuple[int, ...]]]:
+        """
+        Quickly walk all datasets below this group, as `recurse` does, but without creating
+        `Dataset` objects or reading their metadata.
+
+        Returns:
+            Iterable (generator) of tuples of (name: str, shape: tuple).
+        """
+        fid = self.hdf.file.id
+        prefix = self.hdf.name.rstrip('/') + '/'
+        for name, cls in self._descendants():
+            path = prefix + name
+            if issubclass(cls, h5.Dataset):
+                yield (path, h5.h5d.open(fid, path.encode()).shape)
+            elif issubclass(cls, _columnar.Columns):
+                yield (path, _columnar.Columns(self.hdf.file[path]).shape)
+
     def __repr__(self):
         lines = []
         elems = self.list()
@@ -90,16 +191,23 @@ class Group(Element):
         if key == '':
             return Group(self, key)
 
-        if key in self.hdf:
-            if isinstance(self.hdf[key], h5.Dataset):
-                return Dataset(self, key)
-            elif isinstance(self.hdf[key], h5.Group):
-                return Group(self, key)
-            else:
-                raise Exception('Unsure how to handle class: {}'.format(
-                    type(self.hdf[key])))
-        else:
+        # Wrappers are reused, so that their metadata is not looked up again.
+        path = posixpath.normpath(posixpath.join(self.hdf.name, key))
+        wrappers = self._cache.setdefault(WRAPPERS, {})
+        if path in wrappers:
+            return wrappers[path]
+
+        cls = self.hdf.get(key, getclass=True)
+        if cls is None:
             return None
+        elif issubclass(cls, h5.Dataset) or _columnar.is_columnar(self.hdf[key]):
+            elem = Dataset(self, key)
+        elif issubclass(cls, h5.Group):
+            elem = Group(self, key)
+        else:
+            raise Exception('Unsure how to handle class: {}'.format(cls))
+        wrappers[path] = elem
+        return elem
 
     def __setitem__(self,
                     key: str,
@@ -112,8 +220,8 @@ class Group(Element):
             raise Exception('No group opened.')
 
         if value is None:
-            if key in self.hdf:
-                del self.hdf[key]
+            utils.delete_node(self.hdf, key)
+            self._forget_nodes()
         else:
             Dataset.new(self, key, value, overwrite=overwrite, **kwargs)
 
@@ -128,3 +236,32 @@ class Group(Element):
         """Create a new dataset."""
 
         self.__setitem__(name, value, **kwargs)
+
+    def stream_writer(self,
+                      name: str,
+                      flush_rows: Optional[int] = None,
+                      flush_bytes: Optional[int] = None,
+                      flush_seconds: Optional[float] = None,
+                      **kwargs) -> DatasetWriter:
+        """
+        Get a buffered writer for streaming rows into a dataset.
+
+        Args:
+            name: The dataset. If it does not exist yet, it is created from the first batch
+                of rows written.
+            flush_rows: Flush once this many rows are buffered. Defaults to 16 HDF5 chunks.
+            flush_bytes: Flush once this many bytes are buffered.
+            flush_seconds: Flush once the oldest buffered row is this many seconds old.
+            **kwargs: Additional keyword arguments passed on to `Dataset.new` if the dataset
+                is to be created.
+
+        Returns:
+            The writer, to be used as a context manager (or closed when done).
+        """
+        if self.hdf is None:
+            raise Exception('No group opened.')
+
+        if name in self.hdf:
+            return self[name].writer(flush_rows, flush_bytes, flush_seconds)
+        return DatasetWriter(None, flush_rows, flush_bytes, flush_seconds,
+                             au_parent=self, name=name, **kwargs)
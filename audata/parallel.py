@@ -0,0 +1,124 @@
+"""Reading datasets from many audata files in parallel."""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Union, List, Tuple, Iterable, Iterator, Any
+
+import pandas as pd
+
+from audata.file import File
+
+ERROR_MODES = ('warn', 'raise', 'ignore')
+
+
+def _read_one(path: str,
+              dataset: str,
+              columns: Optional[Union[str, List[str]]],
+              time_range: Optional[Tuple[Any, Any]],
+              datetimes: Optional[bool]) -> Tuple[str, Optional[pd.DataFrame], Optional[str]]:
+    """Read one dataset from one file, returning (path, data, error message)."""
+    try:
+        with File.open(path) as au_file:
+            if dataset not in au_file:
+                return path, None, f'Dataset {dataset} not found'
+            data = au_file[dataset]
+            if time_range is None:
+                return path, data.get(slice(None), columns=columns, datetimes=datetimes), None
+            start, end = time_range
+            return path, data.get_range(start, end, columns=columns, datetimes=datetimes), None
+    except Exception as e:
+        return path, None, f'{type(e).__name__}: {e}'
+
+
+def iter_many(paths: Iterable[str],
+              dataset: str,
+              columns: Optional[Union[str, List[str]]] = None,
+              time_range: Optional[Tuple[Any, Any]] = None,
+              workers: Optional[int] = None,
+              datetimes: Optional[bool] = None,
+              errors: str = 'warn') -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Read the same dataset from many files, yielding results as they complete.
+
+    See `read_many` for the arguments.
+
+    Returns:
+        Iterable (generator) of tuples of (path: str, data: DataFrame), in completion order.
+    """
+    if errors not in ERROR_MODES:
+        raise ValueError(f'Unknown error mode "{errors}", expected one of {ERROR_MODES}')
+
+    def handle(result):
+        path, data, error = result
+        if error is None:
+            return path, data
+        if errors == 'raise':
+            raise Exception(f'Unable to read {dataset} from {path}: {error}')
+        if errors == 'warn':
+            print(f'Skipping {path}: {error}')
+        return None
+
+    args = (dataset, columns, time_range, datetimes)
+    if workers is not None and workers <= 1:
+        for path in paths:
+            result = handle(_read_one(path, *args))
+            if result is not None:
+                yield result
+        return
+
+    # HDF5 does not support concurrent reads from threads, so use processes.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_read_one, path, *args) for path in paths]
+        try:
+            for future in as_completed(futures):
+                result = handle(future.result())
+                if result is not None:
+                    yield result
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def read_many(paths: Iterable[str],
+              dataset: str,
+              columns: Optional[Union[str, List[str]]] = None,
+              time_range: Optional[Tuple[Any, Any]] = None,
+              workers: Optional[int] = None,
+              datetimes: Optional[bool] = None,
+              errors: str = 'warn',
+              iterator: bool = False,
+              key: str = 'file') -> Union[pd.DataFrame, Iterator[Tuple[str, pd.DataFrame]]]:
+    """
+    Read the same dataset from many audata files using a pool of worker processes.
+
+    Example:
+        >>> data = audata.read_many(glob('cohort/*.h5'), 'vitals/MAP',
+        ...                         time_range=('2020-01-01', '2020-01-02'), workers=8)
+
+    Args:
+        paths: The audata files.
+        dataset: Path of the dataset within each file.
+        columns: Optional column name(s) to read, as in `Dataset.get`.
+        time_range: Optional tuple of (start, end) timestamps to read, as in
+            `Dataset.get_range`.
+        workers: Number of worker processes. Defaults to the number of CPUs; 1 reads the
+            files in this process.
+        datetimes: As in `Dataset.get`.
+        errors: What to do about missing files or datasets and read errors: 'warn' to print
+            a message and skip the file, 'ignore' to skip it silently, or 'raise'.
+        iterator: If True, return an iterator of (path, DataFrame) tuples in completion
+            order instead of a single DataFrame.
+        key: Name of the column identifying the source file in the concatenated DataFrame.
+
+    Returns:
+        The data of all files concatenated (in the order of `paths`), with the file path in
+        column `key`, or an iterator of results.
+    """
+    paths = list(paths)
+    results = iter_many(paths, dataset, columns, time_range, workers, datetimes, errors)
+    if iterator:
+        return results
+
+    order = {path: i for i, path in enumerate(paths)}
+    frames = sorted(results, key=lambda result: order[result[0]])
+    if len(frames) == 0:
+        return pd.DataFrame()
+    return pd.concat([data.assign(**{key: path}) for path, data in frames], ignore_index=True)
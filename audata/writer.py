@@ -0,0 +1,241 @@
+"""Buffered writer for streaming data into datasets."""
+import time
+from typing import Optional, Union, Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+from audata import _utils as utils
+from audata import _sampling
+
+# Default number of HDF5 chunks to buffer before flushing.
+DEFAULT_FLUSH_CHUNKS = 16
+
+
+class DatasetWriter:
+    """
+    Buffers rows appended to a dataset and writes them in chunk-aligned blocks.
+
+    Rows are converted into a preallocated record buffer using a conversion plan derived
+    from the dataset's column specification once, rather than re-inferring types for every
+    batch as `Dataset.append` does. The HDF5 dataset is grown to exactly the rows written on
+    each flush, so other readers (and the file, should the writer never be closed) only
+    ever see written rows.
+
+    Generally created with `Dataset.writer` or `File.stream_writer`, and used as a context
+    manager.
+
+    Example:
+        >>> with f['waveform/ecg'].writer(flush_seconds=1) as writer:
+        ...     for batch in acquire():
+        ...         writer.write(batch)
+    """
+
+    def __init__(self,
+                 dataset: Optional['Dataset'] = None,
+                 flush_rows: Optional[int] = None,
+                 flush_bytes: Optional[int] = None,
+                 flush_seconds: Optional[float] = None,
+                 au_parent: Optional['Element'] = None,
+                 name: Optional[str] = None,
+                 **kwargs):
+        """
+        Instantiates the writer.
+
+        Args:
+            dataset: The dataset to append to. If None, a dataset `name` will be created in
+                `au_parent` from the first batch written.
+            flush_rows: Flush once this many rows are buffered. Defaults to 16 HDF5 chunks.
+            flush_bytes: Flush once this many bytes are buffered.
+            flush_seconds: Flush once the oldest buffered row is this many seconds old. This
+                is checked whenever rows are written.
+            au_parent: Parent element of the dataset to create.
+            name: Name of the dataset to create.
+            **kwargs: Additional keyword arguments passed on to `Dataset.new` when creating
+                the dataset.
+        """
+        if dataset is None and (au_parent is None or name is None):
+            raise ValueError('Either a dataset or a parent and name must be given.')
+
+        self.dataset = dataset
+        self.flush_rows = flush_rows
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self._new = (au_parent, name, kwargs)
+
+        self._buffer = None
+        self._times = None
+        self._buffered = 0
+        self._oldest = None
+        self._rows = 0
+        self._columns = None
+        if dataset is not None:
+            self._prepare()
+
+    def _prepare(self):
+        """Cache the conversion plan and allocate the buffer for the target dataset."""
+        hdf = self.dataset.hdf
+        self._rows = len(hdf)
+        self._chunk = hdf.chunks[0] if hdf.chunks is not None else 1
+        self._columns = self.dataset.columns
+        self._sampling = self.dataset.sampling
+        self._time_ref = self.dataset.time_reference
+        if self._sampling is not None:
+            self._next_time = _sampling.next_time(self._sampling, self._rows)
+
+        if self.flush_rows is None:
+            self.flush_rows = self._chunk * DEFAULT_FLUSH_CHUNKS
+        self._allocate(max(self.flush_rows, self._chunk))
+
+    def _allocate(self, rows: int):
+        """(Re)allocate the buffer, keeping any buffered rows."""
+        buffer = np.empty(rows, dtype=self.dataset.hdf.dtype)
+        times = np.empty(rows, dtype='f8') if self._sampling is not None else None
+        if self._buffered > 0:
+            buffer[:self._buffered] = self._buffer[:self._buffered]
+            if times is not None:
+                times[:self._buffered] = self._times[:self._buffered]
+        self._buffer, self._times = buffer, times
+
+    @property
+    def rows_written(self) -> int:
+        """Number of rows in the dataset, including buffered rows."""
+        return self._rows + self._buffered
+
+    def write(self, data: Union[pd.DataFrame, np.ndarray, Dict[str, Any]]):
+        """
+        Buffer rows for writing, flushing if any threshold was reached.
+
+        Args:
+            data: The rows, with the same columns as the dataset.
+        """
+        if self.dataset is None:
+            au_parent, name, kwargs = self._new
+            self.dataset = _create(au_parent, name, data, kwargs)
+            self._prepare()
+            return
+
+        if isinstance(data, dict):
+            data = pd.DataFrame(data=data)
+        times = None
+        if self._sampling is not None:
+            data, times = self.dataset._split_times(data, self._sampling['time_column'],
+                                                    self._time_ref)
+
+        nrow = len(data)
+        if nrow == 0:
+            return
+        names = self._buffer.dtype.names
+        nlevels = {col: len(self._columns[col].get('levels', [])) for col in names}
+        encoded = {col: utils.encode_column(data[col], self._columns[col],
+                                            self._buffer.dtype[col], self._time_ref)
+                   for col in names}
+        extended = [col for col in names
+                    if len(self._columns[col].get('levels', [])) != nlevels[col]]
+        self._update_dataset(encoded, extended)
+
+        if self._buffered + nrow > len(self._buffer):
+            self._allocate(max(self._buffered + nrow, 2 * len(self._buffer)))
+        block = self._buffer[self._buffered:self._buffered + nrow]
+        for col in names:
+            block[col] = encoded[col]
+        if self._times is not None:
+            # Rows without times continue the sampling grid.
+            if times is None:
+                start = 0.0 if self._next_time is None else self._next_time
+                times = start + np.arange(nrow) / self._sampling['rate']
+            self._times[self._buffered:self._buffered + nrow] = times
+            self._next_time = times[-1] + 1.0 / self._sampling['rate']
+        self._buffered += nrow
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+        if self.flush_seconds is not None and \
+                time.monotonic() - self._oldest >= self.flush_seconds:
+            self.flush()
+        elif self._buffered >= self.flush_rows or \
+                (self.flush_bytes is not None and
+                 self._buffered * self._buffer.dtype.itemsize >= self.flush_bytes):
+            self.flush(aligned=True)
+
+    def _update_dataset(self, encoded: Dict[str, np.ndarray], extended: List[str]):
+        """Store new factor levels and widen string columns before buffering new rows."""
+        widths = {col: encoded[col].itemsize for col in encoded
+                  if encoded[col].dtype.kind == 'S' and
+                  encoded[col].itemsize > self._buffer.dtype[col].itemsize}
+        if len(widths) > 0:
+            self.flush()
+            self.dataset._widen_strings(widths)
+            self._allocate(len(self._buffer))
+
+        if len(extended) > 0:
+            meta = self.dataset.meta
+            for col in extended:
+                meta['columns'][col]['levels'] = self._columns[col]['levels']
+            self.dataset.meta = meta
+
+    def retype(self, dtypes: Dict[str, np.dtype],
+               specs: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Change how columns are stored (see `Dataset._retype`), e.g. integer columns as reals
+        once missing values show up. Buffered rows are flushed first.
+
+        Args:
+            dtypes: The new dtype of each column to rewrite.
+            specs: The new specification of columns whose type changes.
+        """
+        self.flush()
+        self.dataset._retype(dtypes, specs)
+        self._columns = self.dataset.columns
+        self._allocate(len(self._buffer))
+
+    def flush(self, aligned: bool = False):
+        """
+        Write buffered rows to the dataset.
+
+        Args:
+            aligned: If True, only write as many rows as end on an HDF5 chunk boundary,
+                keeping the remainder buffered.
+        """
+        if self.dataset is None or self._buffered == 0:
+            return
+
+        count = self._buffered
+        if aligned:
+            count = (self._rows + count) // self._chunk * self._chunk - self._rows
+            if count <= 0:
+                return
+
+        # The dataset is grown by `_write` to exactly the rows written, so that readers never
+        # see unwritten (zero-filled) rows.
+        stop = self._rows + count
+        times = self._times[:count] if self._times is not None else None
+        self.dataset._write(self._buffer[:count], self._rows, times)
+
+        self._rows = stop
+        remaining = self._buffered - count
+        self._buffer[:remaining] = self._buffer[count:self._buffered]
+        if self._times is not None:
+            self._times[:remaining] = self._times[count:self._buffered]
+        self._buffered = remaining
+        self._oldest = time.monotonic() if remaining > 0 else None
+
+    def close(self):
+        """Flush all buffered rows."""
+        if self.dataset is None:
+            return
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exit_type, value, traceback):
+        self.close()
+
+
+def _create(au_parent: 'Element', name: str, data: Any, kwargs: Dict[str, Any]) -> 'Dataset':
+    """Create the dataset from the first batch written."""
+    from audata.dataset import Dataset
+    if isinstance(data, dict):
+        data = pd.DataFrame(data=data)
+    return Dataset.new(au_parent, name, data, **kwargs)
@@ -23,7 +23,12 @@ setup(
     license='GNU LGPL 3',
     entry_points={
         'console_scripts': [
-            'csv2audata=audata.bin.csv2audata:main'
+            'audata=audata.bin.cli:main',
+            'audata2parquet=audata.bin.audata2parquet:main',
+            'csv2audata=audata.bin.csv2audata:main',
+            'audata-bench=audata._bench.suite:main',
+            'audata-summarize=audata.bin.summarize:main',
+            'parquet2audata=audata.bin.parquet2audata:main'
         ]
     },
     install_requires=[
@@ -35,6 +40,9 @@ setup(
         'tzlocal',
         'h5py'
     ],
+    extras_require={
+        'arrow': ['pyarrow'],
+    },
     python_requires='>=3.7',
     #include_dirs=[np.get_include()],
     packages=find_packages(),